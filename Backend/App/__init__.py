@@ -5,18 +5,35 @@ from flask_mail import Mail
 import os
 from datetime import timedelta
 import atexit
+from .cache import principal_cache
+from .hashing import password_hasher
+from .ratelimit import auth_rate_limiter
+from .engine import config_from_env as engine_config_from_env, database_url, init_app as init_engine
 
 db = SQLAlchemy()
 mail = Mail()
 _app = None  # Global app instance
 
+# Where the standalone meals service (foodtracker/database.py) always kept its data, so existing
+# meal logs are still found now that create_app serves the meals routes
+MEALS_DATABASE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                   'foodtracker', 'instance', 'meals.db')
+
+
+def meals_database_url():
+    url = os.environ.get('MEALS_DATABASE_URL')
+    if url is None:
+        os.makedirs(os.path.dirname(MEALS_DATABASE_PATH), exist_ok=True)
+        url = 'sqlite:///' + MEALS_DATABASE_PATH
+    return url
+
 def get_app():
     global _app
     if _app is not None:
         return _app
     return create_app()
 
-def create_app():
+def create_app(config=None):
     global _app
     if _app is not None:
         return _app
@@ -26,45 +43,151 @@ def create_app():
 
     # Configuration
     app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'your-secret-key-here')
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///app.db'
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_url('sqlite:///app.db')
+    app.config['SQLALCHEMY_BINDS'] = {'meals': meals_database_url()}
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     app.config['JWT_SECRET_KEY'] = os.environ.get('JWT_SECRET_KEY', 'your-jwt-secret-key')
     app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(days=1)
     app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+    app.config['SLEEP_IMPORT_CHUNK_SIZE'] = int(os.environ.get('SLEEP_IMPORT_CHUNK_SIZE', 1000))  # rows per insert
+
+    # Authenticated-principal cache used by token_required
+    app.config['PRINCIPAL_CACHE_SIZE'] = int(os.environ.get('PRINCIPAL_CACHE_SIZE', 1024))
+    app.config['PRINCIPAL_CACHE_TTL'] = int(os.environ.get('PRINCIPAL_CACHE_TTL', 300))  # seconds
+
+    # Password hashing (scrypt cost parameters and the process pool that runs it)
+    app.config['SCRYPT_N'] = int(os.environ.get('SCRYPT_N', 2 ** 15))
+    app.config['SCRYPT_R'] = int(os.environ.get('SCRYPT_R', 8))
+    app.config['SCRYPT_P'] = int(os.environ.get('SCRYPT_P', 1))
+    app.config['PASSWORD_HASH_WORKERS'] = int(os.environ.get('PASSWORD_HASH_WORKERS', min(4, os.cpu_count() or 1)))
+    app.config['PASSWORD_HASH_QUEUE_SIZE'] = int(os.environ.get('PASSWORD_HASH_QUEUE_SIZE', 4))
+    app.config['PASSWORD_HASH_TIMEOUT'] = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 5.0))  # seconds
+
+    # Pre-hash rate limits on login/signup (token buckets per IP and per email)
+    app.config['AUTH_RATE_LIMIT_ENABLED'] = os.environ.get('AUTH_RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+    app.config['AUTH_RATE_LIMIT_IP_PER_MINUTE'] = int(os.environ.get('AUTH_RATE_LIMIT_IP_PER_MINUTE', 30))
+    app.config['AUTH_RATE_LIMIT_IP_BURST'] = int(os.environ.get('AUTH_RATE_LIMIT_IP_BURST', 10))
+    app.config['AUTH_RATE_LIMIT_EMAIL_PER_MINUTE'] = int(os.environ.get('AUTH_RATE_LIMIT_EMAIL_PER_MINUTE', 5))
+    app.config['AUTH_RATE_LIMIT_EMAIL_BURST'] = int(os.environ.get('AUTH_RATE_LIMIT_EMAIL_BURST', 5))
+
+    # Workout calendar month-view cache
+    app.config['WORKOUT_CALENDAR_CACHE_SIZE'] = int(os.environ.get('WORKOUT_CALENDAR_CACHE_SIZE', 2048))
+    app.config['WORKOUT_CALENDAR_CACHE_TTL'] = int(os.environ.get('WORKOUT_CALENDAR_CACHE_TTL', 600))  # seconds
 
     # Email configuration
-    app.config['MAIL_SERVER'] = 'smtp.gmail.com'
-    app.config['MAIL_PORT'] = 587
-    app.config['MAIL_USE_TLS'] = True
+    app.config['MAIL_SERVER'] = os.environ.get('MAIL_SERVER', 'smtp.gmail.com')
+    app.config['MAIL_PORT'] = int(os.environ.get('MAIL_PORT', 587))
+    app.config['MAIL_USE_TLS'] = os.environ.get('MAIL_USE_TLS', 'true').lower() == 'true'
     app.config['MAIL_USERNAME'] = os.environ.get('MAIL_USERNAME', 'your-email@gmail.com')
     app.config['MAIL_PASSWORD'] = os.environ.get('MAIL_PASSWORD', 'your-app-specific-password')
     app.config['MAIL_DEFAULT_SENDER'] = os.environ.get('MAIL_DEFAULT_SENDER', 'noreply@fitnessapp.com')
 
+    # Outbox dispatcher that delivers queued emails in the background
+    app.config['MAIL_OUTBOX_DISPATCHER'] = os.environ.get('MAIL_OUTBOX_DISPATCHER', 'true').lower() == 'true'
+    app.config['MAIL_OUTBOX_BATCH_SIZE'] = int(os.environ.get('MAIL_OUTBOX_BATCH_SIZE', 50))
+    app.config['MAIL_OUTBOX_MAX_ATTEMPTS'] = int(os.environ.get('MAIL_OUTBOX_MAX_ATTEMPTS', 5))
+    app.config['MAIL_OUTBOX_BACKOFF'] = int(os.environ.get('MAIL_OUTBOX_BACKOFF', 30))  # seconds
+
+    # Sleep analytics cohorts (per-age-band distributions refreshed in the background)
+    app.config['SLEEP_COHORT_REFRESHER'] = os.environ.get('SLEEP_COHORT_REFRESHER', 'true').lower() == 'true'
+    app.config['SLEEP_COHORT_REFRESH_SECONDS'] = int(os.environ.get('SLEEP_COHORT_REFRESH_SECONDS', 3600))
+    app.config['SLEEP_COHORT_WINDOW_DAYS'] = int(os.environ.get('SLEEP_COHORT_WINDOW_DAYS', 90))
+
+    # Workout reminders (one thread with an in-memory heap of the next reminder per schedule)
+    app.config['WORKOUT_REMINDER_DISPATCHER'] = os.environ.get('WORKOUT_REMINDER_DISPATCHER', 'true').lower() == 'true'
+
+    # Uploaded posture recordings, analysed in a background process pool
+    app.config['POSTURE_JOB_QUEUE'] = os.environ.get('POSTURE_JOB_QUEUE', 'true').lower() == 'true'
+    app.config['POSTURE_JOB_WORKERS'] = int(os.environ.get('POSTURE_JOB_WORKERS', min(2, os.cpu_count() or 1)))
+    app.config['POSTURE_JOB_MAX_QUEUED'] = int(os.environ.get('POSTURE_JOB_MAX_QUEUED', 100))
+    app.config['POSTURE_JOB_MAX_ATTEMPTS'] = int(os.environ.get('POSTURE_JOB_MAX_ATTEMPTS', 3))
+    app.config['POSTURE_ESTIMATOR'] = os.environ.get('POSTURE_ESTIMATOR', 'PostureCorrector.estimators:stub_estimator')
+    if os.environ.get('POSTURE_SPOOL_DIR'):
+        app.config['POSTURE_SPOOL_DIR'] = os.environ['POSTURE_SPOOL_DIR']
+
+    # Connection pool and SQLite pragmas (see engine.py for the defaults)
+    app.config.update(engine_config_from_env())
+
+    # Overrides from the caller (benchmarks, scripts)
+    if config:
+        app.config.update(config)
+
     # Initialize extensions
-    db.init_app(app)
+    init_engine(app, db)
     mail.init_app(app)
+    principal_cache.init_app(app)
+    password_hasher.init_app(app)
+    auth_rate_limiter.init_app(app)
 
     with app.app_context():
         # Import routes
         from .routes import init_auth_routes
+        from .outbox import mail_outbox
+        from .rollups import rebuild_sleep_rollups_command
+        from .analytics import sleep_cohorts
+        from . import workouts
+        from .leaderboard import leaderboard
+        from .scheduling import reminder_dispatcher
         from PostureCorrector.posture import posture_blueprint
+        from PostureCorrector.jobs import posture_jobs, migrate as migrate_posture_jobs
+        from foodtracker import (nutrition_blueprint, meals_blueprint, migrate_meals, start_warm_up,
+                                 assign_orphaned_meals_command)
         
         # Initialize routes
+        mail_outbox.init_app(app)
+        sleep_cohorts.init_app(app)
+        workouts.init_app(app)
+        leaderboard.init_app(app)
+        reminder_dispatcher.init_app(app)
+        posture_jobs.init_app(app)
         init_auth_routes(app)
+        app.cli.add_command(rebuild_sleep_rollups_command)
+        app.cli.add_command(assign_orphaned_meals_command)
         
-        # Register the posture blueprint
+        # Register the posture, nutrition and meal blueprints
         app.register_blueprint(posture_blueprint, url_prefix='/api')
+        app.register_blueprint(nutrition_blueprint, url_prefix='/api')
+        app.register_blueprint(meals_blueprint, url_prefix='/api')
         
         # Create database tables
         db.create_all()
+        migrate_meals()
+        migrate_posture_jobs()
+        # create_all() skips new indexes on tables that already exist
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(db.engine, checkfirst=True)
         print("Database tables created successfully")  # Debug print
 
+        # Rank this week's workouts once; add_workout keeps it current from here
+        leaderboard.rebuild()
+
+        # Schedules are read once; creating or deleting one updates the heap directly
+        if app.config['WORKOUT_REMINDER_DISPATCHER']:
+            reminder_dispatcher.load()
+
+    # Deliver queued emails (including any left over from a previous run)
+    if app.config['MAIL_OUTBOX_DISPATCHER']:
+        mail_outbox.start()
+    if app.config['SLEEP_COHORT_REFRESHER']:
+        sleep_cohorts.start()
+    if app.config['WORKOUT_REMINDER_DISPATCHER']:
+        reminder_dispatcher.start()
+    # Analyse uploaded recordings, including any a previous run left unfinished
+    if app.config['POSTURE_JOB_QUEUE']:
+        posture_jobs.start()
+    start_warm_up()  # spaCy model for the meal parser, unless SPACY_WARMUP=false
+
     _app = app
     
     # Register cleanup
     def cleanup():
         global _app
         if _app is not None:
+            mail_outbox.stop()
+            sleep_cohorts.stop()
+            reminder_dispatcher.stop()
+            posture_jobs.stop()
             _app = None
     atexit.register(cleanup)
 
@@ -0,0 +1,222 @@
+from sqlalchemy import Integer, cast, func, select
+from datetime import date, datetime, timedelta
+import threading
+import traceback
+import numpy as np
+from . import db
+from .models import Sleep, User
+
+TARGET_SLEEP_HOURS = 8.0
+DEBT_WINDOW_DAYS = 7
+AGE_BANDS = [(0, 18), (18, 25), (25, 35), (35, 45), (45, 55), (55, 65), (65, 200)]
+
+
+def age_band(date_of_birth, today=None):
+    today = today or date.today()
+    age = today.year - date_of_birth.year - ((today.month, today.day) < (date_of_birth.month, date_of_birth.day))
+    for low, high in AGE_BANDS:
+        if low <= age < high:
+            return f'{low}-{high - 1}' if high < 200 else f'{low}+'
+    return None
+
+
+def _minutes_of(column):
+    """HH:MM of a stored time as minutes after midnight, computed in SQL"""
+    return cast(func.substr(column, 1, 2), Integer) * 60 + cast(func.substr(column, 4, 2), Integer)
+
+
+def sleep_columns(query):
+    """Run a columnar query and return its rows as one float array, no ORM objects"""
+    rows = db.session.execute(query).all()
+    if not rows:
+        return np.empty((0, len(query.selected_columns)))
+    return np.array(rows, dtype=np.float64)
+
+
+def _sleep_select(*leading):
+    """Select (*leading, julian day, bed minutes, wake minutes) from the sleep table"""
+    return select(
+        *leading,
+        func.julianday(Sleep.date),
+        _minutes_of(Sleep.bed_time),
+        _minutes_of(Sleep.wake_time)
+    )
+
+
+def derive(bed, wake):
+    """Vectorised per-record quantities from the raw columns"""
+    bed_offset = (bed + 720) % 1440 - 720  # 23:00 -> -60, 01:00 -> 60
+    minutes_asleep = (wake - bed) % 1440
+    midpoint = bed_offset + minutes_asleep / 2
+    return bed_offset, minutes_asleep / 60.0, midpoint
+
+
+def regularity_score(mean_midpoint_shift):
+    """100 when the sleep midpoint never moves, 0 at an average 3 hour swing"""
+    return np.clip(100.0 * (1.0 - mean_midpoint_shift / 180.0), 0.0, 100.0)
+
+
+def user_metrics(user_id, window_days=90):
+    """Regularity, rolling sleep debt, bed-time variance and trend for one user"""
+    start = date.today() - timedelta(days=window_days)
+    query = _sleep_select().where(Sleep.user_id == user_id, Sleep.date >= start).order_by(Sleep.date, Sleep.id)
+    columns = sleep_columns(query)
+    if not len(columns):
+        return None
+
+    days, bed, wake = columns[:, 0], columns[:, 1], columns[:, 2]
+    bed_offset, hours, midpoint = derive(bed, wake)
+
+    # One slot per calendar day so the rolling window is in days, not records
+    first_day = days[0]
+    day_index = (days - first_day).astype(np.int64)
+    span = int(day_index[-1]) + 1
+    daily_hours = np.bincount(day_index, weights=hours, minlength=span)
+    recorded = np.bincount(day_index, minlength=span) > 0
+    deficit = np.where(recorded, TARGET_SLEEP_HOURS - daily_hours, 0.0)
+    rolling_debt = np.convolve(deficit, np.ones(DEBT_WINDOW_DAYS))[:span]
+
+    midpoint_shift = np.abs(np.diff(midpoint)).mean() if len(midpoint) > 1 else 0.0
+    slope = np.polyfit(days - first_day, hours, 1)[0] if span > 1 and len(hours) > 1 else 0.0
+
+    first_date = date.fromordinal(int(first_day - 1721424.5))
+    recent = max(span - 30, 0)
+    return {
+        'records': int(len(hours)),
+        'average_duration': round(float(hours.mean()), 2),
+        'regularity': round(float(regularity_score(midpoint_shift)), 1),
+        'mean_midpoint_shift_minutes': round(float(midpoint_shift), 1),
+        'bed_time_variance': round(float(bed_offset.var()), 1),  # minutes squared
+        'bed_time_std_minutes': round(float(bed_offset.std()), 1),
+        'trend_hours_per_week': round(float(slope * 7), 3),
+        'sleep_debt_hours': round(float(max(rolling_debt[-1], 0.0)), 2),
+        'rolling_sleep_debt': [
+            {
+                'date': (first_date + timedelta(days=i)).strftime('%Y-%m-%d'),
+                'debt_hours': round(float(max(rolling_debt[i], 0.0)), 2)
+            }
+            for i in range(recent, span)
+        ]
+    }
+
+
+class CohortIndex:
+    """Sorted per-age-band distributions of every user's sleep metrics.
+
+    Rebuilt in the background on a fixed interval; lookups are a binary search
+    (np.searchsorted) into the sorted arrays.
+    """
+
+    METRICS = ('average_duration', 'regularity')
+    DECIMALS = {'average_duration': 2, 'regularity': 1}  # As user_metrics rounds them
+
+    def __init__(self):
+        self.app = None
+        self.refreshed_at = None
+        self._bands = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def init_app(self, app):
+        app.config.setdefault('SLEEP_COHORT_REFRESH_SECONDS', 3600)
+        app.config.setdefault('SLEEP_COHORT_WINDOW_DAYS', 90)
+        self.app = app
+        app.extensions['sleep_cohorts'] = self
+
+    def refresh(self):
+        """Recompute every band's distributions (needs an app context)"""
+        start = date.today() - timedelta(days=self.app.config['SLEEP_COHORT_WINDOW_DAYS'])
+        query = _sleep_select(Sleep.user_id).where(Sleep.date >= start).order_by(Sleep.user_id, Sleep.date, Sleep.id)
+        columns = sleep_columns(query)
+        bands = {}
+        if len(columns):
+            user_ids, days, bed, wake = columns.T
+            _, hours, midpoint = derive(bed, wake)
+
+            # Group by user without a Python loop: users are contiguous after the ORDER BY
+            unique_ids, group, counts = np.unique(user_ids, return_inverse=True, return_counts=True)
+            average_duration = np.bincount(group, weights=hours) / counts
+            same_user = group[1:] == group[:-1]
+            shifts = np.where(same_user, np.abs(np.diff(midpoint)), 0.0)
+            shift_counts = np.bincount(group[1:], weights=same_user, minlength=len(unique_ids))
+            shift_sums = np.bincount(group[1:], weights=shifts, minlength=len(unique_ids))
+            mean_shift = np.divide(shift_sums, shift_counts, out=np.zeros_like(shift_sums), where=shift_counts > 0)
+            regularity = regularity_score(mean_shift)
+
+            birthdays = dict(db.session.execute(
+                select(User.id, User.date_of_birth).where(User.id.in_(unique_ids.astype(int).tolist()))
+            ).all())
+            today = date.today()
+            labels = np.array([age_band(birthdays[int(uid)], today) if int(uid) in birthdays else None
+                               for uid in unique_ids], dtype=object)
+            for label in set(labels) - {None}:
+                mask = labels == label
+                # Rounded like the user's own metrics, so a user never ranks below their own value
+                bands[label] = {
+                    'average_duration': np.sort(np.round(average_duration[mask], self.DECIMALS['average_duration'])),
+                    'regularity': np.sort(np.round(regularity[mask], self.DECIMALS['regularity']))
+                }
+
+        with self._lock:
+            self._bands = bands
+            self.refreshed_at = datetime.utcnow()
+
+    def percentile(self, band, metric, value):
+        """Share of the band at or below value, in percent"""
+        with self._lock:
+            distribution = self._bands.get(band, {}).get(metric)
+        if distribution is None or not len(distribution):
+            return None
+        rank = np.searchsorted(distribution, np.round(value, self.DECIMALS[metric]), side='right')
+        return round(100.0 * rank / len(distribution), 1)
+
+    def band_size(self, band):
+        with self._lock:
+            distribution = self._bands.get(band, {}).get('average_duration')
+        return 0 if distribution is None else int(len(distribution))
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='sleep-cohorts', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                with self.app.app_context():
+                    self.refresh()
+                    db.session.remove()
+            except Exception as e:
+                print(f"Error refreshing sleep cohorts: {str(e)}")
+                print(f"Traceback: {traceback.format_exc()}")
+            self._stop.wait(self.app.config['SLEEP_COHORT_REFRESH_SECONDS'])
+
+
+sleep_cohorts = CohortIndex()
+
+
+def analyze_user(user):
+    """Metrics for the user plus their percentile within their age band"""
+    metrics = user_metrics(user.id, sleep_cohorts.app.config['SLEEP_COHORT_WINDOW_DAYS'])
+    if metrics is None:
+        return None
+    if sleep_cohorts.refreshed_at is None:
+        sleep_cohorts.refresh()  # First request after startup, before the refresher has run
+
+    band = age_band(user.date_of_birth)
+    metrics['cohort'] = {
+        'age_band': band,
+        'size': sleep_cohorts.band_size(band),
+        'refreshed_at': sleep_cohorts.refreshed_at.strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'percentiles': {
+            metric: sleep_cohorts.percentile(band, metric, metrics[metric])
+            for metric in CohortIndex.METRICS
+        }
+    }
+    return metrics
@@ -0,0 +1,112 @@
+from collections import OrderedDict
+import threading
+import time
+
+
+class TTLCache:
+    """Thread-safe bounded LRU cache whose entries expire after a TTL"""
+
+    def __init__(self, maxsize=1024, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return entry[1] if entry else None
+
+    def discard_where(self, predicate):
+        """Drop every entry for which predicate(key, value) is true"""
+        with self._lock:
+            stale = [k for k, (_, v) in self._data.items() if predicate(k, v)]
+            for key in stale:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+class PrincipalCache:
+    """Caches verified JWTs and the users they authenticate.
+
+    Tokens map to a user id until the token's own ``exp``; users are kept as
+    detached instances and merged into the request session without a query.
+    """
+
+    def __init__(self):
+        self.tokens = TTLCache()
+        self.users = TTLCache()
+
+    def init_app(self, app):
+        maxsize = app.config.setdefault('PRINCIPAL_CACHE_SIZE', 1024)
+        ttl = app.config.setdefault('PRINCIPAL_CACHE_TTL', 300)
+        self.tokens = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.users = TTLCache(maxsize=maxsize, ttl=ttl)
+        app.extensions['principal_cache'] = self
+
+    def get_user_id(self, token):
+        return self.tokens.get(token)
+
+    def add_token(self, token, user_id, exp=None):
+        ttl = exp - time.time() if exp is not None else None
+        self.tokens.set(token, user_id, ttl=ttl)
+
+    def get_user(self, user_id):
+        return self.users.get(user_id)
+
+    def add_user(self, user):
+        self.users.set(user.id, user)
+
+    def invalidate_user(self, user_id):
+        """Forget a user and every token that resolved to them"""
+        self.users.pop(user_id)
+        self.tokens.discard_where(lambda token, uid: uid == user_id)
+
+    def clear(self):
+        self.tokens.clear()
+        self.users.clear()
+
+    def stats(self):
+        return {'tokens': self.tokens.stats(), 'users': self.users.stats()}
+
+
+principal_cache = PrincipalCache()
@@ -1,28 +1,125 @@
-from models import WorkoutList
-from App import db
+from .models import WorkoutList, WorkoutSchedule
+from . import db
+from .scheduling import (reminder_dispatcher, merge_occurrences, weekdays_mask, weekdays_names,
+                         WEEKDAY_NAMES)
 from flask import jsonify, request
-from datetime import datetime
+from datetime import datetime, timedelta
 
-def schedule_workout():
+MAX_OCCURRENCE_WINDOW_DAYS = 366
+
+def serialize_schedule(schedule):
+    return {
+        'id': schedule.id,
+        'workoutType': schedule.workout_type,
+        'difficulty': schedule.difficulty,
+        'duration': schedule.duration,
+        'days': weekdays_names(schedule.weekdays),
+        'time': schedule.time_of_day.strftime('%H:%M'),
+        'startDate': schedule.start_date.strftime('%Y-%m-%d'),
+        'endDate': schedule.end_date.strftime('%Y-%m-%d') if schedule.end_date else None,
+        'intervalWeeks': schedule.interval_weeks,
+        'remindMinutesBefore': schedule.remind_minutes_before
+    }
+
+def schedule_workout(current_user):
+    """Create a recurring schedule, or a one-off when no days are given"""
     data = request.get_json()
-    workout = WorkoutList(
-        workoutType=data['workoutType'],
+    start_date = datetime.strptime(data.get('startDate') or data['date'], '%Y-%m-%d').date()
+    end_date = datetime.strptime(data['endDate'], '%Y-%m-%d').date() if data.get('endDate') else None
+    days = data.get('days')
+    if days:
+        weekdays = weekdays_mask(days)
+    else:
+        # A single workout on the start date
+        weekdays = 1 << start_date.weekday()
+        end_date = start_date
+    if end_date is not None and end_date < start_date:
+        raise ValueError('endDate must not be before startDate')
+    interval_weeks = int(data.get('intervalWeeks') or 1)
+    if interval_weeks < 1:
+        raise ValueError('intervalWeeks must be at least 1')
+    remind = data.get('remindMinutesBefore')
+
+    schedule = WorkoutSchedule(
+        user_id=current_user.id,
+        workout_type=data['workoutType'],
         difficulty=data['difficulty'],
-        duration=data['duration'],
-        date=datetime.strptime(data['date'], '%Y-%m-%d')
+        duration=int(data['duration']),
+        weekdays=weekdays,
+        time_of_day=datetime.strptime(data.get('time') or '09:00', '%H:%M').time(),
+        start_date=start_date,
+        end_date=end_date,
+        interval_weeks=interval_weeks,
+        remind_minutes_before=int(remind) if remind is not None else None
     )
-    db.session.add(workout)
+    email = current_user.email
+    db.session.add(schedule)
+    db.session.commit()
+    reminder_dispatcher.add(reminder_dispatcher.spec_for(schedule, email))
+    return jsonify({'message': 'Workout scheduled successfully', 'schedule': serialize_schedule(schedule)}), 201
+
+def list_schedules(current_user):
+    schedules = db.session.execute(
+        db.select(WorkoutSchedule).where(WorkoutSchedule.user_id == current_user.id).order_by(WorkoutSchedule.id)
+    ).scalars().all()
+    return jsonify({'schedules': [serialize_schedule(schedule) for schedule in schedules]}), 200
+
+def delete_schedule(current_user, schedule_id):
+    schedule = db.session.execute(
+        db.select(WorkoutSchedule).where(WorkoutSchedule.id == schedule_id, WorkoutSchedule.user_id == current_user.id)
+    ).scalar_one_or_none()
+    if not schedule:
+        return jsonify({'message': 'Schedule not found'}), 404
+    db.session.delete(schedule)
     db.session.commit()
-    return jsonify({'message': 'Workout scheduled successfully'}), 201
+    reminder_dispatcher.remove(schedule_id)
+    return jsonify({'message': 'Schedule deleted successfully'}), 200
+
+def upcoming_workouts(current_user):
+    """Expand the user's schedules over a date window, in time order"""
+    start_date = datetime.strptime(request.args['start_date'], '%Y-%m-%d').date() \
+        if request.args.get('start_date') else datetime.utcnow().date()
+    end_date = datetime.strptime(request.args['end_date'], '%Y-%m-%d').date() \
+        if request.args.get('end_date') else start_date + timedelta(days=6)
+    if end_date < start_date:
+        raise ValueError('end_date must not be before start_date')
+    end_date = min(end_date, start_date + timedelta(days=MAX_OCCURRENCE_WINDOW_DAYS - 1))
+
+    schedules = db.session.execute(
+        db.select(WorkoutSchedule).where(
+            WorkoutSchedule.user_id == current_user.id,
+            WorkoutSchedule.start_date <= end_date,
+            (WorkoutSchedule.end_date.is_(None)) | (WorkoutSchedule.end_date >= start_date)
+        )
+    ).scalars().all()
+    occurrences = [
+        {
+            'scheduleId': schedule.id,
+            'workoutType': schedule.workout_type,
+            'difficulty': schedule.difficulty,
+            'duration': schedule.duration,
+            'date': when.strftime('%Y-%m-%d'),
+            'day': WEEKDAY_NAMES[when.weekday()],
+            'time': when.strftime('%H:%M')
+        }
+        for when, schedule in merge_occurrences(schedules, start_date, end_date)
+    ]
+    return jsonify({
+        'start_date': start_date.strftime('%Y-%m-%d'),
+        'end_date': end_date.strftime('%Y-%m-%d'),
+        'occurrences': occurrences
+    }), 200
 
-def track_workout():
-    workout_id = request.args.get('workout_id')
-    workout = WorkoutList.query.get(workout_id)
+def track_workout(current_user):
+    workout_id = request.args.get('workout_id', type=int)
+    workout = db.session.execute(
+        db.select(WorkoutList).where(WorkoutList.id == workout_id, WorkoutList.user_id == current_user.id)
+    ).scalar_one_or_none()
     if workout:
         return jsonify({
-            'workoutType': workout.workoutType,
+            'workoutType': workout.workout_type,
             'difficulty': workout.difficulty,
             'duration': workout.duration,
-            'date': workout.date.strftime('%Y-%m-%d')
+            'date': workout.date.strftime('%Y-%m-%d') if workout.date else None
         }), 200
-    return jsonify({'message': 'Workout not found'}), 404
\ No newline at end of file
+    return jsonify({'message': 'Workout not found'}), 404
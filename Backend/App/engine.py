@@ -0,0 +1,95 @@
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+import os
+
+# Connection-level settings for every service's database (env var -> default)
+DEFAULTS = {
+    'SQLITE_JOURNAL_MODE': 'WAL',  # Readers no longer block the writer
+    'SQLITE_SYNCHRONOUS': 'NORMAL',  # Safe with WAL; fsync at checkpoints instead of every commit
+    'SQLITE_BUSY_TIMEOUT_MS': 5000,  # Wait for a lock instead of failing with "database is locked"
+    'SQLITE_CACHE_SIZE_KB': 20000,
+    'SQLITE_MMAP_SIZE': 256 * 1024 * 1024,
+    'DB_POOL_SIZE': 10,
+    'DB_MAX_OVERFLOW': 10,
+    'DB_POOL_TIMEOUT': 30,  # seconds
+}
+
+
+def config_from_env():
+    return {key: type(default)(os.environ.get(key, default)) for key, default in DEFAULTS.items()}
+
+
+def database_url(default='sqlite:///app.db'):
+    return os.environ.get('DATABASE_URL', default)
+
+
+def _is_sqlite_file(url):
+    url = make_url(url)
+    return url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:') \
+        and url.query.get('mode') != 'memory'
+
+
+def engine_options(url, config):
+    """create_engine() keyword arguments for a URL, pool sized from config"""
+    if make_url(url).get_backend_name() == 'sqlite' and not _is_sqlite_file(url):
+        return {}  # In-memory databases use a single shared connection
+    return {
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+    }
+
+
+def bind_options(bind, config):
+    """A SQLALCHEMY_BINDS entry with engine options for its own URL; explicit options win"""
+    options = dict(bind) if isinstance(bind, dict) else {'url': bind}
+    return dict(engine_options(options['url'], config), **options)
+
+
+def sqlite_pragmas(config):
+    return [
+        ('journal_mode', config['SQLITE_JOURNAL_MODE']),
+        ('synchronous', config['SQLITE_SYNCHRONOUS']),
+        ('busy_timeout', config['SQLITE_BUSY_TIMEOUT_MS']),
+        ('cache_size', -config['SQLITE_CACHE_SIZE_KB']),  # Negative means KiB, not pages
+        ('mmap_size', config['SQLITE_MMAP_SIZE']),
+        ('temp_store', 'MEMORY'),
+    ]
+
+
+def install_pragmas(engine, config):
+    """Run the pragmas on every new connection the engine opens"""
+    if engine.dialect.name != 'sqlite':
+        return
+    pragmas = sqlite_pragmas(config)
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas:
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
+
+
+def make_engine(url, config=None):
+    """A standalone engine with the same tuning (scripts, benchmarks)"""
+    config = config or config_from_env()
+    engine = create_engine(url, **engine_options(url, config))
+    install_pragmas(engine, config)
+    return engine
+
+
+def init_app(app, db):
+    """Configure and initialise a Flask-SQLAlchemy db so every bind gets the tuning"""
+    for key, value in config_from_env().items():
+        app.config.setdefault(key, value)
+    config = {key: app.config[key] for key in DEFAULTS}
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(app.config['SQLALCHEMY_DATABASE_URI'], config))
+    # SQLALCHEMY_ENGINE_OPTIONS only reach the default bind, so every other bind gets options for its own URL
+    app.config['SQLALCHEMY_BINDS'] = {
+        key: bind_options(bind, config) for key, bind in app.config.get('SQLALCHEMY_BINDS', {}).items()
+    }
+    db.init_app(app)
+    with app.app_context():
+        for engine in db.engines.values():
+            install_pragmas(engine, config)
@@ -0,0 +1,89 @@
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+import atexit
+import multiprocessing
+import os
+import threading
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+class HashingBusy(Exception):
+    """Raised when the hashing queue is full or a hash does not finish in time"""
+
+
+class PasswordHasher:
+    """Runs scrypt hashing/verification in a bounded process pool.
+
+    Request threads only wait on a future, so a burst of logins cannot tie up
+    every worker thread. Up to PASSWORD_HASH_QUEUE_SIZE hashes wait behind the
+    running ones; past that, callers get HashingBusy. With
+    PASSWORD_HASH_WORKERS = 0 hashing runs inline.
+    """
+
+    def __init__(self):
+        self.workers = 0
+        self.timeout = 5.0
+        self.method = 'scrypt'
+        self._executor = None
+        self._slots = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        n = app.config.setdefault('SCRYPT_N', 2 ** 15)
+        r = app.config.setdefault('SCRYPT_R', 8)
+        p = app.config.setdefault('SCRYPT_P', 1)
+        self.method = f'scrypt:{n}:{r}:{p}'
+        self.workers = app.config.setdefault('PASSWORD_HASH_WORKERS', min(4, os.cpu_count() or 1))
+        self.timeout = app.config.setdefault('PASSWORD_HASH_TIMEOUT', 5.0)
+        queue_size = app.config.setdefault('PASSWORD_HASH_QUEUE_SIZE', 4)
+        # One slot per running hash plus the waiting room
+        self._slots = threading.BoundedSemaphore(max(self.workers + queue_size, 1))
+        app.extensions['password_hasher'] = self
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # Not fork: the pool starts on the first login, with request threads holding locks
+                methods = multiprocessing.get_all_start_methods()
+                context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+                atexit.register(self.shutdown)
+            return self._executor
+
+    def _run(self, fn, *args):
+        if not self.workers:
+            return fn(*args)
+
+        # Shed load instead of queueing without bound
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusy('Password hashing queue is full')
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        # The slot is freed when the work actually finishes, even after a timeout
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise HashingBusy('Password hashing timed out')
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """True when a hash was made with different cost parameters"""
+        return not password_hash.startswith(self.method + '$')
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,192 @@
+from sqlalchemy import func, select
+from datetime import date, timedelta
+import random
+import threading
+from . import db
+from .models import User, WorkoutList
+from .workouts import calories_column
+
+
+class _Node:
+    __slots__ = ('key', 'next', 'width')
+
+    def __init__(self, key, level):
+        self.key = key
+        self.next = [None] * level
+        self.width = [1] * level  # Level-0 steps from this node to next[level]
+
+
+class RankIndex:
+    """Indexable skip list of unique sortable keys.
+
+    Insert, remove and rank are O(log n); the first k keys are a walk along
+    the bottom level.
+    """
+
+    MAX_LEVEL = 24
+
+    def __init__(self):
+        self._head = _Node(None, self.MAX_LEVEL)
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def _random_level(self):
+        level = 1
+        while level < self.MAX_LEVEL and random.random() < 0.5:
+            level += 1
+        return level
+
+    def _predecessors(self, key):
+        """Rightmost node before key on each level, and its 0-based position + 1"""
+        chain = [None] * self.MAX_LEVEL
+        steps = [0] * self.MAX_LEVEL
+        node = self._head
+        position = 0
+        for level in reversed(range(self.MAX_LEVEL)):
+            while node.next[level] is not None and node.next[level].key < key:
+                position += node.width[level]
+                node = node.next[level]
+            chain[level] = node
+            steps[level] = position
+        return chain, steps
+
+    def insert(self, key):
+        chain, steps = self._predecessors(key)
+        level = self._random_level()
+        node = _Node(key, level)
+        for i in range(level):
+            distance = steps[0] - steps[i]  # From chain[i] to the insertion point
+            node.next[i] = chain[i].next[i]
+            chain[i].next[i] = node
+            node.width[i] = chain[i].width[i] - distance
+            chain[i].width[i] = distance + 1
+        for i in range(level, self.MAX_LEVEL):
+            chain[i].width[i] += 1
+        self._size += 1
+
+    def remove(self, key):
+        chain, _ = self._predecessors(key)
+        node = chain[0].next[0]
+        if node is None or node.key != key:
+            raise KeyError(key)
+        for i in range(self.MAX_LEVEL):
+            if chain[i].next[i] is node:
+                chain[i].width[i] += node.width[i] - 1
+                chain[i].next[i] = node.next[i]
+            else:
+                chain[i].width[i] -= 1
+        self._size -= 1
+
+    def rank(self, key):
+        """0-based position of key"""
+        chain, steps = self._predecessors(key)
+        node = chain[0].next[0]
+        if node is None or node.key != key:
+            raise KeyError(key)
+        return steps[0]
+
+    def first(self, k):
+        keys = []
+        node = self._head.next[0]
+        while node is not None and len(keys) < k:
+            keys.append(node.key)
+            node = node.next[0]
+        return keys
+
+
+def week_start(day):
+    return day - timedelta(days=day.weekday())
+
+
+class WeeklyLeaderboard:
+    """Calories burned this week per user, ranked in memory.
+
+    add_workout feeds it in O(log n); reads never touch the database except
+    for the rebuild at startup and when a new week begins.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.week_start = None
+        self._scores = {}  # user_id -> calories
+        self._names = {}  # user_id -> display name
+        self._ranks = RankIndex()  # keys are (-calories, user_id)
+        self._lock = threading.RLock()
+
+    def init_app(self, app):
+        self.app = app
+        app.extensions['leaderboard'] = self
+
+    @staticmethod
+    def display_name(first_name, last_name):
+        return f"{first_name} {last_name[:1]}." if last_name else first_name
+
+    def rebuild(self, today=None):
+        """Reload the current week's totals from SQL (needs an app context)"""
+        start = week_start(today or date.today())
+        rows = db.session.execute(
+            select(User.id, User.first_name, User.last_name, func.sum(calories_column()))
+            .join(WorkoutList, WorkoutList.user_id == User.id)
+            .where(WorkoutList.date >= start, WorkoutList.date < start + timedelta(days=7))
+            .group_by(User.id)
+        ).all()
+        with self._lock:
+            self.week_start = start
+            self._scores = {}
+            self._names = {}
+            self._ranks = RankIndex()
+            for user_id, first_name, last_name, calories in rows:
+                self._set(user_id, int(calories or 0))
+                self._names[user_id] = self.display_name(first_name, last_name)
+
+    def _roll_over(self):
+        today = date.today()
+        if self.week_start != week_start(today):
+            self.rebuild(today)
+
+    def _set(self, user_id, calories):
+        previous = self._scores.get(user_id)
+        if previous is not None:
+            self._ranks.remove((-previous, user_id))
+        self._scores[user_id] = calories
+        self._ranks.insert((-calories, user_id))
+
+    def record(self, user_id, name, calories, workout_date):
+        """Count a committed workout if it falls in the current week"""
+        with self._lock:
+            self._roll_over()
+            if workout_date is None or week_start(workout_date) != self.week_start:
+                return
+            self._names[user_id] = name
+            self._set(user_id, self._scores.get(user_id, 0) + calories)
+
+    def _entry(self, rank, user_id):
+        return {
+            'rank': rank + 1,
+            'user_id': user_id,
+            'name': self._names.get(user_id),
+            'calories': self._scores[user_id]
+        }
+
+    def top(self, k=10):
+        with self._lock:
+            self._roll_over()
+            return [self._entry(rank, user_id)
+                    for rank, (_, user_id) in enumerate(self._ranks.first(k))]
+
+    def rank_of(self, user_id):
+        with self._lock:
+            self._roll_over()
+            calories = self._scores.get(user_id)
+            if calories is None:
+                return None
+            return self._entry(self._ranks.rank((-calories, user_id)), user_id)
+
+    def size(self):
+        with self._lock:
+            return len(self._ranks)
+
+
+leaderboard = WeeklyLeaderboard()
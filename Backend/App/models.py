@@ -1,6 +1,7 @@
 from . import db
+from .cache import principal_cache
+from .hashing import password_hasher
 from datetime import datetime, time, timedelta
-from werkzeug.security import generate_password_hash, check_password_hash
 
 # User Model
 class User(db.Model):
@@ -25,14 +26,17 @@ class User(db.Model):
         self.first_name = first_name
         self.last_name = last_name
         self.email = email
-        self.password_hash = generate_password_hash(password, method='scrypt')
+        self.password_hash = password_hasher.hash(password)
         self.date_of_birth = date_of_birth
         self.weight = weight
         self.height = height
         self.goal = goal
 
     def verifyPassword(self, password):
-        return check_password_hash(self.password_hash, password)
+        return password_hasher.verify(self.password_hash, password)
+
+    def set_password(self, password):
+        self.password_hash = password_hasher.hash(password)
 
     def updateProfile(self, first_name=None, last_name=None, email=None, weight=None, height=None, goal=None):
         if first_name:
@@ -48,6 +52,7 @@ class User(db.Model):
         if goal:
             self.goal = goal
         db.session.commit()
+        principal_cache.invalidate_user(self.id)
 
     def __repr__(self):
         return f'<User {self.email}>'
@@ -64,6 +69,11 @@ class Sleep(db.Model):
     wake_time = db.Column(db.Time, nullable=False)
     sleep_duration = db.Column(db.Integer, nullable=False)
 
+    # Serves per-user date-range filters and (date, id) keyset pagination
+    __table_args__ = (
+        db.Index('ix_sleep_user_id_date', 'user_id', 'date'),
+    )
+
     def __init__(self, user_id, date, bed_time, wake_time):
         self.user_id = user_id
         self.date = date
@@ -72,12 +82,35 @@ class Sleep(db.Model):
         self.sleep_duration = self.get_sleep_duration()
     
     def get_sleep_duration(self):
-        bed_time_datetime = datetime.combine(self.date, self.bed_time)
-        wake_time_datetime = datetime.combine(self.date, self.wake_time)
-        if self.wake_time < self.bed_time:  # Handle case where waking up is on the next day
-            wake_time_datetime += timedelta(days=1)
-        duration = (wake_time_datetime - bed_time_datetime).seconds // 3600
-        return duration
+        return sleep_duration_hours(self.bed_time, self.wake_time)
+
+def sleep_duration_hours(bed_time, wake_time):
+    """Whole hours slept, wrapping past midnight when waking up is on the next day"""
+    bed_seconds = bed_time.hour * 3600 + bed_time.minute * 60 + bed_time.second
+    wake_seconds = wake_time.hour * 3600 + wake_time.minute * 60 + wake_time.second
+    return ((wake_seconds - bed_seconds) % 86400) // 3600
+
+# SleepRollup Model
+class SleepRollup(db.Model):
+    __tablename__ = 'sleep_rollups'
+
+    # SleepRollup Fields (one row per user, period and bucket)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    period = db.Column(db.String(5), primary_key=True)  # day, week or month
+    bucket_start = db.Column(db.Date, primary_key=True)
+    record_count = db.Column(db.Integer, nullable=False, default=0)
+    total_duration = db.Column(db.Integer, nullable=False, default=0)
+    bed_minutes_sum = db.Column(db.Integer, nullable=False, default=0)  # Minutes from midnight, -720 to 719
+    wake_minutes_sum = db.Column(db.Integer, nullable=False, default=0)  # Minutes from midnight, 0 to 1439
+
+    def __init__(self, user_id, period, bucket_start):
+        self.user_id = user_id
+        self.period = period
+        self.bucket_start = bucket_start
+        self.record_count = 0
+        self.total_duration = 0
+        self.bed_minutes_sum = 0
+        self.wake_minutes_sum = 0
 
 # WorkoutList Model
 class WorkoutList(db.Model):
@@ -91,6 +124,12 @@ class WorkoutList(db.Model):
     date = db.Column(db.Date, default=datetime.utcnow)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)  # Added user relationship
 
+    # Narrows per-user stats and date-range (calendar) queries to an index seek; not covering,
+    # so the matching rows are still read from the table for duration, difficulty and type
+    __table_args__ = (
+        db.Index('ix_workouts_user_id_date', 'user_id', 'date'),
+    )
+
     def __init__(self, workout_type, difficulty, duration, user_id, date=None):
         self.workout_type = workout_type
         self.difficulty = difficulty
@@ -98,3 +137,76 @@ class WorkoutList(db.Model):
         self.user_id = user_id
         if date:
             self.date = date
+
+# EmailOutbox Model
+class EmailOutbox(db.Model):
+    __tablename__ = 'email_outbox'
+
+    # EmailOutbox Fields
+    id = db.Column(db.Integer, primary_key=True)
+    recipient = db.Column(db.String(120), nullable=False)
+    subject = db.Column(db.String(200), nullable=False)
+    body = db.Column(db.Text, nullable=True)  # Cleared once sent, it may hold a temporary password
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, sent or failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_email_outbox_status_next_attempt', 'status', 'next_attempt_at'),
+    )
+
+    def __init__(self, recipient, subject, body):
+        self.recipient = recipient
+        self.subject = subject
+        self.body = body
+        self.status = 'pending'
+        self.attempts = 0
+        self.next_attempt_at = datetime.utcnow()
+
+# WorkoutStats Model
+class WorkoutStats(db.Model):
+    __tablename__ = 'workout_stats'
+
+    # Running totals per user, kept in step with the workouts table by add_workout
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    total_workouts = db.Column(db.Integer, nullable=False, default=0)
+    total_calories = db.Column(db.Integer, nullable=False, default=0)
+
+    def __init__(self, user_id, total_workouts=0, total_calories=0):
+        self.user_id = user_id
+        self.total_workouts = total_workouts
+        self.total_calories = total_calories
+
+# WorkoutSchedule Model
+class WorkoutSchedule(db.Model):
+    __tablename__ = 'workout_schedules'
+
+    # WorkoutSchedule Fields (occurrences are expanded on demand, never stored)
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    workout_type = db.Column(db.String(50), nullable=False)
+    difficulty = db.Column(db.String(50), nullable=False)
+    duration = db.Column(db.Integer, nullable=False)
+    weekdays = db.Column(db.Integer, nullable=False)  # Bitmask, Monday = 1 << 0 ... Sunday = 1 << 6
+    time_of_day = db.Column(db.Time, nullable=False)
+    start_date = db.Column(db.Date, nullable=False)
+    end_date = db.Column(db.Date, nullable=True)  # Open-ended when empty
+    interval_weeks = db.Column(db.Integer, nullable=False, default=1)
+    remind_minutes_before = db.Column(db.Integer, nullable=True)  # No reminder when empty
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __init__(self, user_id, workout_type, difficulty, duration, weekdays, time_of_day, start_date,
+                 end_date=None, interval_weeks=1, remind_minutes_before=None):
+        self.user_id = user_id
+        self.workout_type = workout_type
+        self.difficulty = difficulty
+        self.duration = duration
+        self.weekdays = weekdays
+        self.time_of_day = time_of_day
+        self.start_date = start_date
+        self.end_date = end_date
+        self.interval_weeks = interval_weeks
+        self.remind_minutes_before = remind_minutes_before
@@ -0,0 +1,174 @@
+from flask_mail import Message
+from sqlalchemy import func, update
+from datetime import datetime, timedelta
+import smtplib
+import threading
+import traceback
+from . import db, mail
+from .models import EmailOutbox
+
+
+class MailOutbox:
+    """Durable email outbox drained by a single background dispatcher thread.
+
+    Requests only insert an EmailOutbox row inside their own transaction; the
+    dispatcher sends due messages in batches over one SMTP connection and
+    retries failures with exponential backoff.
+    """
+
+    def __init__(self):
+        self.app = None
+        self._thread = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+
+    def init_app(self, app):
+        app.config.setdefault('MAIL_OUTBOX_BATCH_SIZE', 50)
+        app.config.setdefault('MAIL_OUTBOX_MAX_ATTEMPTS', 5)
+        app.config.setdefault('MAIL_OUTBOX_BACKOFF', 30)  # seconds, doubled per attempt
+        app.config.setdefault('MAIL_OUTBOX_LEASE', 300)  # seconds a claimed message is hidden from other dispatchers
+        app.config.setdefault('MAIL_OUTBOX_IDLE_INTERVAL', 60)  # seconds between checks when nothing is due
+        self.app = app
+        app.extensions['mail_outbox'] = self
+
+    def enqueue(self, recipient, subject, body):
+        """Add a message to the current session; it is sent once the caller commits"""
+        message = EmailOutbox(recipient=recipient, subject=subject, body=body)
+        db.session.add(message)
+        return message
+
+    def notify(self):
+        """Wake the dispatcher after a commit instead of waiting for the idle interval"""
+        self._wake.set()
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='mail-outbox', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            delay = self.app.config['MAIL_OUTBOX_IDLE_INTERVAL']
+            try:
+                with self.app.app_context():
+                    if self.dispatch_batch() >= self.app.config['MAIL_OUTBOX_BATCH_SIZE']:
+                        delay = 0  # A full batch means there may be more waiting
+                    else:
+                        delay = self._seconds_until_next_due(delay)
+            except Exception as e:
+                print(f"Error in mail outbox dispatcher: {str(e)}")
+                print(f"Traceback: {traceback.format_exc()}")
+            self._wake.wait(delay)
+            self._wake.clear()
+
+    def _seconds_until_next_due(self, default):
+        next_due = db.session.query(func.min(EmailOutbox.next_attempt_at)).filter(
+            EmailOutbox.status == 'pending'
+        ).scalar()
+        db.session.remove()
+        if next_due is None:
+            return default
+        return min(default, max((next_due - datetime.utcnow()).total_seconds(), 0))
+
+    def _claim_batch(self):
+        """Lease due messages so a second dispatcher process can't send them too"""
+        config = self.app.config
+        now = datetime.utcnow()
+        candidates = EmailOutbox.query.filter(
+            EmailOutbox.status == 'pending',
+            EmailOutbox.next_attempt_at <= now
+        ).order_by(EmailOutbox.next_attempt_at).limit(config['MAIL_OUTBOX_BATCH_SIZE']).all()
+
+        lease_until = now + timedelta(seconds=config['MAIL_OUTBOX_LEASE'])
+        claimed = []
+        for message in candidates:
+            result = db.session.execute(
+                update(EmailOutbox)
+                .where(EmailOutbox.id == message.id, EmailOutbox.next_attempt_at == message.next_attempt_at)
+                .values(next_attempt_at=lease_until)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount:
+                claimed.append(message.id)
+        db.session.commit()
+        return claimed
+
+    def dispatch_batch(self):
+        """Send one batch of due messages, returning how many were attempted"""
+        claimed = self._claim_batch()
+        if not claimed:
+            return 0
+
+        messages = EmailOutbox.query.filter(EmailOutbox.id.in_(claimed)).order_by(EmailOutbox.id).all()
+        sender = self.app.config['MAIL_DEFAULT_SENDER']
+        remaining = list(messages)
+        try:
+            # One connection (and TLS handshake) for the whole batch
+            with mail.connect() as connection:
+                while remaining:
+                    message = remaining[0]
+                    try:
+                        connection.send(Message(message.subject, sender=sender,
+                                                recipients=[message.recipient], body=message.body))
+                    except (smtplib.SMTPServerDisconnected, OSError):
+                        raise  # The connection is gone, retry the rest later
+                    except Exception as e:
+                        self._mark_failed(message, e)
+                    else:
+                        self._mark_sent(message)
+                    remaining.pop(0)
+        except Exception as e:
+            # Could not connect, log in, or keep the connection open
+            for message in remaining:
+                self._mark_failed(message, e)
+        db.session.commit()
+        db.session.remove()
+        return len(messages)
+
+    def _mark_sent(self, message):
+        message.status = 'sent'
+        message.sent_at = datetime.utcnow()
+        message.body = None
+        message.last_error = None
+        self.sent += 1
+
+    def _mark_failed(self, message, error):
+        config = self.app.config
+        message.attempts += 1
+        message.last_error = str(error)
+        if message.attempts >= config['MAIL_OUTBOX_MAX_ATTEMPTS']:
+            message.status = 'failed'
+            message.body = None
+            self.failed += 1
+            print(f"Giving up on email {message.id} to {message.recipient}: {str(error)}")
+        else:
+            backoff = min(config['MAIL_OUTBOX_BACKOFF'] * 2 ** (message.attempts - 1), 3600)
+            message.next_attempt_at = datetime.utcnow() + timedelta(seconds=backoff)
+            self.retried += 1
+
+    def queue_depth(self):
+        return EmailOutbox.query.filter_by(status='pending').count()
+
+    def stats(self):
+        return {
+            'queue_depth': self.queue_depth(),
+            'sent': self.sent,
+            'failed': self.failed,
+            'retried': self.retried,
+            'dispatcher_running': self._thread is not None and self._thread.is_alive()
+        }
+
+
+mail_outbox = MailOutbox()
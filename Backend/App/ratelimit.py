@@ -0,0 +1,100 @@
+from collections import OrderedDict
+from flask import jsonify, request
+from functools import wraps
+import math
+import threading
+import time
+
+
+class TokenBucketLimiter:
+    """In-memory token buckets split across independently locked shards.
+
+    Each active key costs one small list ([tokens, last_refill]). A bucket
+    that has refilled completely is indistinguishable from a new one, so idle
+    keys are dropped as the shard is touched; the LRU cap bounds the rest.
+    """
+
+    def __init__(self, per_minute, burst, shards=16, max_keys_per_shard=4096):
+        self.rate = per_minute / 60.0  # tokens per second
+        self.burst = float(burst)
+        self.max_keys_per_shard = max_keys_per_shard
+        self._idle_after = self.burst / self.rate if self.rate else float('inf')
+        self._shards = [(threading.Lock(), OrderedDict()) for _ in range(shards)]
+
+    def hit(self, key):
+        """Take one token for key; returns 0 if allowed, else seconds until retry"""
+        lock, buckets = self._shards[hash(key) % len(self._shards)]
+        now = time.monotonic()
+        with lock:
+            bucket = buckets.get(key)
+            if bucket is None:
+                bucket = buckets[key] = [self.burst, now]
+                if len(buckets) > self.max_keys_per_shard:
+                    buckets.popitem(last=False)
+            else:
+                buckets.move_to_end(key)
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+
+            # Evict the least recently used key if it has fully refilled
+            oldest_key = next(iter(buckets))
+            if oldest_key != key and now - buckets[oldest_key][1] >= self._idle_after:
+                del buckets[oldest_key]
+
+            if bucket[0] >= 1.0:
+                bucket[0] -= 1.0
+                return 0.0
+            return (1.0 - bucket[0]) / self.rate if self.rate else float('inf')
+
+    def __len__(self):
+        return sum(len(buckets) for _, buckets in self._shards)
+
+
+class AuthRateLimiter:
+    """Per-IP and per-email limits for the credential endpoints"""
+
+    def __init__(self):
+        self.enabled = True
+        self.by_ip = TokenBucketLimiter(per_minute=30, burst=10)
+        self.by_email = TokenBucketLimiter(per_minute=5, burst=5)
+        self.rejected = 0
+
+    def init_app(self, app):
+        self.enabled = app.config.setdefault('AUTH_RATE_LIMIT_ENABLED', True)
+        self.by_ip = TokenBucketLimiter(
+            per_minute=app.config.setdefault('AUTH_RATE_LIMIT_IP_PER_MINUTE', 30),
+            burst=app.config.setdefault('AUTH_RATE_LIMIT_IP_BURST', 10)
+        )
+        self.by_email = TokenBucketLimiter(
+            per_minute=app.config.setdefault('AUTH_RATE_LIMIT_EMAIL_PER_MINUTE', 5),
+            burst=app.config.setdefault('AUTH_RATE_LIMIT_EMAIL_BURST', 5)
+        )
+        app.extensions['auth_rate_limiter'] = self
+
+    def check(self, ip, email=None):
+        """Returns 0 if the attempt may proceed, else seconds until retry"""
+        retry_after = self.by_ip.hit(ip)
+        if not retry_after and email:
+            retry_after = self.by_email.hit(email.strip().lower())
+        if retry_after:
+            self.rejected += 1
+        return retry_after
+
+
+auth_rate_limiter = AuthRateLimiter()
+
+
+def rate_limited(f):
+    """Reject excess attempts before the view touches the DB or runs scrypt"""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        if auth_rate_limiter.enabled:
+            data = request.get_json(silent=True)
+            email = data.get('email') if isinstance(data, dict) else None
+            retry_after = auth_rate_limiter.check(request.remote_addr or '', email if isinstance(email, str) else None)
+            if retry_after:
+                response = jsonify({'error': 'Too many attempts, please try again later'})
+                response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+                return response, 429
+        return f(*args, **kwargs)
+    return decorated
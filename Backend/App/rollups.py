@@ -0,0 +1,179 @@
+from flask.cli import with_appcontext
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.sqlite import insert
+from datetime import time, timedelta
+import click
+from . import db
+from .models import Sleep, SleepRollup
+
+PERIODS = ('day', 'week', 'month')
+
+
+def bucket_starts(date):
+    """The day, week (Monday) and month each date is rolled up into"""
+    return {
+        'day': date,
+        'week': date - timedelta(days=date.weekday()),
+        'month': date.replace(day=1)
+    }
+
+
+def bed_minutes(bed_time):
+    """Bed time as minutes from midnight in [-720, 720), so 23:00 and 01:00 average to midnight"""
+    return (bed_time.hour * 60 + bed_time.minute + 720) % 1440 - 720
+
+
+def wake_minutes(wake_time):
+    return wake_time.hour * 60 + wake_time.minute
+
+
+def minutes_to_time(minutes):
+    minutes = int(round(minutes)) % 1440
+    return time(minutes // 60, minutes % 60)
+
+
+def apply_deltas(user_id, deltas):
+    """Add {(period, bucket_start): [count, duration, bed, wake]} to the user's rollups.
+
+    Runs inside the caller's transaction as one upsert that adds in SQL, so concurrent
+    requests can't overwrite each other's totals; buckets that drop to zero records are removed.
+    """
+    rows = [
+        {
+            'user_id': user_id,
+            'period': period,
+            'bucket_start': bucket_start,
+            'record_count': count,
+            'total_duration': duration,
+            'bed_minutes_sum': bed,
+            'wake_minutes_sum': wake
+        }
+        for (period, bucket_start), (count, duration, bed, wake) in deltas.items()
+        if count or duration or bed or wake  # Skip buckets an edit left unchanged
+    ]
+    if not rows:
+        return
+    upsert = insert(SleepRollup)
+    upsert = upsert.on_conflict_do_update(
+        index_elements=['user_id', 'period', 'bucket_start'],
+        set_={
+            column: getattr(SleepRollup, column) + getattr(upsert.excluded, column)
+            for column in ('record_count', 'total_duration', 'bed_minutes_sum', 'wake_minutes_sum')
+        }
+    )
+    db.session.execute(upsert, rows)
+    db.session.execute(
+        delete(SleepRollup)
+        .where(SleepRollup.user_id == user_id, SleepRollup.record_count <= 0)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def accumulate(deltas, date, bed_time, wake_time, duration, sign=1):
+    bed = bed_minutes(bed_time)
+    wake = wake_minutes(wake_time)
+    for period, bucket_start in bucket_starts(date).items():
+        totals = deltas.setdefault((period, bucket_start), [0, 0, 0, 0])
+        totals[0] += sign
+        totals[1] += sign * duration
+        totals[2] += sign * bed
+        totals[3] += sign * wake
+    return deltas
+
+
+def snapshot(record):
+    return record.date, record.bed_time, record.wake_time, record.sleep_duration
+
+
+def record_added(record):
+    apply_deltas(record.user_id, accumulate({}, *snapshot(record)))
+
+
+def record_removed(record):
+    apply_deltas(record.user_id, accumulate({}, *snapshot(record), sign=-1))
+
+
+def record_replaced(old_snapshot, record):
+    """Move a record's contribution from its old values to its current ones"""
+    deltas = accumulate({}, *old_snapshot, sign=-1)
+    apply_deltas(record.user_id, accumulate(deltas, *snapshot(record)))
+
+
+def summarize(user_id, period, start=None, end=None):
+    """Per-bucket averages and range totals, reading one row per bucket"""
+    query = select(SleepRollup).where(SleepRollup.user_id == user_id, SleepRollup.period == period)
+    if start:
+        query = query.where(SleepRollup.bucket_start >= bucket_starts(start)[period])
+    if end:
+        query = query.where(SleepRollup.bucket_start <= end)
+    rows = db.session.execute(query.order_by(SleepRollup.bucket_start)).scalars().all()
+
+    buckets = []
+    totals = [0, 0, 0, 0]
+    for rollup in rows:
+        count = rollup.record_count
+        buckets.append({
+            'start': rollup.bucket_start.strftime('%Y-%m-%d'),
+            'count': count,
+            'total_duration': rollup.total_duration,
+            'average_duration': round(rollup.total_duration / count, 2),
+            'average_bed_time': minutes_to_time(rollup.bed_minutes_sum / count).strftime('%H:%M'),
+            'average_wake_time': minutes_to_time(rollup.wake_minutes_sum / count).strftime('%H:%M')
+        })
+        totals[0] += count
+        totals[1] += rollup.total_duration
+        totals[2] += rollup.bed_minutes_sum
+        totals[3] += rollup.wake_minutes_sum
+
+    count = totals[0]
+    return {
+        'period': period,
+        'buckets': buckets,
+        'totals': {
+            'count': count,
+            'total_duration': totals[1],
+            'average_duration': round(totals[1] / count, 2) if count else None,
+            'average_bed_time': minutes_to_time(totals[2] / count).strftime('%H:%M') if count else None,
+            'average_wake_time': minutes_to_time(totals[3] / count).strftime('%H:%M') if count else None
+        }
+    }
+
+
+def rebuild(user_id=None):
+    """Recompute rollups from the sleep table, for one user or everyone"""
+    clear = delete(SleepRollup)
+    query = select(Sleep.user_id, Sleep.date, Sleep.bed_time, Sleep.wake_time, Sleep.sleep_duration)
+    if user_id is not None:
+        clear = clear.where(SleepRollup.user_id == user_id)
+        query = query.where(Sleep.user_id == user_id)
+    db.session.execute(clear)
+
+    per_user = {}
+    for row in db.session.execute(query.execution_options(yield_per=1000)):
+        accumulate(per_user.setdefault(row.user_id, {}), row.date, row.bed_time, row.wake_time, row.sleep_duration)
+
+    rows = [
+        {
+            'user_id': uid,
+            'period': period,
+            'bucket_start': bucket_start,
+            'record_count': count,
+            'total_duration': duration,
+            'bed_minutes_sum': bed,
+            'wake_minutes_sum': wake
+        }
+        for uid, deltas in per_user.items()
+        for (period, bucket_start), (count, duration, bed, wake) in deltas.items()
+    ]
+    if rows:
+        db.session.execute(SleepRollup.__table__.insert(), rows)
+    db.session.commit()
+    return len(rows)
+
+
+@click.command('rebuild-sleep-rollups')
+@click.option('--user-id', type=int, default=None, help='Only rebuild this user')
+@with_appcontext
+def rebuild_sleep_rollups_command(user_id):
+    """Rebuild sleep rollups from existing sleep records."""
+    print(f"Rebuilt {rebuild(user_id)} sleep rollup buckets")
@@ -1,46 +1,116 @@
-from flask import jsonify, request, current_app
+from flask import jsonify, request, current_app, Response, stream_with_context
+from sqlalchemy import select, tuple_
 from . import db
+from .cache import principal_cache
+from .hashing import HashingBusy, password_hasher
 from .models import User, Sleep, WorkoutList
+from .outbox import mail_outbox
+from .ratelimit import rate_limited
+from .sleep_import import CSV_TYPES, NDJSON_TYPES, ImportInterrupted, import_sleep_records
+from . import rollups
+from .analytics import analyze_user
+from . import workouts
+from .leaderboard import leaderboard
+from . import controllers
 from datetime import datetime, timedelta
 import jwt
 from functools import wraps
-from werkzeug.security import generate_password_hash
 import os
 import random
 import string
-from flask_mail import Mail, Message
+import base64
+import json
 import traceback
 
-mail = Mail()
+SLEEP_PAGE_SIZE = 100
+MAX_SLEEP_PAGE_SIZE = 1000
 
 def generate_temp_password(length=12):
     """Generate a random temporary password"""
     characters = string.ascii_letters + string.digits + "!@#$%^&*"
     return ''.join(random.choice(characters) for i in range(length))
 
-def send_password_email(email, password):
-    """Send email with temporary password"""
-    try:
-        msg = Message(
-            'Your Temporary Password',
-            sender=current_app.config['MAIL_DEFAULT_SENDER'],
-            recipients=[email]
-        )
-        msg.body = f'''Your temporary password is: {password}
+def queue_password_email(email, password):
+    """Queue the temporary-password email in the outbox (sent after commit)"""
+    return mail_outbox.enqueue(
+        email,
+        'Your Temporary Password',
+        f'''Your temporary password is: {password}
         
 Please use this password to log in and change it immediately for security purposes.
 
 Best regards,
 The Fitness App Team
 '''
-        print(f"Attempting to send email to {email}")  # Debug print
-        mail.send(msg)
-        print("Email sent successfully")  # Debug print
-        return True
-    except Exception as e:
-        print(f"Error sending email: {str(e)}")  # Debug print
-        print(f"Traceback: {traceback.format_exc()}")  # Print full traceback
-        return False
+    )
+
+def hashing_busy_response():
+    response = jsonify({'error': 'Server is busy, please try again shortly'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+def load_principal(token):
+    """Resolve a bearer token to a User, using the principal cache when possible"""
+    user_id = principal_cache.get_user_id(token)
+    if user_id is None:
+        data = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=["HS256"])
+        user_id = data['user_id']
+        principal_cache.add_token(token, user_id, data.get('exp'))
+
+    user = principal_cache.get_user(user_id)
+    if user is None:
+        user = User.query.filter_by(id=user_id).first()
+        if user is None:
+            return None
+        # Keep a detached copy in the cache so later commits can't expire it
+        db.session.expunge(user)
+        principal_cache.add_user(user)
+
+    # Attach to this request's session without issuing a SELECT
+    return db.session.merge(user, load=False)
+
+def serialize_sleep_row(row):
+    return {
+        'id': row.id,
+        'date': row.date.strftime('%Y-%m-%d'),
+        'bed_time': row.bed_time.strftime('%H:%M'),
+        'wake_time': row.wake_time.strftime('%H:%M'),
+        'duration': row.sleep_duration,
+        'quality': 'good'  # Default quality
+    }
+
+def encode_sleep_cursor(row):
+    raw = f"{row.date.strftime('%Y-%m-%d')}:{row.id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_sleep_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        cursor_date, cursor_id = raw.split(':')
+        return datetime.strptime(cursor_date, '%Y-%m-%d').date(), int(cursor_id)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError('Invalid cursor')
+
+def stream_sleep_records(query, limit=None):
+    """Write the sleep_records JSON document row by row as the cursor yields them"""
+    yield '{"sleep_records": ['
+    result = db.session.execute(query.execution_options(yield_per=500))
+    last_row = None
+    has_more = False
+    count = 0
+    for row in result:
+        if limit and count == limit:
+            has_more = True  # This is the look-ahead row
+            break
+        yield (',' if count else '') + json.dumps(serialize_sleep_row(row))
+        last_row = row
+        count += 1
+    result.close()
+    if limit:
+        next_cursor = encode_sleep_cursor(last_row) if has_more else None
+        yield '], "next_cursor": ' + json.dumps(next_cursor) + '}'
+    else:
+        yield ']}'
 
 def token_required(f):
     @wraps(f)
@@ -50,18 +120,17 @@ def token_required(f):
             return jsonify({'message': 'Token is missing'}), 401
         try:
             token = token.split(' ')[1]  # Remove 'Bearer ' prefix
-            data = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=["HS256"])
-            current_user = User.query.filter_by(id=data['user_id']).first()
+            current_user = load_principal(token)
         except:
             return jsonify({'message': 'Token is invalid'}), 401
+        if current_user is None:
+            return jsonify({'message': 'Token is invalid'}), 401
         return f(current_user, *args, **kwargs)
     return decorated
 
 def init_auth_routes(app):
-    # Initialize Flask-Mail with the app
-    mail.init_app(app)
-
     @app.route('/api/auth/signup', methods=['POST'])
+    @rate_limited
     def signup():
         data = request.get_json()
         
@@ -111,11 +180,15 @@ def init_auth_routes(app):
                 }
             }), 201
 
+        except HashingBusy:
+            db.session.rollback()
+            return hashing_busy_response()
         except Exception as e:
             db.session.rollback()
             return jsonify({'error': str(e)}), 400
 
     @app.route('/api/auth/login', methods=['POST'])
+    @rate_limited
     def login():
         data = request.get_json()
         
@@ -124,8 +197,17 @@ def init_auth_routes(app):
 
         user = User.query.filter_by(email=data['email']).first()
 
-        if not user or not user.verifyPassword(data['password']):
-            return jsonify({'error': 'Invalid email or password'}), 401
+        try:
+            if not user or not user.verifyPassword(data['password']):
+                return jsonify({'error': 'Invalid email or password'}), 401
+
+            # Upgrade hashes made with old scrypt parameters while we have the password
+            if password_hasher.needs_rehash(user.password_hash):
+                user.set_password(data['password'])
+                db.session.commit()
+        except HashingBusy:
+            db.session.rollback()
+            return hashing_busy_response()
 
         token = jwt.encode({
             'user_id': user.id,
@@ -163,27 +245,21 @@ def init_auth_routes(app):
             temp_password = generate_temp_password()
             print(f"Generated temporary password")  # Debug print
             
-            # Update user's password in database
-            user.password = temp_password
+            # Update the password and queue the email in one transaction
+            user.set_password(temp_password)
+            queue_password_email(user.email, temp_password)
             db.session.commit()
-            print(f"Password updated in database")  # Debug print
-            
-            # Print mail configuration
-            print(f"Mail Configuration:")
-            print(f"MAIL_SERVER: {current_app.config.get('MAIL_SERVER')}")
-            print(f"MAIL_PORT: {current_app.config.get('MAIL_PORT')}")
-            print(f"MAIL_USE_TLS: {current_app.config.get('MAIL_USE_TLS')}")
-            print(f"MAIL_USERNAME: {current_app.config.get('MAIL_USERNAME')}")
-            print(f"MAIL_DEFAULT_SENDER: {current_app.config.get('MAIL_DEFAULT_SENDER')}")
-            
-            # Send email with temporary password
-            if send_password_email(user.email, temp_password):
-                return jsonify({
-                    'message': 'Your password has been sent to your email'
-                }), 200
-            else:
-                return jsonify({'error': 'Failed to send email'}), 500
+            principal_cache.invalidate_user(user.id)
+            mail_outbox.notify()
+            print(f"Password updated and email queued")  # Debug print
+
+            return jsonify({
+                'message': 'Your new password is queued and will be emailed to you shortly'
+            }), 200
             
+        except HashingBusy:
+            db.session.rollback()
+            return hashing_busy_response()
         except Exception as e:
             db.session.rollback()
             print(f"Error in reset_password: {str(e)}")  # Debug print
@@ -203,6 +279,11 @@ def init_auth_routes(app):
             }
         }), 200
 
+    @app.route('/api/mail/outbox-stats', methods=['GET'])
+    @token_required
+    def mail_outbox_stats(current_user):
+        return jsonify(mail_outbox.stats()), 200
+
     # Sleep tracking routes
     @app.route('/api/sleep', methods=['POST'])
     @token_required
@@ -223,8 +304,9 @@ def init_auth_routes(app):
                 wake_time=wake_time
             )
             
-            # Add and commit to database
+            # Add and commit to database, keeping the rollups in the same transaction
             db.session.add(sleep_record)
+            rollups.record_added(sleep_record)
             db.session.commit()
             
             return jsonify({
@@ -244,6 +326,30 @@ def init_auth_routes(app):
             print(f"Error adding sleep record: {str(e)}")  # Add debug print
             return jsonify({'error': str(e)}), 400
 
+    @app.route('/api/sleep/import', methods=['POST'])
+    @token_required
+    def import_sleep(current_user):
+        content_type = (request.mimetype or '').lower()
+        if content_type not in CSV_TYPES and content_type not in NDJSON_TYPES:
+            return jsonify({'error': 'Upload must be CSV (text/csv) or NDJSON (application/x-ndjson)'}), 415
+
+        user_id = current_user.id  # Read before the chunk commits expire current_user
+        try:
+            result = import_sleep_records(
+                user_id,
+                request.stream,
+                content_type,
+                chunk_size=current_app.config['SLEEP_IMPORT_CHUNK_SIZE']
+            )
+        except ImportInterrupted as e:
+            # Chunks committed before the failure stay imported; say how many
+            print(f"Error importing sleep records: {str(e.__cause__)}")
+            return jsonify(dict(e.result, error=str(e))), 500 if e.database_error else 400
+
+        if not result['imported']:
+            return jsonify(dict(result, error='No valid sleep records found')), 400
+        return jsonify(dict(result, message='Sleep records imported successfully')), 201
+
     @app.route('/api/sleep', methods=['GET'])
     @token_required
     def get_sleep_records(current_user):
@@ -251,34 +357,87 @@ def init_auth_routes(app):
             # Get date range from query parameters
             start_date = request.args.get('start_date')
             end_date = request.args.get('end_date')
-            
-            query = Sleep.query.filter_by(user_id=current_user.id)
+            limit = request.args.get('limit', type=int)
+            cursor = request.args.get('cursor')
+            stream = request.args.get('stream', '').lower() in ('1', 'true')
+
+            query = select(
+                Sleep.id, Sleep.date, Sleep.bed_time, Sleep.wake_time, Sleep.sleep_duration
+            ).where(Sleep.user_id == current_user.id)
             
             if start_date:
                 start = datetime.strptime(start_date, '%Y-%m-%d').date()
-                query = query.filter(Sleep.date >= start)
+                query = query.where(Sleep.date >= start)
             
             if end_date:
                 end = datetime.strptime(end_date, '%Y-%m-%d').date()
-                query = query.filter(Sleep.date <= end)
-            
-            sleep_records = query.order_by(Sleep.date.desc()).all()
-            
-            return jsonify({
-                'sleep_records': [{
-                    'id': record.id,
-                    'date': record.date.strftime('%Y-%m-%d'),
-                    'bed_time': record.bed_time.strftime('%H:%M'),
-                    'wake_time': record.wake_time.strftime('%H:%M'),
-                    'duration': record.sleep_duration,
-                    'quality': 'good'  # Default quality
-                } for record in sleep_records]
-            }), 200
+                query = query.where(Sleep.date <= end)
+
+            # Keyset pagination: resume strictly after the last (date, id) seen
+            if cursor:
+                cursor_date, cursor_id = decode_sleep_cursor(cursor)
+                query = query.where(tuple_(Sleep.date, Sleep.id) < (cursor_date, cursor_id))
+            if cursor and not limit:
+                limit = SLEEP_PAGE_SIZE
+            if limit:
+                limit = max(1, min(limit, MAX_SLEEP_PAGE_SIZE))
+                query = query.limit(limit + 1)  # One extra row tells us if there is a next page
+
+            query = query.order_by(Sleep.date.desc(), Sleep.id.desc())
+
+            if stream:
+                return Response(
+                    stream_with_context(stream_sleep_records(query, limit)),
+                    mimetype='application/json'
+                )
+
+            rows = db.session.execute(query).all()
+            next_cursor = None
+            if limit and len(rows) > limit:
+                rows = rows[:limit]
+                next_cursor = encode_sleep_cursor(rows[-1])
+
+            response = {'sleep_records': [serialize_sleep_row(row) for row in rows]}
+            if limit:
+                response['next_cursor'] = next_cursor
+            return jsonify(response), 200
             
         except Exception as e:
             print(f"Error getting sleep records: {str(e)}")  # Add debug print
             return jsonify({'error': str(e)}), 400
 
+    @app.route('/api/sleep/summary', methods=['GET'])
+    @token_required
+    def get_sleep_summary(current_user):
+        try:
+            period = request.args.get('period', 'week')
+            if period not in rollups.PERIODS:
+                return jsonify({'error': f"period must be one of {', '.join(rollups.PERIODS)}"}), 400
+
+            start_date = request.args.get('start_date')
+            end_date = request.args.get('end_date')
+            start = datetime.strptime(start_date, '%Y-%m-%d').date() if start_date else None
+            end = datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else None
+
+            return jsonify(rollups.summarize(current_user.id, period, start, end)), 200
+
+        except Exception as e:
+            print(f"Error getting sleep summary: {str(e)}")
+            return jsonify({'error': str(e)}), 400
+
+    @app.route('/api/sleep/analytics', methods=['GET'])
+    @token_required
+    def get_sleep_analytics(current_user):
+        try:
+            analytics = analyze_user(current_user)
+            if analytics is None:
+                return jsonify({'error': 'Not enough sleep records to analyse'}), 404
+            return jsonify(analytics), 200
+
+        except Exception as e:
+            print(f"Error computing sleep analytics: {str(e)}")
+            return jsonify({'error': str(e)}), 400
+
     @app.route('/api/sleep/<int:record_id>', methods=['PUT'])
     @token_required
     def update_sleep_record(current_user, record_id):
@@ -289,6 +448,7 @@ def init_auth_routes(app):
             
         try:
             data = request.get_json()
+            previous = rollups.snapshot(sleep_record)
             
             if 'date' in data:
                 sleep_record.date = datetime.strptime(data['date'], '%Y-%m-%d').date()
@@ -298,6 +458,7 @@ def init_auth_routes(app):
                 sleep_record.wake_time = datetime.strptime(data['wakeTime'], '%H:%M').time()
             
             sleep_record.sleep_duration = sleep_record.get_sleep_duration()
+            rollups.record_replaced(previous, sleep_record)
             db.session.commit()
             
             return jsonify({
@@ -326,6 +487,7 @@ def init_auth_routes(app):
             return jsonify({'error': 'Sleep record not found'}), 404
             
         try:
+            rollups.record_removed(sleep_record)
             db.session.delete(sleep_record)
             db.session.commit()
             return jsonify({'message': 'Sleep record deleted successfully'}), 200
@@ -340,21 +502,7 @@ def init_auth_routes(app):
     @token_required
     def get_workout_stats(current_user):
         try:
-            # Get workouts for the current user
-            workouts = WorkoutList.query.filter_by(user_id=current_user.id).all()
-            
-            # Calculate total workouts completed
-            total_workouts = len(workouts)
-            
-            # Calculate total calories burned (based on workout duration and difficulty)
-            total_calories = sum([
-                workout.duration * {
-                    'easy': 5,      # 5 calories per minute for easy workouts
-                    'medium': 7,    # 7 calories per minute for medium workouts
-                    'hard': 10      # 10 calories per minute for hard workouts
-                }.get(workout.difficulty.lower(), 5)  # default to 5 if difficulty not recognized
-                for workout in workouts
-            ])
+            total_workouts, total_calories = workouts.get_stats(current_user.id)
             
             return jsonify({
                 'total_workouts': total_workouts,
@@ -365,6 +513,34 @@ def init_auth_routes(app):
             print(f"Error getting workout stats: {str(e)}")
             return jsonify({'error': str(e)}), 400
 
+    @app.route('/api/workouts/calendar', methods=['GET'])
+    @token_required
+    def get_workout_calendar(current_user):
+        try:
+            month = request.args.get('month') or datetime.utcnow().strftime('%Y-%m')
+            datetime.strptime(month, '%Y-%m')  # Validate the format
+            return jsonify(workouts.month_view(current_user.id, month)), 200
+
+        except Exception as e:
+            print(f"Error getting workout calendar: {str(e)}")
+            return jsonify({'error': str(e)}), 400
+
+    @app.route('/api/leaderboard', methods=['GET'])
+    @token_required
+    def get_leaderboard(current_user):
+        try:
+            limit = max(1, min(request.args.get('limit', 10, type=int), 100))
+            return jsonify({
+                'week_start': leaderboard.week_start.strftime('%Y-%m-%d'),
+                'participants': leaderboard.size(),
+                'entries': leaderboard.top(limit),
+                'me': leaderboard.rank_of(current_user.id)
+            }), 200
+
+        except Exception as e:
+            print(f"Error getting leaderboard: {str(e)}")
+            return jsonify({'error': str(e)}), 400
+
     @app.route('/api/workouts', methods=['POST'])
     @token_required
     def add_workout(current_user):
@@ -380,8 +556,13 @@ def init_auth_routes(app):
                 date=datetime.strptime(data['date'], '%Y-%m-%d').date() if 'date' in data else None
             )
             
+            user_id = current_user.id
+            name = leaderboard.display_name(current_user.first_name, current_user.last_name)
             db.session.add(workout)
+            calories = workouts.record_workout(workout)
             db.session.commit()
+            workouts.invalidate_month(user_id, workout.date)
+            leaderboard.record(user_id, name, calories, workout.date)
             
             return jsonify({
                 'message': 'Workout added successfully',
@@ -398,3 +579,56 @@ def init_auth_routes(app):
             db.session.rollback()
             print(f"Error adding workout: {str(e)}")
             return jsonify({'error': str(e)}), 400
+
+    @app.route('/api/workouts/track', methods=['GET'])
+    @token_required
+    def track_workout(current_user):
+        try:
+            return controllers.track_workout(current_user)
+
+        except Exception as e:
+            print(f"Error tracking workout: {str(e)}")
+            return jsonify({'error': str(e)}), 400
+
+    # Workout schedule routes (recurrences are expanded on read, never stored)
+    @app.route('/api/workouts/schedules', methods=['POST'])
+    @token_required
+    def create_workout_schedule(current_user):
+        try:
+            return controllers.schedule_workout(current_user)
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error scheduling workout: {str(e)}")
+            return jsonify({'error': str(e)}), 400
+
+    @app.route('/api/workouts/schedules', methods=['GET'])
+    @token_required
+    def get_workout_schedules(current_user):
+        try:
+            return controllers.list_schedules(current_user)
+
+        except Exception as e:
+            print(f"Error getting workout schedules: {str(e)}")
+            return jsonify({'error': str(e)}), 400
+
+    @app.route('/api/workouts/schedules/<int:schedule_id>', methods=['DELETE'])
+    @token_required
+    def delete_workout_schedule(current_user, schedule_id):
+        try:
+            return controllers.delete_schedule(current_user, schedule_id)
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error deleting workout schedule: {str(e)}")
+            return jsonify({'error': str(e)}), 400
+
+    @app.route('/api/workouts/schedules/occurrences', methods=['GET'])
+    @token_required
+    def get_workout_occurrences(current_user):
+        try:
+            return controllers.upcoming_workouts(current_user)
+
+        except Exception as e:
+            print(f"Error expanding workout schedules: {str(e)}")
+            return jsonify({'error': str(e)}), 400
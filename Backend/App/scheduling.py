@@ -0,0 +1,236 @@
+from collections import namedtuple
+from datetime import datetime, timedelta
+import heapq
+import threading
+import traceback
+from . import db
+from .models import User, WorkoutSchedule
+
+WEEKDAY_NAMES = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+
+# The parts of a schedule the dispatcher needs, kept in memory instead of re-read from the DB
+ScheduleSpec = namedtuple('ScheduleSpec', [
+    'id', 'user_id', 'email', 'workout_type', 'difficulty', 'duration', 'weekdays',
+    'time_of_day', 'start_date', 'end_date', 'interval_weeks', 'remind_minutes_before'
+])
+
+
+def weekdays_mask(names):
+    """['mon', 'wed', 'fri'] -> bitmask"""
+    mask = 0
+    for name in names:
+        key = str(name).strip().lower()[:3]
+        if key not in WEEKDAY_NAMES:
+            raise ValueError(f'Unknown weekday: {name}')
+        mask |= 1 << WEEKDAY_NAMES.index(key)
+    return mask
+
+
+def weekdays_names(mask):
+    return [name for i, name in enumerate(WEEKDAY_NAMES) if mask & (1 << i)]
+
+
+def iter_occurrences(schedule, window_start, window_end=None):
+    """Lazily yield occurrence datetimes of a schedule from window_start (a date) onwards.
+
+    Works on a WorkoutSchedule or a ScheduleSpec. With no window_end the
+    generator is unbounded unless the schedule itself ends, so callers take
+    only what they need.
+    """
+    days = [i for i in range(7) if schedule.weekdays & (1 << i)]
+    if not days:
+        return
+    first = max(schedule.start_date, window_start)
+    last = schedule.end_date
+    if window_end is not None:
+        last = window_end if last is None else min(last, window_end)
+    if last is not None and first > last:
+        return
+
+    interval = max(schedule.interval_weeks or 1, 1)
+    anchor = schedule.start_date - timedelta(days=schedule.start_date.weekday())
+    week = first - timedelta(days=first.weekday())
+    # Jump straight to the first week that is "on" for this interval
+    behind = ((week - anchor).days // 7) % interval
+    if behind:
+        week += timedelta(weeks=interval - behind)
+
+    while last is None or week <= last:
+        for offset in days:
+            day = week + timedelta(days=offset)
+            if day < first:
+                continue
+            if last is not None and day > last:
+                return
+            yield datetime.combine(day, schedule.time_of_day)
+        week += timedelta(weeks=interval)
+
+
+def _tagged_occurrences(schedule, window_start, window_end):
+    for when in iter_occurrences(schedule, window_start, window_end):
+        yield when, schedule
+
+
+def merge_occurrences(schedules, window_start, window_end):
+    """(datetime, schedule) pairs of several schedules in time order, still lazily"""
+    streams = [_tagged_occurrences(schedule, window_start, window_end) for schedule in schedules]
+    return heapq.merge(*streams, key=lambda item: item[0])
+
+
+def next_reminder(spec, after):
+    """(reminder time, occurrence time) of the first reminder strictly after `after`"""
+    lead = timedelta(minutes=spec.remind_minutes_before)
+    for occurrence in iter_occurrences(spec, (after + lead).date()):
+        if occurrence - lead > after:
+            return occurrence - lead, occurrence
+    return None
+
+
+class ReminderDispatcher:
+    """One thread, one min-heap holding the next due reminder of every schedule.
+
+    Schedules are loaded once at startup; creating or deleting a schedule
+    updates the heap directly, so the database is never polled. Stale heap
+    entries (deleted or replaced schedules) are skipped when popped.
+    """
+
+    def __init__(self):
+        self.app = None
+        self._heap = []  # (remind_at, schedule_id, version, occurrence)
+        self._specs = {}  # schedule_id -> (version, ScheduleSpec)
+        self._version = 0
+        self._condition = threading.Condition()
+        self._stop = False
+        self._thread = None
+        self.sent = 0
+
+    def init_app(self, app):
+        self.app = app
+        app.extensions['reminder_dispatcher'] = self
+
+    def load(self):
+        """Read every schedule with reminders once (needs an app context)"""
+        rows = db.session.execute(
+            db.select(WorkoutSchedule, User.email)
+            .join(User, User.id == WorkoutSchedule.user_id)
+            .where(WorkoutSchedule.remind_minutes_before.isnot(None))
+        ).all()
+        now = datetime.now()
+        with self._condition:
+            self._heap = []
+            self._specs = {}
+            for schedule, email in rows:
+                self._track(self.spec_for(schedule, email), now)
+            heapq.heapify(self._heap)
+            self._condition.notify()
+
+    @staticmethod
+    def spec_for(schedule, email):
+        return ScheduleSpec(
+            schedule.id, schedule.user_id, email, schedule.workout_type, schedule.difficulty,
+            schedule.duration, schedule.weekdays, schedule.time_of_day, schedule.start_date,
+            schedule.end_date, schedule.interval_weeks, schedule.remind_minutes_before
+        )
+
+    def _track(self, spec, after, push=None):
+        self._version += 1
+        self._specs[spec.id] = (self._version, spec)
+        upcoming = next_reminder(spec, after)
+        if upcoming is not None:
+            entry = (upcoming[0], spec.id, self._version, upcoming[1])
+            if push:
+                heapq.heappush(self._heap, entry)
+            else:
+                self._heap.append(entry)
+
+    def add(self, spec):
+        if spec.remind_minutes_before is None:
+            return
+        with self._condition:
+            self._track(spec, datetime.now(), push=True)
+            self._condition.notify()
+
+    def remove(self, schedule_id):
+        with self._condition:
+            self._specs.pop(schedule_id, None)
+
+    def pending(self):
+        with self._condition:
+            return len(self._specs)
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop = False
+        self._thread = threading.Thread(target=self._run, name='workout-reminders', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._condition:
+            self._stop = True
+            self._condition.notify()
+
+    def _pop_due(self):
+        """Block until at least one live reminder is due, then pop all that are"""
+        with self._condition:
+            while not self._stop:
+                # Drop entries for deleted or replaced schedules
+                while self._heap and self._specs.get(self._heap[0][1], (None,))[0] != self._heap[0][2]:
+                    heapq.heappop(self._heap)
+                if not self._heap:
+                    self._condition.wait()
+                    continue
+                now = datetime.now()
+                wait = (self._heap[0][0] - now).total_seconds()
+                if wait > 0:
+                    self._condition.wait(wait)
+                    continue
+
+                due = []
+                while self._heap and self._heap[0][0] <= now:
+                    remind_at, schedule_id, version, occurrence = heapq.heappop(self._heap)
+                    current = self._specs.get(schedule_id)
+                    if current is None or current[0] != version:
+                        continue
+                    spec = current[1]
+                    due.append((spec, occurrence))
+                    upcoming = next_reminder(spec, remind_at)
+                    if upcoming is not None:
+                        heapq.heappush(self._heap, (upcoming[0], schedule_id, version, upcoming[1]))
+                    else:
+                        del self._specs[schedule_id]  # The schedule has ended
+                return due
+            return []
+
+    def _run(self):
+        while True:
+            due = self._pop_due()
+            if self._stop:
+                return
+            try:
+                with self.app.app_context():
+                    self.send(due)
+            except Exception as e:
+                print(f"Error sending workout reminders: {str(e)}")
+                print(f"Traceback: {traceback.format_exc()}")
+
+    def send(self, due):
+        """Queue reminder emails through the outbox in one transaction"""
+        from .outbox import mail_outbox
+        for spec, occurrence in due:
+            mail_outbox.enqueue(
+                spec.email,
+                f'Reminder: {spec.workout_type} at {occurrence.strftime("%H:%M")}',
+                f'''Your {spec.difficulty} {spec.workout_type} workout ({spec.duration} minutes) starts at {occurrence.strftime("%H:%M on %A, %d %B")}.
+
+Best regards,
+The Fitness App Team
+'''
+            )
+        db.session.commit()
+        db.session.remove()
+        mail_outbox.notify()
+        self.sent += len(due)
+
+
+reminder_dispatcher = ReminderDispatcher()
@@ -0,0 +1,125 @@
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+from datetime import datetime
+import csv
+import io
+import json
+from . import db
+from .models import Sleep, sleep_duration_hours
+from . import rollups
+
+CSV_TYPES = {'text/csv', 'application/csv'}
+NDJSON_TYPES = {'application/x-ndjson', 'application/ndjson', 'application/jsonl'}
+MAX_REPORTED_ERRORS = 100
+
+
+class ImportInterrupted(Exception):
+    """The upload could not be read or stored to the end; earlier chunks stay committed"""
+
+    def __init__(self, message, result, database_error=False):
+        super().__init__(message)
+        self.result = result
+        self.database_error = database_error
+
+
+def iter_raw_rows(stream, content_type):
+    """Yield (line_number, dict) pairs from a CSV or NDJSON body without buffering it"""
+    text = io.TextIOWrapper(io.BufferedReader(stream), encoding='utf-8-sig', newline='')
+    if content_type in CSV_TYPES:
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, row
+    else:
+        for line_number, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                yield line_number, None
+                continue
+            yield line_number, row
+
+
+def parse_row(row):
+    """Validate one record, accepting the same field names as POST /api/sleep"""
+    if not isinstance(row, dict):
+        raise ValueError('Row is not a valid record')
+    for field in ('date', 'sleepTime', 'wakeTime'):
+        if not row.get(field):
+            raise ValueError(f'{field} is required')
+    return (
+        datetime.strptime(row['date'].strip(), '%Y-%m-%d').date(),
+        datetime.strptime(row['sleepTime'].strip(), '%H:%M').time(),
+        datetime.strptime(row['wakeTime'].strip(), '%H:%M').time()
+    )
+
+
+def insert_chunk(user_id, parsed):
+    """Insert a chunk of (date, bed_time, wake_time) tuples with one executemany"""
+    durations = [sleep_duration_hours(bed_time, wake_time) for _, bed_time, wake_time in parsed]
+    db.session.execute(insert(Sleep), [
+        {
+            'user_id': user_id,
+            'date': date,
+            'bed_time': bed_time,
+            'wake_time': wake_time,
+            'sleep_duration': duration
+        }
+        for (date, bed_time, wake_time), duration in zip(parsed, durations)
+    ])
+
+    # Fold the whole chunk into the rollups before the same commit
+    deltas = {}
+    for (date, bed_time, wake_time), duration in zip(parsed, durations):
+        rollups.accumulate(deltas, date, bed_time, wake_time, duration)
+    rollups.apply_deltas(user_id, deltas)
+    db.session.commit()
+
+
+def import_sleep_records(user_id, stream, content_type, chunk_size=1000):
+    """Stream-import sleep records, committing one chunk at a time.
+
+    Memory stays bounded by the chunk size (plus the first MAX_REPORTED_ERRORS
+    error messages) regardless of how large the upload is. If reading or
+    storing fails part way, the uncommitted chunk is rolled back and
+    ImportInterrupted carries the counts of what was already committed.
+    """
+    imported = 0
+    rejected = 0
+    errors = []
+    chunk = []
+
+    def result():
+        return {
+            'imported': imported,
+            'rejected': rejected,
+            'errors': errors,
+            'errors_truncated': rejected > len(errors)
+        }
+
+    try:
+        for line_number, row in iter_raw_rows(stream, content_type):
+            try:
+                chunk.append(parse_row(row))
+            except (ValueError, TypeError, AttributeError) as e:
+                rejected += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append({'line': line_number, 'error': str(e)})
+                continue
+            if len(chunk) >= chunk_size:
+                insert_chunk(user_id, chunk)
+                imported += len(chunk)
+                chunk = []
+
+        if chunk:
+            insert_chunk(user_id, chunk)
+            imported += len(chunk)
+    except (csv.Error, UnicodeDecodeError) as e:
+        db.session.rollback()
+        raise ImportInterrupted(f'Could not read upload: {str(e)}', result()) from e
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        raise ImportInterrupted('Could not save sleep records', result(), database_error=True) from e
+
+    return result()
@@ -0,0 +1,136 @@
+from sqlalchemy import case, func, select, update
+from datetime import date
+from . import db
+from .cache import TTLCache
+from .models import WorkoutList, WorkoutStats
+
+# Calories burned per minute by difficulty
+CALORIES_PER_MINUTE = {
+    'easy': 5,
+    'medium': 7,
+    'hard': 10
+}
+DEFAULT_CALORIES_PER_MINUTE = 5  # Unrecognised difficulties
+
+# Month views keyed by (user_id, 'YYYY-MM'), dropped whenever that month changes
+month_cache = TTLCache(maxsize=2048, ttl=600)
+
+
+def init_app(app):
+    global month_cache
+    month_cache = TTLCache(
+        maxsize=app.config.setdefault('WORKOUT_CALENDAR_CACHE_SIZE', 2048),
+        ttl=app.config.setdefault('WORKOUT_CALENDAR_CACHE_TTL', 600)
+    )
+
+
+def workout_calories(difficulty, duration):
+    return int(duration) * CALORIES_PER_MINUTE.get((difficulty or '').lower(), DEFAULT_CALORIES_PER_MINUTE)
+
+
+def calories_column():
+    """SQL expression for a workout's calories, matching workout_calories()"""
+    return WorkoutList.duration * case(
+        CALORIES_PER_MINUTE,
+        value=func.lower(WorkoutList.difficulty),
+        else_=DEFAULT_CALORIES_PER_MINUTE
+    )
+
+
+def aggregate_stats(user_id):
+    """Count and calorie totals computed by SQLite over the user_id index"""
+    row = db.session.execute(
+        select(func.count(WorkoutList.id), func.coalesce(func.sum(calories_column()), 0))
+        .where(WorkoutList.user_id == user_id)
+    ).one()
+    return int(row[0]), int(row[1])
+
+
+def get_stats(user_id):
+    """Single-row lookup, seeding the counters from history the first time"""
+    stats = db.session.get(WorkoutStats, user_id)
+    if stats is None:
+        total_workouts, total_calories = aggregate_stats(user_id)
+        stats = WorkoutStats(user_id, total_workouts, total_calories)
+        db.session.add(stats)
+        db.session.commit()
+    return stats.total_workouts, stats.total_calories
+
+
+def record_workout(workout):
+    """Bump the user's counters inside the caller's transaction"""
+    calories = workout_calories(workout.difficulty, workout.duration)
+    result = db.session.execute(
+        update(WorkoutStats)
+        .where(WorkoutStats.user_id == workout.user_id)
+        .values(
+            total_workouts=WorkoutStats.total_workouts + 1,
+            total_calories=WorkoutStats.total_calories + calories
+        )
+        .execution_options(synchronize_session=False)
+    )
+    if not result.rowcount:
+        # No counters yet: seed from history, which already includes this workout after autoflush
+        total_workouts, total_calories = aggregate_stats(workout.user_id)
+        db.session.add(WorkoutStats(workout.user_id, total_workouts, total_calories))
+    return calories
+
+
+def month_bounds(month):
+    """First day of a 'YYYY-MM' month and of the month after it"""
+    year, month_number = (int(part) for part in month.split('-'))
+    start = date(year, month_number, 1)
+    end = date(year + month_number // 12, month_number % 12 + 1, 1)
+    return start, end
+
+
+def month_view(user_id, month):
+    """Per-day workout buckets for one month, served from cache when possible"""
+    start, end = month_bounds(month)
+    month = start.strftime('%Y-%m')  # '2024-3' and '2024-03' share the entry invalidate_month drops
+    key = (user_id, month)
+    view = month_cache.get(key)
+    if view is not None:
+        return view
+
+    # One row per (date, type); types are folded in Python so any character is safe in a name
+    rows = db.session.execute(
+        select(
+            WorkoutList.date,
+            WorkoutList.workout_type,
+            func.count(WorkoutList.id),
+            func.sum(WorkoutList.duration),
+            func.sum(calories_column())
+        )
+        .where(WorkoutList.user_id == user_id, WorkoutList.date >= start, WorkoutList.date < end)
+        .group_by(WorkoutList.date, WorkoutList.workout_type)
+        .order_by(WorkoutList.date)
+    ).all()
+
+    buckets = {}
+    for day, workout_type, count, minutes, calories in rows:
+        bucket = buckets.setdefault(day, {'date': day.strftime('%Y-%m-%d'), 'count': 0, 'minutes': 0,
+                                          'calories': 0, 'types': []})
+        bucket['count'] += count
+        bucket['minutes'] += int(minutes or 0)
+        bucket['calories'] += int(calories or 0)
+        bucket['types'].append(workout_type)
+    days = list(buckets.values())
+    for d in days:
+        d['types'].sort()
+    view = {
+        'month': month,
+        'days': days,
+        'totals': {
+            'count': sum(d['count'] for d in days),
+            'minutes': sum(d['minutes'] for d in days),
+            'calories': sum(d['calories'] for d in days)
+        }
+    }
+    month_cache.set(key, view)
+    return view
+
+
+def invalidate_month(user_id, day):
+    if day is not None:
+        month_cache.pop((user_id, day.strftime('%Y-%m')))
@@ -1,13 +1,27 @@
 from flask import Flask
-from .posture import posture_corrector  # Import the posture blueprint
+from .posture import posture_blueprint  # Import the posture blueprint
+from .jobs import posture_jobs, migrate as migrate_jobs
 from flask_cors import CORS
+import os
+from App import db
+from App.engine import database_url, init_app as init_engine
 
 def get_app():
     app = Flask(__name__)
     CORS(app)
-    
+
     #Register blueprints
-    app.register_blueprint(posture_corrector, url_prefix='/api')  # '/api' prefix for posture routes
-    
-    # Additional app configurations if needed
+    app.register_blueprint(posture_blueprint, url_prefix='/api')  # '/api' prefix for posture routes
+
+    # Recording jobs share the main app's database, so uploads queued here survive restarts too
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_url('sqlite:///app.db')
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # Must match the main app's SECRET_KEY so its login tokens are accepted here
+    app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'your-secret-key-here')
+    init_engine(app, db)
+    posture_jobs.init_app(app)
+    with app.app_context():
+        db.create_all()
+        migrate_jobs()
+    posture_jobs.start()
     return app
@@ -0,0 +1,54 @@
+"""Pose estimators for uploaded recordings.
+
+An estimator is any callable that takes the path of a spooled upload and
+returns (fps, frames), where frames is an (F, 17, 3) array of MoveNet
+[x, y, score] keypoints. The job queue loads one by its "module:attribute"
+name from POSTURE_ESTIMATOR. Estimators run in the job worker processes, so
+a heavy model is loaded once per worker and can keep whole cores busy.
+
+No video decoder ships in requirements.txt yet, so the default is
+stub_estimator. It makes a deterministic clip from the file's size, so the
+queue, the analysis and the endpoints can run end to end without one.
+"""
+import importlib
+import os
+import time
+
+import numpy as np
+
+STUB_FPS = 30
+STUB_BYTES_PER_SECOND = 100 * 1024  # Roughly a 480p webcam recording
+STUB_MAX_SECONDS = 120
+
+
+def load_estimator(name):
+    """'package.module:callable' -> the callable"""
+    module_name, _, attribute = name.partition(':')
+    if not attribute:
+        raise ValueError(f'Estimator must be given as module:callable, not {name!r}')
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+def stub_estimator(path):
+    """Someone seated, doing a curl every two seconds; one second of video per 100 KB"""
+    delay = float(os.environ.get('POSTURE_STUB_DELAY', 0))  # Seconds, to stand in for model time
+    if delay:
+        time.sleep(delay)
+
+    seconds = min(max(os.path.getsize(path) / STUB_BYTES_PER_SECOND, 1.0), STUB_MAX_SECONDS)
+    count = int(seconds * STUB_FPS)
+    elbow = np.radians(175 - 145 * (1 - np.cos(2 * np.pi * np.arange(count) / (2 * STUB_FPS))) / 2)
+
+    frames = np.zeros((count, 17, 3), dtype=np.float32)
+    frames[:, :, 2] = 0.9
+    frames[:, :5, :2] = [[320, 140], [305, 128], [335, 128], [290, 135], [350, 135]]  # Head
+    for shoulder, elbow_index, wrist, hip, side in ((5, 7, 9, 11, -1), (6, 8, 10, 12, 1)):
+        x = 320 + side * 60
+        frames[:, shoulder, :2] = [x, 230]
+        frames[:, elbow_index, :2] = [x, 320]  # Upper arm hangs straight down
+        forearm = np.pi / 2 + side * (np.pi - elbow)
+        frames[:, wrist, 0] = x + 80 * np.cos(forearm)
+        frames[:, wrist, 1] = 320 + 80 * np.sin(forearm)
+        frames[:, hip, :2] = [x - side * 25, 420]
+    frames[:, 13:, 2] = 0.1  # Legs out of view
+    return STUB_FPS, frames
@@ -0,0 +1,312 @@
+"""Background analysis of uploaded posture recordings.
+
+An upload is streamed to a spool file and recorded as a queued PostureJob
+row, and the request returns straight away. One dispatcher thread hands
+queued jobs to a process pool, at most POSTURE_JOB_WORKERS at a time. Each
+job runs the configured estimator (see estimators.py) and then the
+posture scoring and rep counting over its keypoints, and stores those
+keypoints in the session store. Jobs left running by a restart are queued
+again at startup; the spool files stay on disk until a job finishes.
+"""
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import traceback
+import uuid
+import numpy as np
+from sqlalchemy import inspect, text, update
+from App import db
+from .estimators import load_estimator
+from .reps import RepSession
+from .scoring import analyze
+from .storage import session_store
+
+TERMINAL_STATUSES = ('done', 'failed')
+
+
+class PostureJob(db.Model):
+    __tablename__ = 'posture_jobs'
+
+    # PostureJob Fields
+    id = db.Column(db.String(32), primary_key=True)
+    user_id = db.Column(db.Integer, nullable=True)  # Uploader; only they can read the job
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, done or failed
+    filename = db.Column(db.String(255), nullable=True)
+    spool_path = db.Column(db.String(500), nullable=True)  # Cleared once the file is deleted
+    size = db.Column(db.Integer, nullable=False, default=0)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    result = db.Column(db.Text, nullable=True)  # JSON
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_posture_jobs_status_created', 'status', 'created_at'),
+    )
+
+    def to_dict(self):
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'filename': self.filename,
+            'size': self.size,
+            'attempts': self.attempts,
+            'result': json.loads(self.result) if self.result else None,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+
+def migrate():
+    """Add columns newer than an existing posture_jobs table (needs an app context)"""
+    columns = {column['name'] for column in inspect(db.engine).get_columns('posture_jobs')}
+    if 'user_id' not in columns:
+        with db.engine.begin() as conn:
+            conn.execute(text('ALTER TABLE posture_jobs ADD COLUMN user_id INTEGER'))
+
+
+def run_job(job_id, spool_path, estimator_name):
+    """Worker process: estimate keypoints, analyse them and store them"""
+    fps, frames = load_estimator(estimator_name)(spool_path)
+    frames = np.asarray(frames, dtype=np.float32).reshape(-1, 17, 3)
+
+    reps = RepSession(job_id)
+    state = reps.feed(frames.tolist()) if len(frames) else reps.state()
+
+    session_store.delete(job_id)  # A retried job starts its session over
+    with session_store.create(job_id) as writer:
+        if len(frames):
+            writer.append(np.arange(len(frames)) / fps, frames)
+
+    return {
+        'frames': len(frames),
+        'fps': fps,
+        'duration_seconds': round(len(frames) / fps, 2),
+        'posture': analyze(frames)['summary'] if len(frames) else None,
+        'reps': {name: state[name]['reps'] for name in ('curl', 'squat')},
+        'session_id': job_id
+    }
+
+
+class JobQueueFull(Exception):
+    """Raised when POSTURE_JOB_MAX_QUEUED jobs are already waiting"""
+
+
+class PostureJobQueue:
+    """Durable queue of uploaded recordings, drained by a bounded process pool"""
+
+    def __init__(self):
+        self.app = None
+        self.workers = 2
+        self._executor = None
+        self._thread = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._changed = threading.Condition()  # Notified whenever a job changes status
+        self._version = 0
+        self._broken = False  # A worker died; the pool is replaced once its other jobs are collected
+        self.completed = 0
+        self.failed = 0
+
+    def init_app(self, app):
+        app.config.setdefault('POSTURE_JOB_WORKERS', 2)
+        app.config.setdefault('POSTURE_JOB_MAX_QUEUED', 100)
+        app.config.setdefault('POSTURE_JOB_MAX_ATTEMPTS', 3)
+        app.config.setdefault('POSTURE_JOB_IDLE_INTERVAL', 30)  # seconds between checks when nothing is queued
+        app.config.setdefault('POSTURE_SPOOL_DIR', os.path.join(app.instance_path, 'posture_spool'))
+        app.config.setdefault('POSTURE_ESTIMATOR', 'PostureCorrector.estimators:stub_estimator')
+        self.workers = max(1, app.config['POSTURE_JOB_WORKERS'])
+        self.app = app
+        app.extensions['posture_jobs'] = self
+
+    def enqueue(self, upload, user_id=None):
+        """Spool a werkzeug FileStorage to disk and queue a job for it"""
+        config = self.app.config
+        if PostureJob.query.filter_by(status='queued').count() >= config['POSTURE_JOB_MAX_QUEUED']:
+            raise JobQueueFull('Too many recordings waiting to be analysed')
+
+        os.makedirs(config['POSTURE_SPOOL_DIR'], exist_ok=True)
+        extension = os.path.splitext(upload.filename or '')[1][:10]
+        fd, spool_path = tempfile.mkstemp(suffix=extension, dir=config['POSTURE_SPOOL_DIR'])
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                upload.save(f)  # Copied in chunks, never held in memory whole
+            job = PostureJob(id=uuid.uuid4().hex, user_id=user_id, status='queued', filename=upload.filename,
+                             spool_path=spool_path, size=os.path.getsize(spool_path))
+            db.session.add(job)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            os.remove(spool_path)
+            raise
+        self._wake.set()
+        return job
+
+    def get(self, job_id):
+        return db.session.get(PostureJob, job_id)
+
+    def version(self):
+        """Counter bumped on every status change; read it before reading a job"""
+        with self._changed:
+            return self._version
+
+    def wait_for_change(self, since_version, timeout):
+        """Block until some job changes status after since_version, or timeout seconds pass"""
+        with self._changed:
+            self._changed.wait_for(lambda: self._version != since_version, timeout)
+
+    def _notify(self):
+        with self._changed:
+            self._version += 1
+            self._changed.notify_all()
+
+    def requeue_interrupted(self):
+        """Queue jobs a previous process left running; give up on them after too many tries"""
+        interrupted = PostureJob.query.filter_by(status='running').all()
+        for job in interrupted:
+            if job.attempts >= self.app.config['POSTURE_JOB_MAX_ATTEMPTS']:
+                self._finish(job, error='Interrupted too many times')
+            else:
+                job.status = 'queued'
+                job.started_at = None
+        db.session.commit()
+        return len(interrupted)
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self.app.app_context():
+            requeued = self.requeue_interrupted()
+            db.session.remove()
+        if requeued:
+            print(f"Requeued {requeued} posture job(s) interrupted by a restart")
+        self._executor = self._new_executor()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='posture-jobs', daemon=True)
+        self._thread.start()
+
+    def _new_executor(self):
+        # Not fork: forking while the request and dispatcher threads hold locks can deadlock the child
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+        self._broken = False
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        if self._executor is not None:
+            # Unfinished jobs stay 'running' and are queued again on the next start
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _run(self):
+        running = {}  # future -> job id
+        while not self._stop.is_set():
+            try:
+                if self._broken and not running:
+                    self._executor.shutdown(wait=False)
+                    self._executor = self._new_executor()
+                with self.app.app_context():
+                    while len(running) < self.workers and not self._broken:
+                        job = self._claim_next()
+                        if job is None:
+                            break
+                        future = self._executor.submit(run_job, job.id, job.spool_path,
+                                                       self.app.config['POSTURE_ESTIMATOR'])
+                        running[future] = job.id
+                    db.session.remove()
+                if not running:
+                    self._wake.wait(self.app.config['POSTURE_JOB_IDLE_INTERVAL'])
+                    self._wake.clear()
+                    continue
+                # Short timeout so newly queued jobs can fill a free worker
+                done, _ = wait(running, timeout=0.5, return_when=FIRST_COMPLETED)
+                with self.app.app_context():
+                    for future in done:
+                        self._record(running.pop(future), future)
+                    db.session.remove()
+            except Exception as e:
+                print(f"Error in posture job dispatcher: {str(e)}")
+                print(f"Traceback: {traceback.format_exc()}")
+                self._stop.wait(1)
+
+    def _claim_next(self):
+        """Mark the oldest queued job running, so a second dispatcher can't take it too"""
+        job = PostureJob.query.filter_by(status='queued').order_by(PostureJob.created_at).first()
+        if job is None:
+            return None
+        result = db.session.execute(
+            update(PostureJob)
+            .where(PostureJob.id == job.id, PostureJob.status == 'queued')
+            .values(status='running', started_at=datetime.utcnow(), attempts=PostureJob.attempts + 1)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        if not result.rowcount:
+            return self._claim_next()
+        self._notify()
+        return self.get(job.id)
+
+    def _record(self, job_id, future):
+        job = self.get(job_id)
+        if job is None:
+            return
+        try:
+            self._finish(job, result=future.result())
+        except BrokenProcessPool:
+            # The worker died (killed, out of memory); try the job again on a fresh pool
+            self._broken = True
+            if job.attempts >= self.app.config['POSTURE_JOB_MAX_ATTEMPTS']:
+                self._finish(job, error='Worker process died')
+            else:
+                job.status = 'queued'
+                job.started_at = None
+        except Exception as e:
+            print(f"Posture job {job_id} failed: {str(e)}")
+            self._finish(job, error=str(e) or type(e).__name__)
+        db.session.commit()
+        self._notify()
+
+    def _finish(self, job, result=None, error=None):
+        job.status = 'failed' if error is not None else 'done'
+        job.result = json.dumps(result) if result is not None else None
+        job.error = error
+        job.finished_at = datetime.utcnow()
+        if job.spool_path:
+            try:
+                os.remove(job.spool_path)
+            except FileNotFoundError:
+                pass
+            job.spool_path = None
+        if error is not None:
+            self.failed += 1
+        else:
+            self.completed += 1
+
+    def stats(self):
+        counts = dict(db.session.query(PostureJob.status, db.func.count()).group_by(PostureJob.status).all())
+        return {
+            'queued': counts.get('queued', 0),
+            'running': counts.get('running', 0),
+            'done': counts.get('done', 0),
+            'failed': counts.get('failed', 0),
+            'workers': self.workers,
+            'completed': self.completed,
+            'failed_since_start': self.failed,
+            'dispatcher_running': self._thread is not None and self._thread.is_alive()
+        }
+
+
+posture_jobs = PostureJobQueue()
@@ -1,41 +1,171 @@
-from flask import Blueprint, request, jsonify
-import tempfile
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
+from functools import wraps
+import json
+import jwt
+import os
+import threading
+import time
+from App import db
+from .jobs import JobQueueFull, TERMINAL_STATUSES, posture_jobs
+from .reps import RepSessionRegistry
+from .scoring import analyze
+
+MAX_FRAMES = int(os.environ.get('POSTURE_MAX_FRAMES', 900))  # 30 s at 30 fps
+JOB_EVENTS_TIMEOUT = 120  # seconds an event stream stays open; clients reconnect after that
+# Each open stream holds a server thread, so only a few at a time; the rest poll GET /posture/jobs/<id>
+job_event_streams = threading.BoundedSemaphore(int(os.environ.get('POSTURE_JOB_MAX_STREAMS', 2)))
+
+rep_sessions = RepSessionRegistry(
+    max_sessions=int(os.environ.get('REP_MAX_SESSIONS', 1000)),
+    idle_timeout=int(os.environ.get('REP_SESSION_IDLE_TIMEOUT', 30 * 60))  # seconds
+)
 
 posture_blueprint = Blueprint('posture', __name__)
 
-# Commented out for now - can be used later for backend processing
-
-# def process_video(file_path):
-#      global curl_counter, squat_counter, curl_stage, squat_stage
-#     curl_counter, squat_counter = 0, 0  # Reset counters for each video
-#
-#     cap = cv2.VideoCapture(file_path)
-#    print("Processing video at:", file_path)
-#
-#    with mp_pose.Pose(min_detection_confidence=0.5, min_tracking_confidence=0.5) as pose:
-#        while cap.isOpened():
-#           ret, frame = cap.read()
-#           if not ret:
-#                 break
- 
-#             # Convert the frame to RGB for Mediapipe
-#            image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-#            results = pose.process(image)
-
-#             if results.pose_landmarks:
-#                landmarks = results.pose_landmarks.landmark
- 
-                 # Process landmarks for posture analysis
-                 # Add posture analysis logic here
-# 
-#     cap.release()
-#    return {"status": "processed"}
+def token_required(f):
+    """Pass the user id from the main app's JWT to the route"""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        auth_header = request.headers.get('Authorization', '')
+        if not auth_header.startswith('Bearer '):
+            return jsonify({'error': 'Token is missing'}), 401
+        try:
+            data = jwt.decode(auth_header.split(' ', 1)[1], current_app.config['SECRET_KEY'], algorithms=["HS256"])
+        except jwt.ExpiredSignatureError:
+            return jsonify({'error': 'Token has expired'}), 401
+        except jwt.InvalidTokenError:
+            return jsonify({'error': 'Invalid token'}), 401
+        return f(data['user_id'], *args, **kwargs)
+    return decorated
+
+def user_rep_session(user_id, session_id):
+    session = rep_sessions.get(session_id)
+    return session if session is not None and session.user_id == user_id else None
+
+def user_job(user_id, job_id):
+    job = posture_jobs.get(job_id)
+    return job if job is not None and job.user_id == user_id else None
 
 @posture_blueprint.route('/analyze_posture', methods=['POST'])
 def analyze_posture():
-    # This endpoint can be used later for storing posture data
-    # or implementing backend processing features
-    return jsonify({"message": "Posture analysis is currently handled in frontend"})
+    """Score a window of MoveNet keypoint frames: {"frames": [[[x, y, score] * 17], ...]}"""
+    data = request.get_json(silent=True) or {}
+    frames = data.get('frames')
+    if not isinstance(frames, list) or not frames:
+        return jsonify({'error': 'frames is required'}), 400
+    if len(frames) > MAX_FRAMES:
+        return jsonify({'error': f'At most {MAX_FRAMES} frames per request'}), 400
+    try:
+        return jsonify(analyze(frames))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+@posture_blueprint.route('/reps/sessions', methods=['POST'])
+@token_required
+def start_rep_session(user_id):
+    """Start counting curls and squats for one stream"""
+    try:
+        session = rep_sessions.create(user_id)
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 503
+    return jsonify(session.state()), 201
+
+@posture_blueprint.route('/reps/sessions/<session_id>/frames', methods=['POST'])
+@token_required
+def feed_rep_session(user_id, session_id):
+    """Feed the next keypoint frames, in order: {"frames": [[[x, y, score] * 17], ...]}"""
+    session = user_rep_session(user_id, session_id)
+    if session is None:
+        return jsonify({'error': 'Session not found'}), 404
+    data = request.get_json(silent=True) or {}
+    frames = data.get('frames')
+    if not isinstance(frames, list):
+        return jsonify({'error': 'frames is required'}), 400
+    if len(frames) > MAX_FRAMES:
+        return jsonify({'error': f'At most {MAX_FRAMES} frames per request'}), 400
+    try:
+        return jsonify(session.feed(frames))
+    except (ValueError, TypeError, IndexError) as e:
+        return jsonify({'error': str(e)}), 400
+
+@posture_blueprint.route('/reps/sessions/<session_id>', methods=['GET'])
+@token_required
+def get_rep_session(user_id, session_id):
+    session = user_rep_session(user_id, session_id)
+    if session is None:
+        return jsonify({'error': 'Session not found'}), 404
+    return jsonify(session.state())
+
+@posture_blueprint.route('/reps/sessions/<session_id>', methods=['DELETE'])
+@token_required
+def end_rep_session(user_id, session_id):
+    """Stop counting and return the final counts"""
+    if user_rep_session(user_id, session_id) is None:
+        return jsonify({'error': 'Session not found'}), 404
+    session = rep_sessions.remove(session_id)
+    if session is None:
+        return jsonify({'error': 'Session not found'}), 404
+    return jsonify(session.state())
+
+@posture_blueprint.route('/posture/jobs', methods=['POST'])
+@token_required
+def upload_recording(user_id):
+    """Queue an uploaded recording (multipart field "file") for analysis"""
+    upload = request.files.get('file')
+    if upload is None or not upload.filename:
+        return jsonify({'error': 'file is required'}), 400
+    try:
+        job = posture_jobs.enqueue(upload, user_id)
+    except JobQueueFull as e:
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        print(f"Error queueing posture recording: {str(e)}")
+        return jsonify({'error': 'Could not save the recording'}), 500
+    return jsonify(job.to_dict()), 202, {'Location': f'{request.path}/{job.id}'}
+
+@posture_blueprint.route('/posture/jobs/stats', methods=['GET'])
+@token_required
+def posture_job_stats(user_id):
+    return jsonify(posture_jobs.stats())
+
+@posture_blueprint.route('/posture/jobs/<job_id>', methods=['GET'])
+@token_required
+def get_posture_job(user_id, job_id):
+    job = user_job(user_id, job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.to_dict())
+
+@posture_blueprint.route('/posture/jobs/<job_id>/events', methods=['GET'])
+@token_required
+def posture_job_events(user_id, job_id):
+    """Server-sent events with the job's state on every status change, until it finishes"""
+    if user_job(user_id, job_id) is None:
+        return jsonify({'error': 'Job not found'}), 404
+    if not job_event_streams.acquire(blocking=False):
+        return jsonify({'error': 'Too many open event streams; poll the job instead'}), 503, {'Retry-After': '5'}
+
+    def events():
+        last_status = None
+        deadline = time.monotonic() + JOB_EVENTS_TIMEOUT
+        while time.monotonic() < deadline:
+            version = posture_jobs.version()
+            db.session.expire_all()  # Read the dispatcher's latest commit
+            job = posture_jobs.get(job_id)
+            if job.status != last_status:
+                last_status = job.status
+                yield f"event: status\ndata: {json.dumps(job.to_dict())}\n\n"
+                if job.status in TERMINAL_STATUSES:
+                    return
+            else:
+                yield ": keepalive\n\n"
+            db.session.remove()  # Don't hold a pooled connection while waiting
+            posture_jobs.wait_for_change(version, 15)
+
+    response = Response(stream_with_context(events()), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    response.call_on_close(job_event_streams.release)
+    return response
 
 # Additional routes can be added here for future backend features:
 # - Storing posture history
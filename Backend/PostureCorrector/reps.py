@@ -0,0 +1,167 @@
+"""Streaming curl and squat rep counting from MoveNet keypoint frames.
+
+Each session owns its counters, so any number of users can stream at once.
+A frame is 17 [x, y, score] keypoints as plain lists, the same shape the
+scoring endpoint takes. Updates are plain-Python math on one frame at a
+time, because a single frame is too small for NumPy's per-call overhead to
+pay off.
+
+A rep is counted with hysteresis: the joint has to bend past the flexed
+angle and then straighten past the extended angle again. Jitter around
+either threshold cannot count twice.
+"""
+import math
+import threading
+import time
+import uuid
+
+from .scoring import MIN_KEYPOINT_SCORE
+
+LEFT_SHOULDER, RIGHT_SHOULDER = 5, 6
+LEFT_ELBOW, RIGHT_ELBOW = 7, 8
+LEFT_WRIST, RIGHT_WRIST = 9, 10
+LEFT_HIP, RIGHT_HIP = 11, 12
+LEFT_KNEE, RIGHT_KNEE = 13, 14
+LEFT_ANKLE, RIGHT_ANKLE = 15, 16
+
+# exercise -> ((left joint triple), (right joint triple), extended angle, flexed angle)
+EXERCISES = {
+    'curl': ((LEFT_SHOULDER, LEFT_ELBOW, LEFT_WRIST), (RIGHT_SHOULDER, RIGHT_ELBOW, RIGHT_WRIST), 150.0, 45.0),
+    'squat': ((LEFT_HIP, LEFT_KNEE, LEFT_ANKLE), (RIGHT_HIP, RIGHT_KNEE, RIGHT_ANKLE), 160.0, 95.0),
+}
+
+
+NUMBER_TYPES = (int, float)  # Not bool, though it is an int
+
+
+def check_frame(frame):
+    """Raise ValueError unless frame is 17 [x, y, score] triples of finite numbers"""
+    if not isinstance(frame, (list, tuple)) or len(frame) != 17:
+        raise ValueError('Each frame needs 17 keypoints of [x, y, score]')
+    try:
+        for x, y, score in frame:
+            if (type(x) not in NUMBER_TYPES or type(y) not in NUMBER_TYPES or type(score) not in NUMBER_TYPES
+                    or not math.isfinite(x + y + score)):  # NaN or an infinity makes the sum non-finite
+                raise ValueError
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError('Each keypoint must be [x, y, score] finite numbers') from None
+
+
+def joint_angle(a, b, c):
+    """Angle at b in degrees (0-180) between b->a and b->c"""
+    angle = abs(math.degrees(math.atan2(c[1] - b[1], c[0] - b[0]) - math.atan2(a[1] - b[1], a[0] - b[0])))
+    return 360.0 - angle if angle > 180.0 else angle
+
+
+class RepCounter:
+    """Hysteresis state machine for one exercise"""
+
+    __slots__ = ('left', 'right', 'extended', 'flexed', 'stage', 'reps', 'angle')
+
+    def __init__(self, left, right, extended, flexed):
+        self.left = left
+        self.right = right
+        self.extended = extended
+        self.flexed = flexed
+        self.stage = None  # None until the joint is first seen extended
+        self.reps = 0
+        self.angle = None
+
+    def update(self, frame):
+        # Follow whichever side the camera sees better
+        a, b, c = self.left
+        left_score = min(frame[a][2], frame[b][2], frame[c][2])
+        a, b, c = self.right
+        right_score = min(frame[a][2], frame[b][2], frame[c][2])
+        if left_score >= right_score:
+            a, b, c = self.left
+        if max(left_score, right_score) < MIN_KEYPOINT_SCORE:
+            return  # Joint not visible; keep the current stage
+
+        self.angle = angle = joint_angle(frame[a], frame[b], frame[c])
+        if self.stage == 'flexed':
+            if angle >= self.extended:
+                self.stage = 'extended'
+                self.reps += 1
+        elif angle <= self.flexed:
+            if self.stage == 'extended':
+                self.stage = 'flexed'
+        elif angle >= self.extended:
+            self.stage = 'extended'
+
+    def state(self):
+        return {
+            'reps': self.reps,
+            'stage': self.stage,
+            'angle': round(self.angle, 1) if self.angle is not None else None
+        }
+
+
+class RepSession:
+    """Counters for every exercise in one user's stream"""
+
+    def __init__(self, session_id, user_id=None):
+        self.session_id = session_id
+        self.user_id = user_id
+        self.counters = {name: RepCounter(*spec) for name, spec in EXERCISES.items()}
+        self.frames = 0
+        self.last_seen = time.monotonic()
+        self.lock = threading.Lock()
+
+    def feed(self, frames):
+        """Run frames through every counter, in order; returns the new state"""
+        for frame in frames:
+            check_frame(frame)  # All of them first, so a bad batch changes nothing
+        counters = list(self.counters.values())
+        with self.lock:
+            for frame in frames:
+                for counter in counters:
+                    counter.update(frame)
+                self.frames += 1
+            self.last_seen = time.monotonic()
+            return self._state()
+
+    def state(self):
+        with self.lock:
+            return self._state()
+
+    def _state(self):
+        state = {name: counter.state() for name, counter in self.counters.items()}
+        state['session_id'] = self.session_id
+        state['frames'] = self.frames
+        return state
+
+
+class RepSessionRegistry:
+    """Live sessions by id; idle ones are dropped when new ones are created"""
+
+    def __init__(self, max_sessions=1000, idle_timeout=30 * 60):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def create(self, user_id=None):
+        with self._lock:
+            self._expire()
+            if len(self._sessions) >= self.max_sessions:
+                raise RuntimeError('Too many active rep counting sessions')
+            session = RepSession(uuid.uuid4().hex, user_id)
+            self._sessions[session.session_id] = session
+            return session
+
+    def get(self, session_id):
+        with self._lock:
+            return self._sessions.get(session_id)
+
+    def remove(self, session_id):
+        with self._lock:
+            return self._sessions.pop(session_id, None)
+
+    def _expire(self):
+        cutoff = time.monotonic() - self.idle_timeout
+        for session_id in [sid for sid, session in self._sessions.items() if session.last_seen < cutoff]:
+            del self._sessions[session_id]
+
+    def __len__(self):
+        return len(self._sessions)
@@ -0,0 +1,133 @@
+"""Posture metrics for batches of MoveNet keypoint frames.
+
+A batch is an array of shape (frames, 17, 3): one [x, y, score] row per
+MoveNet keypoint, in pixels with y pointing down, as pose-detection returns
+them. Every metric is computed for all frames at once with array math, so a
+30 fps window costs about the same as a single frame.
+"""
+import numpy as np
+
+# MoveNet (COCO) keypoint order
+KEYPOINTS = [
+    'nose', 'left_eye', 'right_eye', 'left_ear', 'right_ear',
+    'left_shoulder', 'right_shoulder', 'left_elbow', 'right_elbow',
+    'left_wrist', 'right_wrist', 'left_hip', 'right_hip',
+    'left_knee', 'right_knee', 'left_ankle', 'right_ankle',
+]
+NOSE, LEFT_EAR, RIGHT_EAR = 0, 3, 4
+LEFT_SHOULDER, RIGHT_SHOULDER = 5, 6
+LEFT_HIP, RIGHT_HIP = 11, 12
+
+MIN_KEYPOINT_SCORE = 0.3  # Below this a keypoint is treated as not seen
+
+# metric -> (degrees scored 100, degrees scored 0); linear in between
+THRESHOLDS = {
+    'shoulder_tilt': (3.0, 12.0),  # Shoulder line against the horizontal
+    'spine_angle': (5.0, 20.0),  # Hip midpoint -> shoulder midpoint against the vertical
+    'neck_angle': (8.0, 25.0),  # Shoulder midpoint -> ear midpoint against the vertical
+}
+METRICS = list(THRESHOLDS)
+GOOD_SCORE = 70.0
+
+
+def as_frames(frames):
+    """(F, 17, 3) float32 array from (F, 17, 3) nested lists or (F, 51) flat rows"""
+    try:
+        array = np.asarray(frames, dtype=np.float32)
+    except (TypeError, ValueError):
+        raise ValueError('Frames must be lists of numbers') from None
+    shape = (len(KEYPOINTS), 3) if array.ndim == 3 else (len(KEYPOINTS) * 3,)
+    if array.ndim not in (2, 3) or array.shape[1:] != shape or not len(array):
+        raise ValueError('Each frame needs 17 keypoints of [x, y, score]')
+    if not np.isfinite(array).all():
+        raise ValueError('Keypoints must be finite numbers')
+    return array.reshape(-1, len(KEYPOINTS), 3)
+
+
+def _midpoint(frames, a, b):
+    """Midpoints of two keypoints (F, 2) and the lower of their scores (F,)"""
+    points = (frames[:, a, :2] + frames[:, b, :2]) * 0.5
+    return points, np.minimum(frames[:, a, 2], frames[:, b, 2])
+
+
+def _angle_from_vertical(vectors):
+    # Image y points down, so an upright segment has a negative dy
+    return np.degrees(np.arctan2(np.abs(vectors[:, 0]), -vectors[:, 1]))
+
+
+def compute_metrics(frames):
+    """Angles in degrees per metric, NaN where a keypoint it needs was not seen"""
+    shoulders, shoulder_score = _midpoint(frames, LEFT_SHOULDER, RIGHT_SHOULDER)
+    hips, hip_score = _midpoint(frames, LEFT_HIP, RIGHT_HIP)
+    ears, ear_score = _midpoint(frames, LEFT_EAR, RIGHT_EAR)
+
+    shoulder_line = frames[:, RIGHT_SHOULDER, :2] - frames[:, LEFT_SHOULDER, :2]
+    metrics = {
+        'shoulder_tilt': (np.degrees(np.arctan2(np.abs(shoulder_line[:, 1]), np.abs(shoulder_line[:, 0]))),
+                          shoulder_score),
+        'spine_angle': (_angle_from_vertical(shoulders - hips), np.minimum(shoulder_score, hip_score)),
+        'neck_angle': (_angle_from_vertical(ears - shoulders), np.minimum(shoulder_score, ear_score)),
+    }
+    return {name: np.where(score >= MIN_KEYPOINT_SCORE, angle, np.nan) for name, (angle, score) in metrics.items()}
+
+
+def score_metrics(metrics):
+    """0-100 per metric and frame, plus the overall mean of the metrics that were seen"""
+    scores = {}
+    for name, (good, bad) in THRESHOLDS.items():
+        scores[name] = np.clip((bad - metrics[name]) / (bad - good), 0.0, 1.0) * 100.0
+    stacked = np.stack([scores[name] for name in METRICS])
+    seen = ~np.isnan(stacked)
+    counts = seen.sum(axis=0)
+    overall = np.where(seen, stacked, 0.0).sum(axis=0) / np.maximum(counts, 1)
+    scores['overall'] = np.where(counts > 0, overall, np.nan)
+    return scores
+
+
+def _mean(values):
+    seen = values[~np.isnan(values)]
+    return round(float(seen.mean()), 2) if seen.size else None
+
+
+def _column(values):
+    """Rounded floats for JSON, None for NaN"""
+    return np.where(np.isnan(values), None, np.round(values.astype(np.float64), 2).astype(object)).tolist()
+
+
+def _status(score, good='Good', bad='Needs Adjustment'):
+    if score is None:
+        return None
+    return good if score >= GOOD_SCORE else bad
+
+
+def _confidence(mean_score):
+    if mean_score > 0.7:
+        return 'high'
+    return 'medium' if mean_score > 0.3 else 'low'
+
+
+def analyze(frames):
+    """Per-frame metrics and scores (one list per field) plus a summary of the batch"""
+    frames = as_frames(frames)
+    metrics = compute_metrics(frames)
+    scores = score_metrics(metrics)
+    upper_body = frames[:, [NOSE, LEFT_EAR, RIGHT_EAR, LEFT_SHOULDER, RIGHT_SHOULDER], 2]
+
+    per_frame = {name: _column(values) for name, values in metrics.items()}
+    per_frame.update({name + '_score': _column(values) for name, values in scores.items()})
+
+    overall = scores['overall']
+    scored = ~np.isnan(overall)
+    summary = {
+        'frames': len(frames),
+        'scored_frames': int(scored.sum()),
+        'good_fraction': round(float((overall[scored] >= GOOD_SCORE).mean()), 4) if scored.any() else None,
+        'confidence': _confidence(float(upper_body.mean())),
+    }
+    for name in METRICS:
+        summary[name] = _mean(metrics[name])
+        summary[name + '_score'] = _mean(scores[name])
+    summary['score'] = _mean(overall)
+    summary['status'] = {name: _status(summary[name + '_score']) for name in METRICS}
+    summary['status']['overall'] = _status(summary['score'], 'Good Posture', 'Poor Posture')
+    return {'frames': per_frame, 'summary': summary}
@@ -0,0 +1,289 @@
+"""On-disk store for posture session keypoint streams.
+
+Each session is a directory holding a small meta.json, the frame timestamps
+and the frames themselves, packed into flat binary files instead of rows:
+
+- timestamps.f32: float32 seconds since the session's first frame
+  (meta["t0"]), sorted, so a time range is two binary searches away.
+- frames.f32 ("raw" encoding): (frames, 17, 3) float32, 204 bytes a frame,
+  read back as a read-only np.memmap slice with no copy.
+- frames.d16 ("delta16" encoding): fixed-size blocks of block_frames
+  frames. x and y are clipped to 0..2047 px and quantized to 1/16 px, and
+  scores to 1/10000; the first frame of a block is an int32 keyframe and the rest are int16
+  deltas from the frame before, about 102 bytes a frame. Because every
+  block is the same size, a time range decodes only the blocks it touches.
+
+A stride above 1 keeps every stride-th frame received (10 fps from a 30 fps
+stream with stride=3). One writer per session at a time; any number of
+readers, each of which sees the frames flushed before it was opened.
+"""
+import json
+import os
+import re
+import shutil
+
+import numpy as np
+
+from .scoring import KEYPOINTS, as_frames
+
+DEFAULT_ROOT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'instance', 'posture_sessions')
+ENCODINGS = ('raw', 'delta16')
+VALUES_PER_FRAME = len(KEYPOINTS) * 3
+
+# Quantization steps for [x, y, score]: 1/16 px and 1/10000
+SCALES = np.tile(np.array([16.0, 16.0, 10000.0], dtype=np.float32), len(KEYPOINTS))
+# Coordinates are clipped to [0, MAX_COORDINATE]: any change across that span,
+# 2047 * 16 steps, still fits in an int16 delta
+MAX_COORDINATE = 2047.0
+
+SESSION_ID = re.compile(r'[A-Za-z0-9_-]{1,64}')
+
+
+def _block_dtype(block_frames):
+    return np.dtype([
+        ('key', '<i4', (VALUES_PER_FRAME,)),
+        ('delta', '<i2', (block_frames - 1, VALUES_PER_FRAME)),
+    ])
+
+
+def quantize(frames):
+    """(F, 17, 3) float -> (F, 51) int32 in SCALES steps"""
+    flat = frames.reshape(len(frames), VALUES_PER_FRAME).copy()
+    flat[:, 0::3] = np.clip(flat[:, 0::3], 0.0, MAX_COORDINATE)
+    flat[:, 1::3] = np.clip(flat[:, 1::3], 0.0, MAX_COORDINATE)
+    flat[:, 2::3] = np.clip(flat[:, 2::3], 0.0, 1.0)
+    return np.rint(flat * SCALES).astype(np.int32)
+
+
+def dequantize(values):
+    return (values / SCALES).astype(np.float32).reshape(-1, len(KEYPOINTS), 3)
+
+
+def encode_blocks(values, block_frames):
+    """Quantized (n * block_frames, 51) values -> n delta16 blocks"""
+    values = values.reshape(-1, block_frames, VALUES_PER_FRAME)
+    blocks = np.empty(len(values), dtype=_block_dtype(block_frames))
+    blocks['key'] = values[:, 0]
+    blocks['delta'] = np.diff(values, axis=1)
+    return blocks
+
+
+def decode_blocks(blocks):
+    """delta16 blocks -> quantized (n * block_frames, 51) int32 values"""
+    values = np.concatenate([blocks['key'][:, None, :], blocks['delta'].astype(np.int32)], axis=1)
+    return np.cumsum(values, axis=1, out=values).reshape(-1, VALUES_PER_FRAME)
+
+
+def _memmap(path, dtype):
+    """Read-only map of a file, or an empty array for a missing or empty one"""
+    if not os.path.exists(path) or os.path.getsize(path) < np.dtype(dtype).itemsize:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r', shape=(os.path.getsize(path) // np.dtype(dtype).itemsize,))
+
+
+class SessionWriter:
+    """Appends frames to one session"""
+
+    def __init__(self, path, meta):
+        self.path = path
+        self.meta = meta
+        self.block_frames = meta['block_frames']
+        # Anything past the count in meta.json was never flushed, so is dropped
+        self._count = stored = meta['frames']
+        self._times = self._open(os.path.join(path, 'timestamps.f32'), stored * 4)
+        self._last_time = None
+        if stored:
+            self._last_time = float(_memmap(self._times.name, '<f4')[stored - 1])
+
+        if meta['encoding'] == 'raw':
+            self._frames = self._open(os.path.join(path, 'frames.f32'), stored * VALUES_PER_FRAME * 4)
+            return
+        # A partly filled last block is decoded and rewritten as frames arrive
+        self._full_blocks, tail = divmod(stored, self.block_frames)
+        block_bytes = _block_dtype(self.block_frames).itemsize
+        self._frames = self._open(os.path.join(path, 'frames.d16'), -(-stored // self.block_frames) * block_bytes)
+        self._pending = np.empty((0, VALUES_PER_FRAME), dtype=np.int32)
+        if tail:
+            block = _memmap(self._frames.name, _block_dtype(self.block_frames))[self._full_blocks:self._full_blocks + 1]
+            self._pending = decode_blocks(block)[:tail]
+
+    @staticmethod
+    def _open(path, size):
+        open(path, 'ab').close()
+        f = open(path, 'r+b')  # Not append mode: delta16 rewrites its last block in place
+        f.truncate(size)
+        f.seek(size)
+        return f
+
+    def __len__(self):
+        return self._count
+
+    def append(self, timestamps, frames):
+        """Add frames with their timestamps (seconds, e.g. time.time()); returns how many were kept"""
+        timestamps = np.asarray(timestamps, dtype=np.float64).reshape(-1)
+        frames = as_frames(frames)
+        if len(timestamps) != len(frames):
+            raise ValueError('Need one timestamp per frame')
+        if np.any(np.diff(timestamps) < 0):
+            raise ValueError('Timestamps must not go backwards')
+
+        stride = self.meta['stride']
+        keep = (self.meta['received'] + np.arange(len(frames))) % stride == 0
+        timestamps, frames = timestamps[keep], frames[keep]
+        if not len(frames):
+            self.meta['received'] += len(keep)
+            return 0
+        t0 = self.meta['t0'] if self.meta['t0'] is not None else float(timestamps[0])
+        offsets = (timestamps - t0).astype('<f4')
+        if self._last_time is not None and offsets[0] < self._last_time:
+            raise ValueError('Timestamps must not go backwards')
+        self.meta['t0'] = t0
+        self.meta['received'] += len(keep)
+
+        if self.meta['encoding'] == 'raw':
+            frames.astype('<f4', copy=False).tofile(self._frames)
+        else:
+            self._pending = np.concatenate([self._pending, quantize(frames)])
+            full = len(self._pending) // self.block_frames * self.block_frames
+            if full:
+                self._write_blocks(self._full_blocks, self._pending[:full])
+                self._full_blocks += full // self.block_frames
+                self._pending = self._pending[full:]
+        offsets.tofile(self._times)
+        self._last_time = float(offsets[-1])
+        self._count += len(frames)
+        return len(frames)
+
+    def _write_blocks(self, index, values):
+        self._frames.seek(index * _block_dtype(self.block_frames).itemsize)
+        encode_blocks(values, self.block_frames).tofile(self._frames)
+
+    def flush(self):
+        """Make everything appended so far visible to new readers"""
+        if self.meta['encoding'] == 'delta16' and len(self._pending):
+            # Pad the last block with repeats of its last frame (zero deltas)
+            padding = np.repeat(self._pending[-1:], self.block_frames - len(self._pending), axis=0)
+            self._write_blocks(self._full_blocks, np.concatenate([self._pending, padding]))
+        self._frames.flush()
+        self._times.flush()
+        self.meta['frames'] = self._count
+        _write_meta(self.path, self.meta)
+
+    def close(self):
+        self.flush()
+        self._frames.close()
+        self._times.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SessionReader:
+    """Time-range reads from one session, as of when it was opened"""
+
+    def __init__(self, path, meta):
+        self.meta = meta
+        count = meta['frames']
+        self.offsets = _memmap(os.path.join(path, 'timestamps.f32'), '<f4')[:count]
+        if meta['encoding'] == 'raw':
+            data = _memmap(os.path.join(path, 'frames.f32'), '<f4')
+            self._frames = data[:count * VALUES_PER_FRAME].reshape(count, len(KEYPOINTS), 3)
+        else:
+            self._blocks = _memmap(os.path.join(path, 'frames.d16'), _block_dtype(meta['block_frames']))
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def timestamps(self, start=0, stop=None):
+        return self.meta['t0'] + self.offsets[start:stop].astype(np.float64)
+
+    def index_range(self, start_time=None, end_time=None):
+        """Frame indices [start, stop) with start_time <= timestamp < end_time"""
+        t0 = self.meta['t0'] or 0.0
+        start = 0 if start_time is None else int(np.searchsorted(self.offsets, np.float32(start_time - t0), 'left'))
+        stop = len(self) if end_time is None else int(np.searchsorted(self.offsets, np.float32(end_time - t0), 'left'))
+        return start, max(start, stop)
+
+    def frames(self, start=0, stop=None):
+        """(n, 17, 3) float32 frames by index; a read-only view of the file for "raw" sessions"""
+        start, stop, _ = slice(start, stop).indices(len(self))
+        stop = max(start, stop)
+        if self.meta['encoding'] == 'raw':
+            return self._frames[start:stop]
+        size = self.meta['block_frames']
+        first, last = start // size, -(-stop // size)
+        values = decode_blocks(self._blocks[first:last])
+        return dequantize(values[start - first * size:stop - first * size])
+
+    def read(self, start_time=None, end_time=None):
+        """(timestamps, frames) for start_time <= t < end_time, in seconds"""
+        start, stop = self.index_range(start_time, end_time)
+        return self.timestamps(start, stop), self.frames(start, stop)
+
+
+def _write_meta(path, meta):
+    tmp_path = os.path.join(path, 'meta.json.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, os.path.join(path, 'meta.json'))
+
+
+class PostureSessionStore:
+    """Posture sessions under one root directory, one subdirectory each"""
+
+    def __init__(self, root=DEFAULT_ROOT):
+        self.root = root
+
+    def _path(self, session_id):
+        if not SESSION_ID.fullmatch(session_id or ''):
+            raise ValueError('Session ids are 1-64 letters, digits, - or _')
+        return os.path.join(self.root, session_id)
+
+    def _meta(self, session_id):
+        path = self._path(session_id)
+        try:
+            with open(os.path.join(path, 'meta.json')) as f:
+                return path, json.load(f)
+        except FileNotFoundError:
+            raise KeyError(session_id) from None
+
+    def create(self, session_id, encoding='delta16', stride=1, block_frames=64):
+        """A writer for a new, empty session"""
+        if encoding not in ENCODINGS:
+            raise ValueError(f'encoding must be one of {ENCODINGS}')
+        if stride < 1 or block_frames < 2:
+            raise ValueError('stride must be >= 1 and block_frames >= 2')
+        path = self._path(session_id)
+        os.makedirs(path)  # Fails if the session already exists
+        meta = {'encoding': encoding, 'stride': stride, 'block_frames': block_frames,
+                't0': None, 'frames': 0, 'received': 0}
+        _write_meta(path, meta)
+        return SessionWriter(path, meta)
+
+    def writer(self, session_id):
+        """A writer that appends to an existing session"""
+        return SessionWriter(*self._meta(session_id))
+
+    def reader(self, session_id):
+        return SessionReader(*self._meta(session_id))
+
+    def exists(self, session_id):
+        return os.path.exists(os.path.join(self._path(session_id), 'meta.json'))
+
+    def delete(self, session_id):
+        shutil.rmtree(self._path(session_id), ignore_errors=True)
+
+    def sessions(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root) if os.path.exists(os.path.join(self.root, name, 'meta.json')))
+
+    def size_bytes(self, session_id):
+        path = self._path(session_id)
+        return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+session_store = PostureSessionStore(os.environ.get('POSTURE_STORE_DIR', DEFAULT_ROOT))
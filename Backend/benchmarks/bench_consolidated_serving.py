@@ -0,0 +1,178 @@
+"""Memory and throughput of one serving process versus one per service.
+
+Starts the backend twice under waitress: once the way start.sh used to,
+as separate processes for the API, nutrition, meals and posture apps, and
+once as the single serve.py process. Each layout gets the same mixed load
+(POST /nutrition, GET /meals/summary, GET /sleep) and reports the summed
+resident memory of its processes and the requests per second it served.
+USDA lookups go to a local stub and the spaCy warm-up is disabled, so the
+numbers measure the serving layout rather than the parser.
+
+    python benchmarks/bench_consolidated_serving.py [--duration 10] [--clients 16]
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FOODTRACKER_DIR = os.path.join(BACKEND_DIR, 'foodtracker')
+sys.path.insert(0, os.path.join(BACKEND_DIR, 'benchmarks'))
+
+from usda_stub import StubServer
+
+SERVE = 'import os; from waitress import serve; serve({app}, host="127.0.0.1", ' \
+        'port=int(os.environ["PORT"]), threads=int(os.environ["WAITRESS_THREADS"]))'
+
+# (name, working directory, statement building the WSGI app)
+SPLIT_SERVICES = [
+    ('api', BACKEND_DIR, 'from App import create_app; app = create_app()'),
+    ('nutrition', FOODTRACKER_DIR, 'from app import app'),
+    ('meals', FOODTRACKER_DIR, 'from database import create_standalone_app; app = create_standalone_app()'),
+    ('posture', BACKEND_DIR, 'from PostureCorrector.app import get_app; app = get_app()'),
+]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def rss_kb(pid):
+    with open(f'/proc/{pid}/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+    return 0
+
+
+def start(cwd, code, env, port):
+    env = dict(env, PORT=str(port))
+    return subprocess.Popen([sys.executable, '-c', code], cwd=cwd, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def wait_until_up(url, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            requests.get(url, timeout=1)
+            return
+        except requests.ConnectionError:
+            time.sleep(0.2)
+    raise RuntimeError(f'{url} did not come up')
+
+
+def base_env(work_dir, stub_url, threads):
+    env = dict(os.environ)
+    env.update({
+        'DATABASE_URL': 'sqlite:///' + os.path.join(work_dir, 'app.db'),
+        'MEALS_DATABASE_URL': 'sqlite:///' + os.path.join(work_dir, 'meals.db'),
+        'USDA_CACHE_PATH': os.path.join(work_dir, 'nutrition_cache.db'),
+        'FDC_DB_PATH': os.path.join(work_dir, 'missing-fdc.db'),
+        'USDA_API_URL': stub_url,
+        'API_KEY': 'bench',
+        'SECRET_KEY': 'bench-secret',
+        'SPACY_WARMUP': 'false',
+        'NLP_WORKERS': '0',
+        'PASSWORD_HASH_WORKERS': '0',
+        'AUTH_RATE_LIMIT_ENABLED': 'false',
+        'MAIL_OUTBOX_DISPATCHER': 'false',
+        'SLEEP_COHORT_REFRESHER': 'false',
+        'WORKOUT_REMINDER_DISPATCHER': 'false',
+        'WAITRESS_THREADS': str(threads),
+    })
+    return env
+
+
+def run_layout(split, stub_url, clients, threads, duration):
+    work_dir = tempfile.mkdtemp()
+    env = base_env(work_dir, stub_url, threads)
+    processes = []
+    if split:
+        urls = {}
+        for name, cwd, build in SPLIT_SERVICES:
+            port = free_port()
+            processes.append(start(cwd, build + '; ' + SERVE.format(app='app'), env, port))
+            urls[name] = f'http://127.0.0.1:{port}' + ('/api' if name in ('api', 'posture') else '')
+    else:
+        port = free_port()
+        processes.append(start(BACKEND_DIR, 'import runpy; runpy.run_path("serve.py", run_name="__main__")',
+                               dict(env, HOST='127.0.0.1'), port))
+        urls = dict.fromkeys(('api', 'nutrition', 'meals', 'posture'), f'http://127.0.0.1:{port}/api')
+
+    try:
+        for url in set(urls.values()):
+            wait_until_up(url)
+
+        response = requests.post(f'{urls["api"]}/auth/signup', json={
+            'first_name': 'Bench', 'last_name': 'User', 'email': 'bench@example.com',
+            'password': 'password123', 'date_of_birth': '1990-01-01'})
+        headers = {'Authorization': 'Bearer ' + response.json()['token']}
+        requests.post(f'{urls["meals"]}/meals', headers=headers, json={
+            'type': 'Breakfast', 'date': '2024-01-01', 'food_name': 'egg', 'quantity': 100,
+            'calories': 140, 'protein': 12, 'carbohydrates': 1, 'fat': 10})
+
+        calls = [
+            lambda s: s.post(f'{urls["nutrition"]}/nutrition', json={'text': '2 eggs and toast'}),
+            lambda s: s.get(f'{urls["meals"]}/meals/summary', headers=headers),
+            lambda s: s.get(f'{urls["api"]}/sleep', headers=headers),
+        ]
+        stop = threading.Event()
+        counts = {'ok': 0, 'failed': 0}
+        lock = threading.Lock()
+
+        def client(offset):
+            session = requests.Session()
+            i = offset
+            while not stop.is_set():
+                status = calls[i % len(calls)](session).status_code
+                i += 1
+                with lock:
+                    counts['ok' if status == 200 else 'failed'] += 1
+
+        workers = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+        for worker in workers:
+            worker.start()
+        time.sleep(duration)
+        stop.set()
+        for worker in workers:
+            worker.join()
+
+        rss = sum(rss_kb(process.pid) for process in processes)
+        return {
+            'processes': len(processes),
+            'rss_mb': rss / 1024,
+            'requests_per_second': counts['ok'] / duration,
+            'failed': counts['failed'],
+        }
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--threads', type=int, default=8, help='waitress threads per process')
+    args = parser.parse_args()
+
+    stub = StubServer().start()
+    for label, split in (('one process per service', True), ('single serve.py process', False)):
+        result = run_layout(split, stub.url, args.clients, args.threads, args.duration)
+        print(f"{label:>24}: {result['processes']} process(es), {result['rss_mb']:.1f} MB RSS, "
+              f"{result['requests_per_second']:.0f} req/s ({result['failed']} failed)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Golden-corpus check and speed of the rule-based meal parser.
+
+Checks fastpath.fast_parse against benchmarks/fastpath_golden.json, where
+"expected": null means the entry must fall back to spaCy. When spaCy and
+its model are installed, the same corpus is also run through
+tokenize_by_quantity, which must give the same expected values, and
+--update-golden rewrites them from tokenize_by_quantity's output.
+Then reports parses per second for both paths and the fast-path hit rate.
+
+    python benchmarks/bench_fastpath.py [--parses 20000] [--update-golden]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BACKEND, 'foodtracker'))
+
+import fastpath
+from main import tokenize_by_quantity
+
+GOLDEN = os.path.join(BACKEND, 'benchmarks', 'fastpath_golden.json')
+
+
+def spacy_available():
+    try:
+        from main import get_nlp
+        get_nlp()
+        return True
+    except (ImportError, OSError):
+        return False
+
+
+def rate(parse, texts):
+    start = time.perf_counter()
+    for text in texts:
+        parse(text)
+    return len(texts) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--parses', type=int, default=20000)
+    parser.add_argument('--update-golden', action='store_true',
+                        help="set each fast-path entry's expected value from tokenize_by_quantity")
+    args = parser.parse_args()
+
+    with open(GOLDEN) as f:
+        corpus = json.load(f)
+    if args.update_golden:
+        if not spacy_available():
+            sys.exit('--update-golden needs spaCy and its model')
+        for entry in corpus:
+            if entry['expected'] is not None:
+                entry['expected'] = tokenize_by_quantity(entry['text'])
+        with open(GOLDEN, 'w') as f:
+            json.dump(corpus, f, indent=2)
+        print(f'rewrote {GOLDEN} from tokenize_by_quantity')
+
+    failures = 0
+    for entry in corpus:
+        got = fastpath.fast_parse(entry['text'])
+        if got != entry['expected']:
+            failures += 1
+            print(f'fast path mismatch: {entry["text"]!r}\n  expected {entry["expected"]}\n  got      {got}')
+    print(f'fast path: {len(corpus) - failures}/{len(corpus)} golden entries match')
+
+    have_spacy = spacy_available()
+    if have_spacy:
+        checked = mismatches = 0
+        for entry in corpus:
+            if entry['expected'] is None:
+                continue
+            checked += 1
+            got = tokenize_by_quantity(entry['text'])
+            if got != entry['expected']:
+                mismatches += 1
+                print(f'spaCy mismatch: {entry["text"]!r}\n  expected {entry["expected"]}\n  got      {got}')
+        print(f'spaCy path: {checked - mismatches}/{checked} golden entries match')
+    else:
+        print('spaCy path: skipped (spaCy or its model is not installed)')
+
+    texts = [entry['text'] for entry in corpus]
+    workload = (texts * (args.parses // len(texts) + 1))[:args.parses]
+    print(f'fast_parse: {rate(fastpath.fast_parse, workload):10.0f} parses/s')
+    hits = sum(fastpath.fast_parse(text) is not None for text in texts)
+    print(f'fast-path hit rate on the corpus: {hits / len(texts):.1%}')
+    if have_spacy:
+        sample = workload[:max(args.parses // 20, len(texts))]
+        print(f'tokenize_by_quantity: {rate(tokenize_by_quantity, sample):10.0f} parses/s')
+        print(f'parse_foods: {rate(fastpath.parse_foods, sample):10.0f} parses/s, counters {fastpath.stats()}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Import and lookup speed of the local FoodData Central database.
+
+Writes a synthetic bulk download (food.csv, nutrient.csv, food_nutrient.csv)
+shaped like the real one, imports it with fdc.import_fdc, then times
+LocalNutritionDB.lookup for a mix of one- and two-word food names. Pass
+--csv-dir to use a real unzipped download instead.
+
+    python benchmarks/bench_fdc_lookup.py [--foods 50000] [--lookups 20000]
+"""
+import argparse
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BACKEND, 'foodtracker'))
+
+from fdc import LocalNutritionDB, import_fdc
+
+COMMON = ['apple', 'banana', 'rice', 'chicken', 'breast', 'egg', 'milk', 'bread', 'oat', 'salmon',
+          'broccoli', 'cheese', 'yogurt', 'beef', 'pork', 'orange', 'juice', 'toast', 'bacon', 'potato']
+# A long tail of rarer words, as in the real descriptions
+WORDS = COMMON + [f'ingredient{i}' for i in range(3000)]
+WEIGHTS = [1.0 / (rank + 1) for rank in range(len(WORDS))]
+STYLES = ['raw', 'cooked', 'boiled', 'fried', 'baked', 'canned', 'frozen', 'dried', 'roasted', 'whole']
+TYPES = ['foundation_food', 'sr_legacy_food', 'survey_fndds_food', 'branded_food']
+NUTRIENTS = [('1008', 'Energy', 'KCAL', '208'), ('1003', 'Protein', 'G', '203'),
+             ('1004', 'Total lipid (fat)', 'G', '204'), ('1005', 'Carbohydrate, by difference', 'G', '205'),
+             ('1087', 'Calcium, Ca', 'MG', '301')]
+
+
+def write_synthetic(csv_dir, count, rng):
+    with open(os.path.join(csv_dir, 'nutrient.csv'), 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['id', 'name', 'unit_name', 'nutrient_nbr', 'rank'])
+        writer.writerows(row + ('0',) for row in NUTRIENTS)
+    with open(os.path.join(csv_dir, 'food.csv'), 'w', newline='') as food, \
+            open(os.path.join(csv_dir, 'food_nutrient.csv'), 'w', newline='') as food_nutrient:
+        foods = csv.writer(food)
+        amounts = csv.writer(food_nutrient)
+        foods.writerow(['fdc_id', 'data_type', 'description', 'food_category_id', 'publication_date'])
+        amounts.writerow(['id', 'fdc_id', 'nutrient_id', 'amount'])
+        for fdc_id in range(1, count + 1):
+            names = list(dict.fromkeys(rng.choices(WORDS, WEIGHTS, k=rng.randint(1, 3))))
+            description = ', '.join(names + rng.sample(STYLES, rng.randint(0, 2)))
+            foods.writerow([fdc_id, rng.choice(TYPES), description.capitalize(), '', '2020-01-01'])
+            for nutrient_id, *_ in NUTRIENTS:
+                amounts.writerow([fdc_id * 10 + int(nutrient_id) % 10, fdc_id, nutrient_id, round(rng.uniform(0, 300), 1)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--foods', type=int, default=50000)
+    parser.add_argument('--lookups', type=int, default=20000)
+    parser.add_argument('--csv-dir')
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    work = tempfile.mkdtemp()
+    csv_dir = args.csv_dir
+    if csv_dir is None:
+        csv_dir = work
+        write_synthetic(csv_dir, args.foods, rng)
+
+    db_path = os.path.join(work, 'fdc.db')
+    start = time.perf_counter()
+    count = import_fdc(csv_dir, db_path)
+    print(f'import: {count} foods in {time.perf_counter() - start:.2f}s, {os.path.getsize(db_path) / 1e6:.1f} MB')
+
+    db = LocalNutritionDB(db_path)
+    queries = [' '.join(rng.choices(WORDS, WEIGHTS, k=rng.randint(1, 2))) for _ in range(args.lookups)]
+    queries += ['apples', 'Fried Chicken', 'pizza']  # plural, case, no match
+    for label in ('cold', 'memoized'):
+        if label == 'memoized':
+            for query in queries:
+                db.lookup(query)
+        samples = []
+        found = 0
+        for query in queries:
+            if label == 'cold':
+                db.clear_memo()
+            start = time.perf_counter()
+            found += db.lookup(query) is not None
+            samples.append(time.perf_counter() - start)
+        samples.sort()
+        print(f'{label:>8} lookup: p50 {samples[len(samples) // 2] * 1e6:6.0f} us, '
+              f'p99 {samples[int(len(samples) * 0.99)] * 1e6:6.0f} us, {found}/{len(queries)} found')
+    for query in ('apples', 'Fried Chicken', 'pizza'):
+        print(f'  {query!r}: {db.lookup(query)}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""Latency of an unrelated endpoint (GET /api/sleep) during a login storm.
+
+Serves the app with waitress and runs the storm twice: once with scrypt
+running inline on the request threads (PASSWORD_HASH_WORKERS=0) and once
+through the hashing process pool. Each mode runs in its own interpreter
+because create_app() builds a process-wide singleton.
+
+    python benchmarks/bench_login_storm.py [--duration 10] [--storm 16]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_mode(hash_workers, threads, storm, duration):
+    from waitress.server import create_server
+    from App import create_app
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + db_path,
+        'PASSWORD_HASH_WORKERS': hash_workers,
+        'PASSWORD_HASH_QUEUE_SIZE': max(1, threads // 2),
+        'AUTH_RATE_LIMIT_ENABLED': False  # Measure hashing, not the limiter
+    })
+    credentials = {'email': 'storm@example.com', 'password': 'password123'}
+    response = app.test_client().post('/api/auth/signup', json=dict(
+        credentials, first_name='Storm', last_name='User', date_of_birth='1990-01-01'))
+    headers = {'Authorization': 'Bearer ' + response.get_json()['token']}
+
+    server = create_server(app, host='127.0.0.1', port=0, threads=threads)
+    threading.Thread(target=server.run, daemon=True).start()
+    base_url = f'http://127.0.0.1:{server.effective_port}'
+
+    stop = threading.Event()
+    logins = {'ok': 0, 'busy': 0}
+    latencies = []
+
+    def login_loop():
+        session = requests.Session()
+        while not stop.is_set():
+            status = session.post(f'{base_url}/api/auth/login', json=credentials).status_code
+            logins['ok' if status == 200 else 'busy'] += 1
+
+    def probe_loop():
+        session = requests.Session()
+        while not stop.is_set():
+            start = time.perf_counter()
+            session.get(f'{base_url}/api/sleep', headers=headers)
+            latencies.append((time.perf_counter() - start) * 1000)
+            time.sleep(0.01)
+
+    workers = [threading.Thread(target=login_loop) for _ in range(storm)]
+    workers.append(threading.Thread(target=probe_loop))
+    for worker in workers:
+        worker.start()
+    time.sleep(duration)
+    stop.set()
+    for worker in workers:
+        worker.join()
+    server.close()
+
+    return {
+        'hash_workers': hash_workers,
+        'probe_requests': len(latencies),
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+        'max_ms': round(max(latencies, default=0.0), 2),
+        'logins_ok': logins['ok'],
+        'logins_rejected': logins['busy']
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds per mode')
+    parser.add_argument('--storm', type=int, default=16, help='concurrent login clients')
+    parser.add_argument('--threads', type=int, default=8, help='waitress worker threads')
+    parser.add_argument('--pool', type=int, default=min(4, os.cpu_count() or 1), help='hashing processes')
+    parser.add_argument('--hash-workers', type=int, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.hash_workers is not None:
+        print(json.dumps(run_mode(args.hash_workers, args.threads, args.storm, args.duration)))
+        return
+
+    for hash_workers in (0, args.pool):
+        output = subprocess.run(
+            [sys.executable, __file__, '--hash-workers', str(hash_workers),
+             '--duration', str(args.duration), '--storm', str(args.storm), '--threads', str(args.threads)],
+            capture_output=True, text=True, check=True, cwd=BACKEND_DIR
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        mode = 'inline' if hash_workers == 0 else f'pool({hash_workers})'
+        print(f"{mode:>10}: GET /api/sleep p50={result['p50_ms']}ms p99={result['p99_ms']}ms "
+              f"max={result['max_ms']}ms over {result['probe_requests']} requests; "
+              f"logins ok={result['logins_ok']} rejected={result['logins_rejected']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""Batch parsing throughput against the number of spaCy worker processes.
+
+Every text is one the fast path hands to spaCy, so this measures the
+process pool alone. The pool is started and warmed before timing, as it
+would be in a running server. Needs spaCy and its model.
+
+    python benchmarks/bench_nutrition_batch.py [--texts 2000] [--workers 0,1,2,4]
+"""
+import argparse
+import os
+import sys
+import time
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BACKEND, 'foodtracker'))
+
+import batch
+
+TEMPLATES = [
+    "scrambled eggs with toast and {n} cups of coffee",
+    "i had a big bowl of fried rice with chicken tender",
+    "half a sandwich, twenty five grapes and grilled salmon",
+    "{n} slices of pepperoni pizza with extra cheese",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--texts', type=int, default=2000)
+    parser.add_argument('--workers', default=f'0,1,2,{os.cpu_count() or 1}')
+    args = parser.parse_args()
+
+    texts = [TEMPLATES[i % len(TEMPLATES)].format(n=i % 9 + 2) for i in range(args.texts)]
+    baseline = None
+    for workers in sorted({int(w) for w in args.workers.split(',')}):
+        batch.shutdown()
+        batch.NLP_WORKERS = workers
+        if workers:
+            batch.parse_batch(texts[:batch.MIN_CHUNK_SIZE * workers + 1])  # Start and warm the pool
+        else:
+            batch.get_nlp()
+        start = time.perf_counter()
+        results = batch.parse_batch(texts)
+        elapsed = time.perf_counter() - start
+        assert len(results) == len(texts)
+        rate = len(texts) / elapsed
+        baseline = baseline or rate
+        label = 'in-process' if workers == 0 else f'{workers} workers'
+        print(f'{label:>12}: {rate:8.0f} texts/s ({rate / baseline:4.1f}x)')
+    batch.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""Sequential vs concurrent USDA lookups for one /nutrition request.
+
+Runs against a local stub whose response time differs per food, with the
+nutrition cache bypassed so every lookup goes upstream. Sequential latency
+is the sum of the item delays; the fan-out should track the slowest item.
+A final run with a deadline shorter than the slowest item shows the
+partial result.
+
+    python benchmarks/bench_nutrition_fanout.py [--items 4] [--repeat 20]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BACKEND, 'benchmarks'))
+sys.path.insert(0, os.path.join(BACKEND, 'foodtracker'))
+
+from usda_stub import StubServer
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--items', type=int, default=4)
+    parser.add_argument('--step', type=float, default=0.05, help='extra delay per item, seconds')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    foods = [f'food {i}' for i in range(args.items)]
+    delays = {name: args.step * (i + 1) for i, name in enumerate(foods)}
+    server = StubServer(delay_for=lambda query: delays.get(query, 0.0)).start()
+    os.environ['USDA_API_URL'] = server.url
+    from usda import fetch_usda_nutrition, get_usda_nutrition_many, LookupTimeout
+
+    print(f'{args.items} items, delays {", ".join(f"{d * 1000:.0f}" for d in delays.values())} ms '
+          f'(sum {sum(delays.values()) * 1000:.0f} ms, max {max(delays.values()) * 1000:.0f} ms)')
+    sequential, _ = timed(lambda: [fetch_usda_nutrition(name) for name in foods], args.repeat)
+    print(f'  sequential: {sequential:7.1f} ms')
+    fanout, _ = timed(lambda: get_usda_nutrition_many(foods, 10.0, lookup=fetch_usda_nutrition), args.repeat)
+    print(f'  concurrent: {fanout:7.1f} ms')
+
+    deadline = max(delays.values()) * 0.75
+    elapsed, results = timed(lambda: get_usda_nutrition_many(foods, deadline, lookup=fetch_usda_nutrition), 1)
+    timed_out = sum(isinstance(value, LookupTimeout) for value in results.values())
+    print(f'  deadline {deadline * 1000:.0f} ms: {elapsed:7.1f} ms, '
+          f'{len(results) - timed_out} complete, {timed_out} timed out')
+
+
+if __name__ == '__main__':
+    main()
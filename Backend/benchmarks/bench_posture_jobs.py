@@ -0,0 +1,121 @@
+"""Upload latency and throughput of the posture recording job queue.
+
+Posts a batch of recordings to POST /api/posture/jobs and measures how long
+each upload request takes (spooling and queueing only), then how long the
+process pool takes to finish them all. The stub estimator stands in for
+pose estimation and sleeps --model-seconds per recording. For comparison,
+it also times one recording analysed inline, which is how long a request
+thread would be held if uploads were analysed during the request.
+Each worker count runs in its own interpreter because create_app() builds
+a process-wide singleton.
+
+    python benchmarks/bench_posture_jobs.py [--jobs 16] [--model-seconds 0.5] [--size-kb 2048]
+"""
+import argparse
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import jwt
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_mode(workers, jobs, size_kb):
+    from App import create_app, db
+    from PostureCorrector.jobs import PostureJob, run_job
+
+    work_dir = tempfile.mkdtemp()
+    payload = os.urandom(size_kb * 1024)
+    inline_path = os.path.join(work_dir, 'inline.mp4')
+    with open(inline_path, 'wb') as f:
+        f.write(payload)
+
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(work_dir, 'bench.db'),
+        'PASSWORD_HASH_WORKERS': 0,
+        'MAIL_OUTBOX_DISPATCHER': False,
+        'SLEEP_COHORT_REFRESHER': False,
+        'WORKOUT_REMINDER_DISPATCHER': False,
+        'POSTURE_JOB_WORKERS': workers,
+        'POSTURE_JOB_MAX_QUEUED': jobs,
+        'POSTURE_SPOOL_DIR': os.path.join(work_dir, 'spool')
+    })
+
+    start = time.perf_counter()
+    run_job('inline', inline_path, app.config['POSTURE_ESTIMATOR'])
+    inline_ms = (time.perf_counter() - start) * 1000
+
+    client = app.test_client()
+    token = jwt.encode({'user_id': 1, 'exp': datetime.utcnow() + timedelta(hours=1)}, app.config['SECRET_KEY'])
+    client.environ_base['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+    latencies = []
+    start = time.perf_counter()
+    for i in range(jobs):
+        upload_start = time.perf_counter()
+        response = client.post('/api/posture/jobs', data={'file': (io.BytesIO(payload), f'rec{i}.mp4')},
+                               content_type='multipart/form-data')
+        latencies.append((time.perf_counter() - upload_start) * 1000)
+        assert response.status_code == 202, response.get_json()
+
+    with app.app_context():
+        while PostureJob.query.filter(PostureJob.status.notin_(('done', 'failed'))).count():
+            db.session.remove()
+            time.sleep(0.05)
+        failed = PostureJob.query.filter_by(status='failed').count()
+    elapsed = time.perf_counter() - start
+
+    return {
+        'workers': workers,
+        'inline_ms': round(inline_ms, 1),
+        'upload_p50_ms': round(percentile(latencies, 50), 2),
+        'upload_p99_ms': round(percentile(latencies, 99), 2),
+        'drain_seconds': round(elapsed, 2),
+        'jobs_per_second': round(jobs / elapsed, 2),
+        'failed': failed
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--jobs', type=int, default=16)
+    parser.add_argument('--model-seconds', type=float, default=0.5, help='stub estimator time per recording')
+    parser.add_argument('--size-kb', type=int, default=2048, help='upload size (the stub makes 1 s of video per 100 KB)')
+    parser.add_argument('--pool', type=int, default=min(4, os.cpu_count() or 1), help='job worker processes')
+    parser.add_argument('--workers', type=int, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.workers is not None:
+        print(json.dumps(run_mode(args.workers, args.jobs, args.size_kb)))
+        return
+
+    env = dict(os.environ, POSTURE_STUB_DELAY=str(args.model_seconds), SPACY_WARMUP='false',
+               POSTURE_STORE_DIR=tempfile.mkdtemp())
+    for workers in sorted({1, args.pool}):
+        output = subprocess.run(
+            [sys.executable, __file__, '--workers', str(workers), '--jobs', str(args.jobs),
+             '--size-kb', str(args.size_kb)],
+            capture_output=True, text=True, check=True, cwd=BACKEND_DIR, env=env
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"pool({workers}): upload p50={result['upload_p50_ms']}ms p99={result['upload_p99_ms']}ms "
+              f"(inline analysis {result['inline_ms']}ms); {args.jobs} jobs done in {result['drain_seconds']}s "
+              f"= {result['jobs_per_second']} jobs/s, {result['failed']} failed")
+
+
+if __name__ == '__main__':
+    main()
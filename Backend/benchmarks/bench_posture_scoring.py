@@ -0,0 +1,76 @@
+"""Frames per second of the posture scoring behind POST /api/analyze_posture.
+
+Generates MoveNet-shaped keypoint frames (a seated upper body with jitter,
+some frames with low-confidence hips or ears) and scores them three ways:
+one frame per call (what a per-frame loop costs), whole 30-frame windows
+through scoring.analyze, and 30-frame windows posted to the endpoint,
+which adds JSON decoding and encoding.
+
+    python benchmarks/bench_posture_scoring.py [--frames 30000] [--window 30]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from PostureCorrector.scoring import analyze
+
+# A person sitting upright, in 640x480 pixels
+BASE_POSE = np.array([
+    [320, 140], [305, 128], [335, 128], [290, 135], [350, 135],
+    [260, 230], [380, 230], [240, 320], [400, 320], [250, 400], [390, 400],
+    [285, 420], [355, 420], [285, 470], [355, 470], [285, 480], [355, 480],
+], dtype=np.float32)
+
+
+def make_frames(count, seed=0):
+    rng = np.random.default_rng(seed)
+    xy = BASE_POSE + rng.normal(0, 6, size=(count, 17, 2)).astype(np.float32)
+    xy += rng.normal(0, 15, size=(count, 1, 2)).astype(np.float32)  # Leaning around in the chair
+    scores = rng.uniform(0.5, 0.95, size=(count, 17, 1)).astype(np.float32)
+    scores[rng.random(count) < 0.3, 11:13] = 0.1  # Hips out of view
+    scores[rng.random(count) < 0.1, 3:5] = 0.1  # Ears hidden
+    return np.concatenate([xy, scores], axis=2)
+
+
+def frames_per_second(windows, score, frames):
+    start = time.perf_counter()
+    for window in windows:
+        score(window)
+    return frames / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--frames', type=int, default=30000)
+    parser.add_argument('--window', type=int, default=30, help='frames per request (30 = one second at 30 fps)')
+    args = parser.parse_args()
+
+    frames = make_frames(args.frames)
+    windows = [frames[i:i + args.window] for i in range(0, len(frames), args.window)]
+    payloads = [{'frames': window.tolist()} for window in windows]
+
+    per_frame = frames_per_second([frames[i:i + 1] for i in range(len(frames))], analyze, len(frames))
+    batched = frames_per_second(windows, analyze, len(frames))
+
+    from flask import Flask
+    from PostureCorrector.posture import posture_blueprint
+    app = Flask(__name__)
+    app.register_blueprint(posture_blueprint, url_prefix='/api')
+    client = app.test_client()
+    endpoint = frames_per_second(payloads, lambda payload: client.post('/api/analyze_posture', json=payload),
+                                 len(frames))
+
+    print(f'{args.frames} frames, windows of {args.window}')
+    print(f'  one frame per call:         {per_frame:>9.0f} frames/s')
+    print(f'  scoring.analyze per window: {batched:>9.0f} frames/s')
+    print(f'  POST /api/analyze_posture:  {endpoint:>9.0f} frames/s')
+
+
+if __name__ == '__main__':
+    main()
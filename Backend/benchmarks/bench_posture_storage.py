@@ -0,0 +1,111 @@
+"""Size and read speed of stored posture sessions.
+
+Writes the same synthetic 30 fps session (see bench_posture_scoring.py) in
+each PostureSessionStore encoding, and as one SQLite row per keypoint for
+comparison. Then reports bytes per frame, append throughput, full-session
+read throughput, and random one-second time-range reads per second.
+
+    python benchmarks/bench_posture_storage.py [--minutes 10] [--range-reads 2000]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, 'benchmarks'))
+
+from bench_posture_scoring import make_frames
+from PostureCorrector.scoring import KEYPOINTS
+from PostureCorrector.storage import PostureSessionStore
+
+FPS = 30
+
+
+def bench_store(store, name, timestamps, frames, range_reads, **options):
+    writer = store.create(name, **options)
+    start = time.perf_counter()
+    for i in range(0, len(frames), FPS):  # One append per second of video
+        writer.append(timestamps[i:i + FPS], frames[i:i + FPS])
+    writer.close()
+    write_rate = len(frames) / (time.perf_counter() - start)
+
+    reader = store.reader(name)
+    start = time.perf_counter()
+    _, stored = reader.read()
+    float(stored[:, :, 2].sum())  # Touch every frame so mapped pages are actually read
+    read_rate = len(stored) / (time.perf_counter() - start)
+
+    starts = [random.uniform(timestamps[0], timestamps[-1] - 1) for _ in range(range_reads)]
+    start = time.perf_counter()
+    for t in starts:
+        _, window = reader.read(t, t + 1.0)
+        float(window[:, :, 2].sum())
+    range_rate = range_reads / (time.perf_counter() - start)
+    return store.size_bytes(name) / len(frames), write_rate, read_rate, range_rate
+
+
+def bench_sqlite(path, timestamps, frames, range_reads):
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE keypoint (session_id INTEGER, t REAL, keypoint INTEGER, x REAL, y REAL, score REAL)')
+    conn.execute('CREATE INDEX ix_keypoint_session_t ON keypoint (session_id, t)')
+    start = time.perf_counter()
+    for i in range(0, len(frames), FPS):
+        conn.executemany('INSERT INTO keypoint VALUES (1, ?, ?, ?, ?, ?)', [
+            (float(t), k, float(x), float(y), float(score))
+            for t, frame in zip(timestamps[i:i + FPS], frames[i:i + FPS])
+            for k, (x, y, score) in enumerate(frame)
+        ])
+        conn.commit()
+    write_rate = len(frames) / (time.perf_counter() - start)
+
+    query = 'SELECT t, x, y, score FROM keypoint WHERE session_id = 1 AND t >= ? AND t < ? ORDER BY t, keypoint'
+    start = time.perf_counter()
+    rows = conn.execute(query, (timestamps[0], timestamps[-1] + 1)).fetchall()
+    np.array(rows, dtype=np.float32)[:, 1:].reshape(-1, len(KEYPOINTS), 3)
+    read_rate = len(frames) / (time.perf_counter() - start)
+
+    starts = [random.uniform(timestamps[0], timestamps[-1] - 1) for _ in range(range_reads)]
+    start = time.perf_counter()
+    for t in starts:
+        rows = conn.execute(query, (t, t + 1.0)).fetchall()
+        np.array(rows, dtype=np.float32)
+    range_rate = range_reads / (time.perf_counter() - start)
+    conn.close()
+    return os.path.getsize(path) / len(frames), write_rate, read_rate, range_rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--minutes', type=float, default=10.0)
+    parser.add_argument('--range-reads', type=int, default=2000)
+    args = parser.parse_args()
+
+    count = int(args.minutes * 60 * FPS)
+    frames = make_frames(count)
+    timestamps = 1.7e9 + np.arange(count) / FPS
+    work_dir = tempfile.mkdtemp()
+    store = PostureSessionStore(os.path.join(work_dir, 'sessions'))
+
+    results = [
+        ('raw float32', bench_store(store, 'raw', timestamps, frames, args.range_reads, encoding='raw')),
+        ('delta16', bench_store(store, 'delta16', timestamps, frames, args.range_reads, encoding='delta16')),
+        ('delta16, stride 3', bench_store(store, 'strided', timestamps, frames, args.range_reads,
+                                          encoding='delta16', stride=3)),
+        ('sqlite row per keypoint', bench_sqlite(os.path.join(work_dir, 'rows.db'), timestamps, frames,
+                                                 args.range_reads)),
+    ]
+    print(f'{count} frames ({args.minutes:g} min at {FPS} fps); append in frames received/s, full read in frames returned/s')
+    print(f'{"":>24}  {"bytes/frame":>11}  {"append/s":>10}  {"full read/s":>12}  {"1 s ranges/s":>12}')
+    for label, (size, write_rate, read_rate, range_rate) in results:
+        print(f'{label:>24}  {size:>11.1f}  {write_rate:>10.0f}  {read_rate:>12.0f}  {range_rate:>12.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""Per-frame cost of the streaming rep counter behind /api/reps/sessions.
+
+Synthesizes a person doing curls and squats, one rep every two seconds at
+30 fps with keypoint jitter, as plain [x, y, score] lists like the JSON the
+endpoint receives. Reports microseconds per frame for a single session,
+throughput with many sessions fed from several threads at once, and how
+many 30 fps streams that adds up to. It also checks that the counted reps
+match the synthesized ones.
+
+    python benchmarks/bench_rep_counter.py [--seconds 60] [--sessions 200] [--threads 8]
+"""
+import argparse
+import math
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from PostureCorrector.reps import RepSessionRegistry
+
+FPS = 30
+REP_SECONDS = 2.0
+
+
+def _limb(origin, length, degrees):
+    return [origin[0] + length * math.cos(math.radians(degrees)), origin[1] + length * math.sin(math.radians(degrees))]
+
+
+def make_frames(seconds, seed=0):
+    """Frames of curls and squats in step; returns (frames, reps)"""
+    rng = random.Random(seed)
+    frames = []
+    for i in range(int(seconds * FPS)):
+        # Joint angle swings between 175 (straight) and 30 (curl) / 80 (squat)
+        phase = (1 - math.cos(2 * math.pi * i / (FPS * REP_SECONDS))) / 2
+        elbow, knee = 175 - 145 * phase, 175 - 95 * phase
+        points = [[320, 140]] * 5 + [None] * 12
+        for side, x in ((0, 260), (1, 380)):
+            shoulder = [x, 230]
+            elbow_point = _limb(shoulder, 90, 90)  # Upper arm hangs straight down
+            wrist = _limb(elbow_point, 80, 90 + (180 - elbow) * (1 if side else -1))
+            hip = [x + 25 * (1 if side == 0 else -1), 420]
+            knee_point = _limb(hip, 100, 90 - (180 - knee) / 2)
+            ankle = _limb(knee_point, 100, 90 + (180 - knee) / 2)
+            points[5 + side], points[7 + side], points[9 + side] = shoulder, elbow_point, wrist
+            points[11 + side], points[13 + side], points[15 + side] = hip, knee_point, ankle
+        frames.append([[p[0] + rng.gauss(0, 2), p[1] + rng.gauss(0, 2), rng.uniform(0.4, 0.95)] for p in points])
+    return frames, int(seconds / REP_SECONDS)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=60.0, help='length of each synthetic stream')
+    parser.add_argument('--sessions', type=int, default=200)
+    parser.add_argument('--threads', type=int, default=8)
+    args = parser.parse_args()
+
+    frames, expected = make_frames(args.seconds)
+    registry = RepSessionRegistry(max_sessions=args.sessions + 1)
+
+    session = registry.create()
+    start = time.perf_counter()
+    for frame in frames:
+        session.feed([frame])
+    one_by_one = (time.perf_counter() - start) / len(frames) * 1e6
+    state = session.state()
+    print(f'counted curls={state["curl"]["reps"]} squats={state["squat"]["reps"]}, expected {expected} each')
+
+    session = registry.create()
+    windows = [frames[i:i + FPS] for i in range(0, len(frames), FPS)]
+    start = time.perf_counter()
+    for window in windows:
+        session.feed(window)
+    per_window = (time.perf_counter() - start) / len(frames) * 1e6
+
+    sessions = [registry.create() for _ in range(args.sessions - 2)]
+
+    def stream(session):
+        for window in windows:
+            session.feed(window)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.threads) as pool:
+        list(pool.map(stream, sessions))
+    elapsed = time.perf_counter() - start
+    total = len(sessions) * len(frames)
+
+    print(f'one frame per feed():     {one_by_one:6.2f} us/frame')
+    print(f'{FPS}-frame windows:        {per_window:6.2f} us/frame')
+    print(f'{len(sessions)} sessions, {args.threads} threads: {total / elapsed:,.0f} frames/s '
+          f'= {total / elapsed / FPS:,.0f} concurrent {FPS} fps streams')
+
+
+if __name__ == '__main__':
+    main()
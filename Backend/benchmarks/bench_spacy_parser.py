@@ -0,0 +1,63 @@
+"""Startup and per-parse cost of the food parser's spaCy pipeline.
+
+Each configuration runs in a fresh interpreter and reports the time to
+import foodtracker/main.py, the time of the first parse (which now loads
+the model) and the median latency of later parses. The default trimmed
+pipeline is compared with the full one (SPACY_EXCLUDE="").
+
+    python benchmarks/bench_spacy_parser.py [--parses 500]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SENTENCES = [
+    "i ate 2 eggs, toast and orange juice",
+    "today i ate a bowl of rice with 200 grams chicken breast",
+    "i had three slices of pizza and a can of coke",
+    "some almonds, 1 banana and 2 cups of milk",
+]
+
+CHILD = """
+import json, statistics, sys, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter() - start
+start = time.perf_counter()
+main.tokenize_by_quantity(SENTENCES[0])
+first = time.perf_counter() - start
+samples = []
+for i in range(PARSES):
+    start = time.perf_counter()
+    main.tokenize_by_quantity(SENTENCES[i % len(SENTENCES)])
+    samples.append(time.perf_counter() - start)
+print(json.dumps({'pipes': main.get_nlp().pipe_names, 'import': imported, 'first': first,
+                  'median': statistics.median(samples)}))
+"""
+
+
+def run(exclude, parses):
+    env = dict(os.environ, SPACY_EXCLUDE=exclude)
+    code = f'SENTENCES = {SENTENCES!r}\nPARSES = {parses}\n' + CHILD
+    output = subprocess.run([sys.executable, '-c', code], cwd=os.path.join(BACKEND, 'foodtracker'),
+                            env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--parses', type=int, default=500)
+    args = parser.parse_args()
+
+    for label, exclude in (('full pipeline', ''), ('trimmed', os.getenv('SPACY_EXCLUDE', 'ner,lemmatizer'))):
+        result = run(exclude, args.parses)
+        print(f'{label:>14}: import {result["import"] * 1000:6.0f} ms, first parse {result["first"] * 1000:6.0f} ms, '
+              f'parse p50 {result["median"] * 1000:5.2f} ms  {result["pipes"]}')
+
+
+if __name__ == '__main__':
+    main()
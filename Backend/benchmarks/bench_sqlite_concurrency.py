@@ -0,0 +1,107 @@
+"""Mixed read/write throughput on SQLite, stock engine vs the tuned one.
+
+Writer threads insert sleep-like rows in small transactions while reader
+threads run indexed range queries, for a fixed duration, against a fresh
+database file. "stock" is a plain create_engine() (rollback journal,
+synchronous=FULL, the driver's 5 s lock wait); "tuned" is
+App.engine.make_engine with the default pragmas and pool. Reports operations per second and how many failed with
+"database is locked".
+
+    python benchmarks/bench_sqlite_concurrency.py [--writers 4] [--readers 8] [--seconds 5]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import Column, Date, Float, Index, Integer, MetaData, Table, create_engine, func, insert, select
+from sqlalchemy.exc import OperationalError
+
+from App.engine import config_from_env, make_engine
+
+metadata = MetaData()
+records = Table(
+    'records', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('user_id', Integer, nullable=False),
+    Column('day', Integer, nullable=False),
+    Column('value', Float, nullable=False),
+    Index('ix_records_user_id_day', 'user_id', 'day'),
+)
+
+
+def run(engine, writers, readers, seconds, users=500):
+    metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(records), [
+            {'user_id': i % users, 'day': i // users, 'value': 1.0} for i in range(20000)
+        ])
+    counts = {'writes': 0, 'reads': 0, 'locked': 0, 'other': 0}
+    lock = threading.Lock()
+    stop = time.perf_counter() + seconds
+
+    def count(key):
+        with lock:
+            counts[key] += 1
+
+    def writer(seed):
+        rng = random.Random(seed)
+        while time.perf_counter() < stop:
+            try:
+                with engine.begin() as conn:
+                    conn.execute(insert(records), [
+                        {'user_id': rng.randrange(users), 'day': rng.randrange(365), 'value': rng.random()}
+                        for _ in range(5)
+                    ])
+                count('writes')
+            except OperationalError as e:
+                count('locked' if 'locked' in str(e) else 'other')
+
+    def reader(seed):
+        rng = random.Random(seed)
+        while time.perf_counter() < stop:
+            user_id = rng.randrange(users)
+            try:
+                with engine.connect() as conn:
+                    conn.execute(
+                        select(func.count(), func.avg(records.c.value))
+                        .where(records.c.user_id == user_id, records.c.day.between(0, 90))
+                    ).one()
+                count('reads')
+            except OperationalError as e:
+                count('locked' if 'locked' in str(e) else 'other')
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+    threads += [threading.Thread(target=reader, args=(100 + i,)) for i in range(readers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+
+    config = config_from_env()
+    config['DB_POOL_SIZE'] = max(config['DB_POOL_SIZE'], args.writers + args.readers)
+    for label in ('stock', 'tuned'):
+        url = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+        engine = create_engine(url) if label == 'stock' else make_engine(url, config)
+        counts = run(engine, args.writers, args.readers, args.seconds)
+        print(f'{label:>6}: {counts["writes"] / args.seconds:8.0f} writes/s, {counts["reads"] / args.seconds:8.0f} reads/s, '
+              f'{counts["locked"]} "database is locked", {counts["other"]} other errors')
+
+
+if __name__ == '__main__':
+    main()
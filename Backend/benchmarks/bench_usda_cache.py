@@ -0,0 +1,74 @@
+"""USDA lookups through the persistent nutrition cache.
+
+Starts a local stub of the FoodData Central search endpoint with a fixed
+delay, then replays a skewed stream of food names (a few foods dominate,
+as in real meal logs) from several threads. Reports wall time, upstream
+calls and the cache's hit ratio, cold and then warm.
+
+    python benchmarks/bench_usda_cache.py [--lookups 2000] [--delay 0.05]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BACKEND, 'benchmarks'))
+sys.path.insert(0, os.path.join(BACKEND, 'foodtracker'))
+
+from usda_stub import StubServer
+
+FOODS = ['apple', 'banana', 'white rice', 'chicken breast', 'egg', 'milk', 'bread', 'oatmeal',
+         'salmon', 'broccoli', 'unknown dish'] + [f'food {i}' for i in range(200)]
+
+
+def replay(names, threads):
+    from usda import get_usda_nutrition
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(get_usda_nutrition, names))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lookups', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--delay', type=float, default=0.05)
+    args = parser.parse_args()
+
+    server = StubServer(delay=args.delay).start()
+    os.environ['USDA_API_URL'] = server.url
+    os.environ['USDA_CACHE_PATH'] = os.path.join(tempfile.mkdtemp(), 'nutrition_cache.db')
+    from usda import nutrition_cache, fetch_usda_nutrition
+
+    rng = random.Random(7)
+    weights = [1.0 / (rank + 1) for rank in range(len(FOODS))]
+    names = [rng.choices(FOODS, weights)[0] for _ in range(args.lookups)]
+    # Mixed spelling still hits the same key
+    names = [name.title() if i % 3 == 0 else name for i, name in enumerate(names)]
+
+    sample = names[:200]
+    start = time.perf_counter()
+    for name in sample:
+        fetch_usda_nutrition(name)
+    uncached = (time.perf_counter() - start) / len(sample) * args.lookups
+    print(f'uncached (estimated): {uncached:7.2f}s for {args.lookups} lookups')
+    server.calls = 0
+    nutrition_cache.reset_stats()
+
+    for label in ('cold cache', 'warm cache'):
+        elapsed = replay(names, args.threads)
+        stats = nutrition_cache.stats()
+        print(f'{label:>20}: {elapsed:7.2f}s, {server.calls} upstream calls, '
+              f'hit ratio {stats["hit_ratio"]:.3f}, {stats["coalesced"]} coalesced, '
+              f'{stats["negative_hits"]} negative hits')
+        server.calls = 0
+        nutrition_cache.reset_stats()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""Local stand-in for the FoodData Central search endpoint.
+
+Answers /fdc/v1/foods/search with one canned food per query after an
+optional (per-query) delay, and counts the calls it receives. Queries containing
+"unknown" get an empty result, so "not found" paths can be exercised.
+
+    python benchmarks/usda_stub.py [--port 8765] [--delay 0.2]
+"""
+import argparse
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import time
+
+
+def stub_food(query):
+    seed = sum(map(ord, query)) % 100
+    return {
+        "description": query.upper(),
+        "foodNutrients": [
+            {"nutrientNumber": "208", "value": 50 + seed},
+            {"nutrientNumber": "203", "value": round(seed / 10, 1)},
+            {"nutrientNumber": "204", "value": round(seed / 20, 1)},
+            {"nutrientNumber": "205", "value": round(seed / 5, 1)},
+        ],
+    }
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port=0, delay=0.0, delay_for=None):
+        super().__init__(('127.0.0.1', port), _Handler)
+        self.delay = delay
+        self.delay_for = delay_for  # Optional per-query delay, overrides `delay`
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_address[1]}/fdc/v1/foods/search'
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        with self.server._lock:
+            self.server.calls += 1
+        query = parse_qs(urlparse(self.path).query).get('query', [''])[0]
+        delay = self.server.delay_for(query) if self.server.delay_for else self.server.delay
+        if delay:
+            time.sleep(delay)
+        foods = [] if 'unknown' in query else [stub_food(query)]
+        body = json.dumps({"foods": foods}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--delay', type=float, default=0.2)
+    args = parser.parse_args()
+    server = StubServer(args.port, args.delay)
+    print(f'Serving {server.url} with {args.delay}s delay')
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,15 @@
+"""Nutrition parsing and lookup, plus meal logging, mounted by App.create_app.
+
+The modules import each other by bare name so that they also run on their
+own from this directory (python app.py), so the directory goes on sys.path
+before they are imported.
+"""
+import os
+import sys
+
+_here = os.path.dirname(os.path.abspath(__file__))
+if _here not in sys.path:
+    sys.path.insert(0, _here)
+
+from nutrition import nutrition_blueprint, start_warm_up
+from database import meals_blueprint, migrate as migrate_meals, assign_orphaned_meals_command
@@ -0,0 +1,75 @@
+"""Parse many meal entries at once for /nutrition/batch.
+
+Entries the fast path can read are parsed inline. The rest are split into
+chunks and run through nlp.pipe in a pool of worker processes, each of
+which loads the spaCy model once when it starts. That takes spaCy's
+CPU-bound work off the GIL, so it scales with cores.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from fastpath import fast_parse, record_parses
+from main import get_nlp, tokenize_many
+
+NLP_WORKERS = int(os.getenv("NLP_WORKERS", os.cpu_count() or 1))  # 0 parses in-process
+NLP_PIPE_BATCH_SIZE = int(os.getenv("NLP_PIPE_BATCH_SIZE", 64))
+MIN_CHUNK_SIZE = 8  # Smaller chunks cost more in pickling than they save
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _init_worker():
+    get_nlp()
+
+
+def _parse_chunk(texts):
+    return tokenize_many(texts, NLP_PIPE_BATCH_SIZE)
+
+
+def get_pool():
+    """The worker pool, started on first use"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # Not fork: the pool starts mid-request, and a child forked while the warm-up
+                # thread holds main._nlp_lock would block on it forever in _init_worker
+                methods = multiprocessing.get_all_start_methods()
+                _pool = ProcessPoolExecutor(
+                    max_workers=NLP_WORKERS,
+                    mp_context=multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn"),
+                    initializer=_init_worker
+                )
+    return _pool
+
+
+def shutdown():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def parse_batch(texts):
+    """Foods for each text, in input order"""
+    results = [fast_parse(text) for text in texts]
+    pending = [i for i, foods in enumerate(results) if foods is None]
+    record_parses(len(texts) - len(pending), len(pending))
+    if not pending:
+        return results
+
+    fallback_texts = [texts[i] for i in pending]
+    if NLP_WORKERS <= 0 or len(fallback_texts) <= MIN_CHUNK_SIZE:
+        parsed = tokenize_many(fallback_texts, NLP_PIPE_BATCH_SIZE)
+    else:
+        # One chunk per worker, so each pipes a contiguous run of texts
+        size = max(MIN_CHUNK_SIZE, -(-len(fallback_texts) // NLP_WORKERS))
+        chunks = [fallback_texts[i:i + size] for i in range(0, len(fallback_texts), size)]
+        parsed = [foods for chunk in get_pool().map(_parse_chunk, chunks) for foods in chunk]
+
+    for i, foods in zip(pending, parsed):
+        results[i] = foods
+    return results
@@ -0,0 +1,186 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+
+def normalize_key(food_name):
+    """'  Green  Apples! ' -> 'green apples'"""
+    text = re.sub(r"[^\w\s]", " ", (food_name or "").lower())
+    return " ".join(text.split())
+
+
+class _Flight:
+    """One in-progress upstream lookup that other threads can wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class NutritionCache:
+    """Persistent cache of USDA lookups in a small SQLite file.
+
+    Entries expire after `ttl` seconds ("not found" answers after
+    `negative_ttl`), the least recently used rows are evicted beyond
+    `max_entries`, and concurrent misses for the same key share one
+    upstream call.
+
+    Hits are read-only: access times are kept in memory and written once
+    every `touch_batch` hits, and eviction runs every `evict_every` inserts,
+    so the table can briefly hold that many rows over `max_entries`.
+    """
+
+    def __init__(self, path, ttl=7 * 24 * 3600, negative_ttl=24 * 3600, max_entries=10000,
+                 touch_batch=100, evict_every=None):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.touch_batch = touch_batch
+        self.evict_every = evict_every or max(1, max_entries // 100)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS nutrition_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )""")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_nutrition_cache_accessed_at ON nutrition_cache (accessed_at)")
+        self._db_lock = threading.Lock()
+        self._touched = {}  # key -> last access time not yet written
+        self._hits = 0  # since those were last written
+        self._inserts = 0  # since the last eviction
+        self._flights = {}
+        self._flights_lock = threading.Lock()
+        self._stats = {"hits": 0, "negative_hits": 0, "misses": 0, "coalesced": 0, "upstream_calls": 0, "errors": 0}
+
+    def _count(self, name):
+        with self._flights_lock:
+            self._stats[name] += 1
+
+    def _lookup(self, key):
+        """(found, value) for a fresh entry, noting the access for LRU"""
+        now = time.time()
+        with self._db_lock:
+            row = self._conn.execute(
+                "SELECT value FROM nutrition_cache WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+            if row is None:
+                return False, None
+            self._touched[key] = now
+            self._hits += 1
+            if self._hits >= self.touch_batch:
+                self._flush_touched()
+        return True, None if row[0] is None else json.loads(row[0])
+
+    def _flush_touched(self):
+        """Write pending access times in one statement (hold _db_lock)"""
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE nutrition_cache SET accessed_at = ? WHERE key = ?",
+                [(accessed_at, key) for key, accessed_at in self._touched.items()]
+            )
+            self._touched.clear()
+        self._hits = 0
+
+    def _store(self, key, value):
+        now = time.time()
+        ttl = self.ttl if value is not None else self.negative_ttl
+        with self._db_lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO nutrition_cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, None if value is None else json.dumps(value), now + ttl, now)
+            )
+            self._touched.pop(key, None)
+            self._inserts += 1
+            if self._inserts >= self.evict_every:
+                self._evict()
+
+    def _evict(self):
+        """Delete the least recently used rows beyond the size limit (hold _db_lock)"""
+        self._flush_touched()
+        self._conn.execute("""
+            DELETE FROM nutrition_cache WHERE key IN (
+                SELECT key FROM nutrition_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+            )""", (self.max_entries,))
+        self._inserts = 0
+
+    def get_or_fetch(self, food_name, fetch):
+        """Cached value for food_name, calling fetch(food_name) at most once per key on a miss"""
+        key = normalize_key(food_name)
+        found, value = self._lookup(key)
+        if found:
+            self._count("hits" if value is not None else "negative_hits")
+            return value
+
+        with self._flights_lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self._stats["misses"] += 1
+            else:
+                self._stats["coalesced"] += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            self._count("upstream_calls")
+            flight.value = fetch(food_name)
+            self._store(key, flight.value)  # None is cached too, as "not found"
+        except Exception as e:
+            # Failures are not cached; the next request tries upstream again
+            self._count("errors")
+            flight.error = e
+            raise
+        finally:
+            with self._flights_lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.value
+
+    def purge_expired(self):
+        with self._db_lock:
+            return self._conn.execute("DELETE FROM nutrition_cache WHERE expires_at <= ?", (time.time(),)).rowcount
+
+    def clear(self):
+        with self._db_lock:
+            self._conn.execute("DELETE FROM nutrition_cache")
+            self._touched.clear()
+            self._hits = self._inserts = 0
+
+    def reset_stats(self):
+        with self._flights_lock:
+            self._stats = dict.fromkeys(self._stats, 0)
+
+    def stats(self):
+        with self._db_lock:
+            entries = self._conn.execute("SELECT count(*) FROM nutrition_cache").fetchone()[0]
+        with self._flights_lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["negative_hits"] + stats["misses"] + stats["coalesced"]
+        served = stats["hits"] + stats["negative_hits"] + stats["coalesced"]
+        stats["entries"] = entries
+        stats["hit_ratio"] = round(served / lookups, 4) if lookups else 0.0
+        return stats
+
+
+def cache_from_env():
+    return NutritionCache(
+        os.getenv("USDA_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "nutrition_cache.db")),
+        ttl=int(os.getenv("USDA_CACHE_TTL", 7 * 24 * 3600)),
+        negative_ttl=int(os.getenv("USDA_CACHE_NEGATIVE_TTL", 24 * 3600)),
+        max_entries=int(os.getenv("USDA_CACHE_MAX_ENTRIES", 10000)),
+        touch_batch=int(os.getenv("USDA_CACHE_TOUCH_BATCH", 100)),
+        evict_every=int(os.getenv("USDA_CACHE_EVICT_EVERY", 0)) or None  # 0: max_entries / 100
+    )
@@ -1,16 +1,29 @@
-from flask import Flask, request, jsonify
-from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime
+from flask import Blueprint, Flask, current_app, request, jsonify
+from flask.cli import with_appcontext
+from datetime import datetime, timedelta
+from functools import wraps
+from sqlalchemy import func, inspect, text
 from sqlalchemy.exc import SQLAlchemyError
+import click
+import jwt
+import os
+import sys
 
-app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///meals.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-db = SQLAlchemy(app)
+# Meals live on the main app's db (bind "meals"), so both share one engine setup
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from App import db, meals_database_url
+from App.engine import init_app as init_engine
+
+meals_blueprint = Blueprint('meals', __name__)
+
+MAX_SUMMARY_DAYS = 366
 
 
 class Meal(db.Model):
+    __bind_key__ = 'meals'
+
     id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=True)  # Empty for meals from before user scoping (assign-orphaned-meals)
     type = db.Column(db.String(50), nullable=False)
     name = db.Column(db.String(100), nullable=False)
     quantity = db.Column(db.Float, nullable=False)
@@ -20,17 +33,70 @@ class Meal(db.Model):
     carbohydrates = db.Column(db.Float, nullable=True)
     fat = db.Column(db.Float, nullable=True)
 
-
-# Create the tables immediately when the script runs
-with app.app_context():
-    db.create_all()
-
-
-@app.route('/nutrition', methods=['POST'])
-def add_meal():
+    # Serves every per-user query: a day, a date range and the summary
+    __table_args__ = (
+        db.Index('ix_meal_user_id_date', 'user_id', 'date'),
+    )
+
+
+def migrate():
+    """Bring a meals.db created before user scoping up to date (needs an app context)"""
+    engine = db.engines['meals']
+    columns = {column['name'] for column in inspect(engine).get_columns('meal')}
+    if 'user_id' not in columns:
+        with engine.begin() as conn:
+            conn.execute(text('ALTER TABLE meal ADD COLUMN user_id INTEGER'))
+    for index in Meal.__table__.indexes:
+        index.create(engine, checkfirst=True)
+
+
+def assign_orphaned_meals(user_id):
+    """Give meals logged before user scoping (no user_id, so nobody sees them) to one user"""
+    count = Meal.query.filter(Meal.user_id.is_(None)).update({Meal.user_id: user_id}, synchronize_session=False)
+    db.session.commit()
+    return count
+
+
+@click.command('assign-orphaned-meals')
+@click.option('--user-id', type=int, required=True, help='Account that logged the old meals')
+@with_appcontext
+def assign_orphaned_meals_command(user_id):
+    """Assign meals logged before accounts were linked to one user."""
+    from App.models import User
+    if db.session.get(User, user_id) is None:
+        raise click.BadParameter(f'No user with id {user_id}', param_hint='--user-id')
+    print(f"Assigned {assign_orphaned_meals(user_id)} meals to user {user_id}")
+
+
+def token_required(f):
+    """Pass the user id from the main app's JWT to the route"""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        auth_header = request.headers.get('Authorization', '')
+        if not auth_header.startswith('Bearer '):
+            return jsonify({'error': 'Token is missing'}), 401
+        try:
+            data = jwt.decode(auth_header.split(' ', 1)[1], current_app.config['SECRET_KEY'], algorithms=["HS256"])
+        except jwt.ExpiredSignatureError:
+            return jsonify({'error': 'Token has expired'}), 401
+        except jwt.InvalidTokenError:
+            return jsonify({'error': 'Invalid token'}), 401
+        return f(data['user_id'], *args, **kwargs)
+    return decorated
+
+
+def user_meal(user_id, meal_id):
+    return Meal.query.filter_by(id=meal_id, user_id=user_id).first()
+
+
+# The standalone service took new meals at POST /nutrition; under /api that path is the nutrition lookup
+@meals_blueprint.route('/meals', methods=['POST'])
+@token_required
+def add_meal(user_id):
     data = request.json
     try:
         new_meal = Meal(
+            user_id=user_id,
             type=data['type'],
             name=data['food_name'],
             quantity=data['quantity'],
@@ -48,14 +114,15 @@ def add_meal():
         return jsonify({"error": str(e)}), 400
 
 
-@app.route('/meals', methods=['GET'])
-def get_meals():
+@meals_blueprint.route('/meals', methods=['GET'])
+@token_required
+def get_meals(user_id):
     date = request.args.get('date')
     if date:
         date_obj = datetime.strptime(date, '%Y-%m-%d').date()
-        meals = Meal.query.filter_by(date=date_obj).all()
+        meals = Meal.query.filter_by(user_id=user_id, date=date_obj).all()
     else:
-        meals = Meal.query.all()
+        meals = Meal.query.filter_by(user_id=user_id).order_by(Meal.date).all()
 
     result = []
     for meal in meals:
@@ -73,9 +140,59 @@ def get_meals():
     return jsonify(result)
 
 
-@app.route('/meals/<int:id>', methods=['DELETE'])
-def delete_meal(id):
-    meal = Meal.query.get(id)
+@meals_blueprint.route('/meals/summary', methods=['GET'])
+@token_required
+def get_meal_summary(user_id):
+    """Per-day and range totals, summed in SQL"""
+    try:
+        start = request.args.get('start_date') or request.args.get('date')
+        start_date = datetime.strptime(start, '%Y-%m-%d').date() if start else datetime.utcnow().date()
+        end = request.args.get('end_date')
+        end_date = datetime.strptime(end, '%Y-%m-%d').date() if end else start_date
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if end_date < start_date:
+        return jsonify({"error": "end_date must not be before start_date"}), 400
+    end_date = min(end_date, start_date + timedelta(days=MAX_SUMMARY_DAYS - 1))
+
+    rows = db.session.query(
+        Meal.date,
+        func.count(Meal.id),
+        func.coalesce(func.sum(Meal.calories), 0),
+        func.coalesce(func.sum(Meal.protein), 0),
+        func.coalesce(func.sum(Meal.carbohydrates), 0),
+        func.coalesce(func.sum(Meal.fat), 0)
+    ).filter(
+        Meal.user_id == user_id, Meal.date >= start_date, Meal.date <= end_date
+    ).group_by(Meal.date).order_by(Meal.date).all()
+
+    days = []
+    totals = {"meals": 0, "calories": 0, "protein": 0, "carbohydrates": 0, "fat": 0}
+    for date, meals, calories, protein, carbohydrates, fat in rows:
+        day = {
+            "date": date.isoformat(),
+            "meals": meals,
+            "calories": round(calories, 2),
+            "protein": round(protein, 2),
+            "carbohydrates": round(carbohydrates, 2),
+            "fat": round(fat, 2)
+        }
+        days.append(day)
+        for key in totals:
+            totals[key] += day[key]
+
+    return jsonify({
+        "start_date": start_date.isoformat(),
+        "end_date": end_date.isoformat(),
+        "days": days,
+        "totals": {key: round(value, 2) for key, value in totals.items()}
+    })
+
+
+@meals_blueprint.route('/meals/<int:id>', methods=['DELETE'])
+@token_required
+def delete_meal(user_id, id):
+    meal = user_meal(user_id, id)
     if meal:
         db.session.delete(meal)
         db.session.commit()
@@ -83,9 +200,10 @@ def delete_meal(id):
     return jsonify({"error": "Meal not found"}), 404
 
 
-@app.route('/meals/<int:id>', methods=['PUT'])
-def update_meal(id):
-    meal = Meal.query.get(id)
+@meals_blueprint.route('/meals/<int:id>', methods=['PUT'])
+@token_required
+def update_meal(user_id, id):
+    meal = user_meal(user_id, id)
     if not meal:
         return jsonify({"error": "Meal not found"}), 404
     
@@ -106,5 +224,22 @@ def update_meal(id):
         db.session.rollback()
         return jsonify({"error": str(e)}), 400
 
+def create_standalone_app():
+    """Meals API on its own; App.create_app mounts meals_blueprint instead"""
+    app = Flask(__name__)
+    meals_url = meals_database_url()
+    app.config['SQLALCHEMY_DATABASE_URI'] = meals_url
+    app.config['SQLALCHEMY_BINDS'] = {'meals': meals_url}
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # Must match the main app's SECRET_KEY so its login tokens are accepted here
+    app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'your-secret-key-here')
+    init_engine(app, db)
+    app.register_blueprint(meals_blueprint)
+    with app.app_context():
+        db.create_all(bind_key='meals')
+        migrate()
+    return app
+
+
 if __name__ == '__main__':
-    app.run(debug=True, port=5001)
+    create_standalone_app().run(debug=True, port=5002)
@@ -0,0 +1,130 @@
+"""Rule-based parser for the common meal phrasings, with spaCy as the fallback.
+
+Most entries are lists like "2 eggs and a cup of rice" or "chicken 150 grams":
+an optional quantity (digits, a number word, a/an/some), an optional unit
+from SERVING_SIZE_MAP (optionally followed by "of") and a few food words,
+or a food followed by "N grams", separated by commas or "and"/"or".
+parse_foods() handles those with regular expressions and returns exactly
+what tokenize_by_quantity would. Anything it is not sure how spaCy would
+tag falls back to tokenize_by_quantity, including "150 grams chicken",
+which tokenize_by_quantity splits at "grams".
+"""
+import re
+import threading
+from word2number import w2n
+from main import SERVING_SIZE_MAP, clean_meal_text, tokenize_by_quantity
+
+# Single number words spaCy tags NUM on their own ("twenty five" is two NUM tokens, so falls back)
+NUMBER_WORDS = (
+    "zero one two three four five six seven eight nine ten eleven twelve thirteen fourteen fifteen "
+    "sixteen seventeen eighteen nineteen twenty thirty forty fifty sixty seventy eighty ninety hundred"
+).split()
+# Determiners: not NUM to spaCy, so the quantity stays unset and defaults to 1
+ARTICLES = ("a", "an", "some")
+
+# Words spaCy would not tag NOUN/ADJ inside a food name, or that change how the item is read
+FUNCTION_WORDS = set("""
+    the my his her our their your its this that these those i me we you he she it they
+    of with without for in on at to from into by about around over under after before
+    and or but plus also then just only very really too so not no
+    each every any all both half quarter dozen more less few several lots lot bit little
+    some a an was were is are be been had have has ate eat eating drank drink
+""".split())
+
+UNITS = [unit for unit in SERVING_SIZE_MAP]
+# Units in the food words (a second unit, or a plural the map does not know) change the result
+UNIT_WORDS = set(UNITS) | {unit + "s" for unit in UNITS} | {unit + "es" for unit in UNITS} | {"grams", "gram"}
+
+_number = r"\d+(?:\.\d+)?|" + "|".join(NUMBER_WORDS)
+_unit = "|".join(sorted(map(re.escape, UNITS), key=len, reverse=True))
+
+SEGMENT = re.compile(
+    rf"(?:(?P<qty>{_number}|a|an|some)\s+)?"
+    rf"(?:(?P<unit>{_unit})\s+(?:of\s+)?)?"
+    r"(?P<food>[a-z]+(?:\s+[a-z]+){0,3})"
+    rf"(?:\s+(?P<tail_qty>{_number})\s+grams)?"
+)
+SEPARATOR = re.compile(r"\s*(?:,|;|!|\?|\.(?!\d)|&|\band\b|\bor\b)\s*")
+ALLOWED = re.compile(r"[a-z0-9.,;!?&\s]*")
+
+_stats = {"fast": 0, "fallback": 0}
+_stats_lock = threading.Lock()
+
+
+def _quantity(text):
+    if text is None or text in ARTICLES:
+        return None
+    if text[0].isdigit():
+        return float(text)
+    return float(w2n.word_to_num(text))
+
+
+def _food_words_ok(words):
+    for word in words:
+        if word in FUNCTION_WORDS or word in UNIT_WORDS or word in NUMBER_WORDS:
+            return False
+        if word.endswith(("ed", "ing", "ly")):  # Likely a verb or adverb to the tagger
+            return False
+    return True
+
+
+def parse_segment(segment):
+    """The item for one comma/and-separated piece, or None if it needs spaCy"""
+    match = SEGMENT.fullmatch(segment)
+    if match is None:
+        return None
+    qty, unit, food, tail_qty = match.group("qty", "unit", "food", "tail_qty")
+    words = food.split()
+    if not _food_words_ok(words):
+        return None
+
+    if tail_qty is not None:
+        # "chicken 150 grams"
+        if qty is not None or unit is not None:
+            return None
+        return {"food_name": food, "quantity": _quantity(tail_qty), "measurement_type": "grams"}
+
+    quantity = _quantity(qty) or 1.0
+    if unit:
+        return {"food_name": food, "quantity": SERVING_SIZE_MAP[unit] * quantity, "measurement_type": unit}
+    return {"food_name": food, "quantity": quantity * 100, "measurement_type": ""}
+
+
+def fast_parse(input_text):
+    """Items for the whole entry, or None if any part of it is ambiguous"""
+    text = clean_meal_text(input_text)
+    if not ALLOWED.fullmatch(text):
+        return None
+    foods = []
+    for segment in SEPARATOR.split(text):
+        segment = " ".join(segment.split())
+        if not segment:
+            continue
+        food = parse_segment(segment)
+        if food is None:
+            return None
+        foods.append(food)
+    return foods if foods else None
+
+
+def record_parses(fast, fallback):
+    with _stats_lock:
+        _stats["fast"] += fast
+        _stats["fallback"] += fallback
+
+
+def parse_foods(input_text):
+    """Drop-in replacement for tokenize_by_quantity that skips spaCy when it can"""
+    foods = fast_parse(input_text)
+    record_parses(int(foods is not None), int(foods is None))
+    if foods is None:
+        foods = tokenize_by_quantity(input_text)
+    return foods
+
+
+def stats():
+    with _stats_lock:
+        result = dict(_stats)
+    total = result["fast"] + result["fallback"]
+    result["hit_rate"] = round(result["fast"] / total, 4) if total else 0.0
+    return result
@@ -0,0 +1,251 @@
+"""Local copy of FoodData Central, built from the bulk CSV download.
+
+    python fdc.py import <csv dir> [--db fdc.db] [--data-types foundation_food,sr_legacy_food]
+    python fdc.py lookup "green apple" [--db fdc.db]
+
+The CSV directory is an unzipped "Full Download" (or any subset of it) from
+https://fdc.nal.usda.gov/download-datasets.html containing food.csv,
+nutrient.csv and food_nutrient.csv. Only the four nutrients the app uses are
+kept, one row per food, with an FTS5 index over the descriptions.
+"""
+import argparse
+import csv
+import os
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from cache import normalize_key
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fdc.db")
+
+# Generic foods first: the same ordering the search API gives when relevance ties
+DATA_TYPE_PRIORITY = {
+    "foundation_food": 0,
+    "sr_legacy_food": 1,
+    "survey_fndds_food": 2,
+    "branded_food": 3,
+}
+DEFAULT_DATA_TYPES = ("foundation_food", "sr_legacy_food", "survey_fndds_food")
+
+# nutrient_nbr -> column; 957/958 are the Atwater energy values Foundation foods report instead of 208
+NUTRIENT_COLUMNS = {
+    "208": "calories",
+    "958": "calories_atwater",
+    "957": "calories_atwater",
+    "203": "protein",
+    "204": "fat",
+    "205": "carbohydrates",
+}
+# Fallback when nutrient.csv is missing: the FDC nutrient ids of the numbers above
+KNOWN_NUTRIENT_IDS = {"1008": "208", "2048": "958", "2047": "957", "1003": "203", "1004": "204", "1005": "205"}
+
+SCHEMA = """
+CREATE TABLE foods (
+    fdc_id INTEGER PRIMARY KEY,
+    description TEXT NOT NULL,
+    data_type TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    calories REAL,
+    protein REAL,
+    fat REAL,
+    carbohydrates REAL
+);
+CREATE VIRTUAL TABLE foods_fts USING fts5(
+    description, content='foods', content_rowid='fdc_id', tokenize='porter unicode61'
+);
+"""
+
+
+def _read_csv(csv_dir, name):
+    """Rows of one CSV file as dicts, or None when the file is not there"""
+    path = os.path.join(csv_dir, name)
+    if not os.path.exists(path):
+        return None
+    return _iter_rows(path)
+
+
+def _iter_rows(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        yield from csv.DictReader(f)
+
+
+def _nutrient_numbers(csv_dir):
+    """nutrient_id -> nutrient_nbr for the nutrients we keep"""
+    rows = _read_csv(csv_dir, "nutrient.csv")
+    if rows is None:
+        return dict(KNOWN_NUTRIENT_IDS)
+    numbers = {}
+    for row in rows:
+        number = (row.get("nutrient_nbr") or "").split(".")[0]
+        if number in NUTRIENT_COLUMNS:
+            numbers[row["id"]] = number
+    return numbers
+
+
+def import_fdc(csv_dir, db_path=DEFAULT_DB_PATH, data_types=DEFAULT_DATA_TYPES, batch_size=5000):
+    """Build a fresh database from the CSVs; returns the number of foods imported.
+
+    Streams food_nutrient.csv (tens of millions of rows in the full download)
+    and keeps only the foods of the chosen data types in memory. The new file
+    is written beside the old one and swapped in at the end, so readers never
+    see a half-built database; LocalNutritionDB notices the swap and reopens.
+    """
+    foods = _read_csv(csv_dir, "food.csv")
+    if foods is None:
+        raise FileNotFoundError(f"food.csv not found in {csv_dir}")
+
+    wanted = {}
+    for row in foods:
+        if row["data_type"] in data_types:
+            wanted[int(row["fdc_id"])] = [row["description"], row["data_type"], None, None, None, None, None]
+
+    numbers = _nutrient_numbers(csv_dir)
+    slots = {"calories": 2, "calories_atwater": 3, "protein": 4, "fat": 5, "carbohydrates": 6}
+    for row in _read_csv(csv_dir, "food_nutrient.csv") or ():
+        number = numbers.get(row["nutrient_id"])
+        if number is None:
+            continue
+        food = wanted.get(int(row["fdc_id"]))
+        if food is not None and row.get("amount"):
+            food[slots[NUTRIENT_COLUMNS[number]]] = float(row["amount"])
+
+    tmp_path = db_path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    conn.executescript(SCHEMA)
+    rows = (
+        (fdc_id, description, data_type, DATA_TYPE_PRIORITY.get(data_type, 9),
+         calories if calories is not None else atwater, protein, fat, carbohydrates)
+        for fdc_id, (description, data_type, calories, atwater, protein, fat, carbohydrates) in wanted.items()
+    )
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            conn.executemany("INSERT INTO foods VALUES (?, ?, ?, ?, ?, ?, ?, ?)", batch)
+            batch = []
+    if batch:
+        conn.executemany("INSERT INTO foods VALUES (?, ?, ?, ?, ?, ?, ?, ?)", batch)
+    conn.execute("INSERT INTO foods_fts (foods_fts) VALUES ('rebuild')")
+    conn.execute("INSERT INTO foods_fts (foods_fts) VALUES ('optimize')")
+    conn.commit()
+    conn.execute("VACUUM")
+    conn.close()
+    os.replace(tmp_path, db_path)
+    return len(wanted)
+
+
+def _match_expression(words, operator):
+    return f" {operator} ".join('"' + word.replace('"', '""') + '"' for word in words)
+
+
+class LocalNutritionDB:
+    """Read-only lookups against the imported database, one connection per thread"""
+
+    QUERY = """
+        SELECT f.description, f.calories, f.protein, f.fat, f.carbohydrates
+        FROM foods_fts JOIN foods f ON f.fdc_id = foods_fts.rowid
+        WHERE foods_fts MATCH ?
+        ORDER BY bm25(foods_fts), f.priority, length(f.description)
+        LIMIT 1
+    """
+
+    def __init__(self, path=DEFAULT_DB_PATH, memo_size=4096, check_interval=1.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._identity = None
+        self._generation = 0
+        self._checked_at = None
+        # The data only changes on re-import, so repeated names are answered from memory.
+        # Keyed by generation: entries from a replaced file are never served again
+        self._memo = lru_cache(maxsize=memo_size)(self._query)
+
+    def available(self):
+        return os.path.exists(self.path)
+
+    def _check_for_reimport(self):
+        """Start a new generation when import_fdc has swapped in a different file"""
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.check_interval:
+            return
+        with self._lock:
+            self._checked_at = now
+            try:
+                stat = os.stat(self.path)
+                identity = (stat.st_ino, stat.st_mtime_ns)
+            except FileNotFoundError:
+                identity = None
+            if identity != self._identity:
+                self._identity = identity
+                self._generation += 1
+                self._memo.cache_clear()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.generation != self._generation:
+            conn.close()  # Still open on the replaced file
+            conn = None
+        if conn is None:
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+            self._local.conn = conn
+            self._local.generation = self._generation
+        return conn
+
+    def lookup(self, food_name):
+        """Best match in the same shape as the USDA API lookup, or None"""
+        key = normalize_key(food_name)
+        if not key:
+            return None
+        self._check_for_reimport()
+        nutrition = self._memo(self._generation, key)
+        return dict(nutrition) if nutrition is not None else None
+
+    def clear_memo(self):
+        self._memo.cache_clear()
+
+    def _query(self, generation, key):
+        words = key.split()
+        conn = self._connection()
+        # Every word first, then any word, as the search API does
+        row = conn.execute(self.QUERY, (_match_expression(words, "AND"),)).fetchone()
+        if row is None and len(words) > 1:
+            row = conn.execute(self.QUERY, (_match_expression(words, "OR"),)).fetchone()
+        if row is None:
+            return None
+        description, calories, protein, fat, carbohydrates = row
+        return {
+            "description": description,
+            "calories": calories or 0,
+            "protein": protein or 0,
+            "fat": fat or 0,
+            "carbohydrates": carbohydrates or 0
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local FoodData Central database")
+    commands = parser.add_subparsers(dest="command", required=True)
+    importer = commands.add_parser("import", help="build the database from the bulk CSV files")
+    importer.add_argument("csv_dir")
+    importer.add_argument("--db", default=os.getenv("FDC_DB_PATH", DEFAULT_DB_PATH))
+    importer.add_argument("--data-types", default=",".join(DEFAULT_DATA_TYPES),
+                          help="comma-separated; add branded_food for the (much larger) branded set")
+    lookup = commands.add_parser("lookup", help="resolve a food name against the database")
+    lookup.add_argument("food_name")
+    lookup.add_argument("--db", default=os.getenv("FDC_DB_PATH", DEFAULT_DB_PATH))
+    args = parser.parse_args()
+
+    if args.command == "import":
+        start = time.perf_counter()
+        count = import_fdc(args.csv_dir, args.db, tuple(args.data_types.split(",")))
+        print(f"Imported {count} foods into {args.db} in {time.perf_counter() - start:.1f}s")
+    else:
+        print(LocalNutritionDB(args.db).lookup(args.food_name))
+
+
+if __name__ == "__main__":
+    main()
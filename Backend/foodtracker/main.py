@@ -1,9 +1,28 @@
-import spacy 
+import os 
+import threading 
 from word2number import w2n 
 from typing import Optional, List, Dict 
  
-# Load spaCy model 
-nlp = spacy.load("en_core_web_sm") 
+# spaCy model, loaded on first use (or by warm_up) with only the pipes the parser needs: 
+# POS tags (tagger + attribute_ruler), dep_ (parser) and their shared tok2vec 
+SPACY_MODEL = os.getenv("SPACY_MODEL", "en_core_web_sm") 
+SPACY_EXCLUDE = [pipe.strip() for pipe in os.getenv("SPACY_EXCLUDE", "ner,lemmatizer").split(",") if pipe.strip()] 
+_nlp = None 
+_nlp_lock = threading.Lock() 
+ 
+def get_nlp(): 
+    """The shared spaCy pipeline, loading it once on first call.""" 
+    global _nlp 
+    if _nlp is None: 
+        with _nlp_lock: 
+            if _nlp is None: 
+                import spacy 
+                _nlp = spacy.load(SPACY_MODEL, exclude=SPACY_EXCLUDE) 
+    return _nlp 
+ 
+def warm_up(): 
+    """Load the model and run one parse so the first request does not pay for it.""" 
+    tokenize_by_quantity("i ate 2 eggs and a slice of toast") 
  
 SERVING_SIZE_MAP = { 
     "tender": 40,          # 1 chicken tender ~40g 
@@ -32,7 +51,7 @@ def get_quantity(token) -> Optional[float]:
         return 1.0 if token.text.lower() in {"a", "an"} else 2.0 if token.text.lower() == "some" else None 
     return None 
  
-def process_food_tokens(tokens: List[spacy.tokens.token.Token], quantity: Optional[float]) -> Dict[str, Optional[float]]: 
+def process_food_tokens(tokens: List["spacy.tokens.token.Token"], quantity: Optional[float]) -> Dict[str, Optional[float]]: 
     measurement_type = "" 
     food_name = "" 
     quantity = quantity or 1.0  # Default to 1 if no quantity provided 
@@ -62,9 +81,18 @@ def process_food_tokens(tokens: List[spacy.tokens.token.Token], quantity: Option
         "measurement_type": measurement_type 
     } 
  
+def clean_meal_text(input_text: str) -> str: 
+    return input_text.lower().replace("today i ate", "").replace("i ate", "").replace("i had", "").strip() 
+ 
 def tokenize_by_quantity(input_text: str) -> List[Dict[str, Optional[float]]]: 
-    clean_text = input_text.lower().replace("today i ate", "").replace("i ate", "").replace("i had", "").strip() 
-    doc = nlp(clean_text) 
+    return _foods_from_doc(get_nlp()(clean_meal_text(input_text))) 
+ 
+def tokenize_many(input_texts: List[str], batch_size: int = 64) -> List[List[Dict[str, Optional[float]]]]: 
+    """tokenize_by_quantity for many texts at once, streamed through nlp.pipe.""" 
+    docs = get_nlp().pipe((clean_meal_text(text) for text in input_texts), batch_size=batch_size) 
+    return [_foods_from_doc(doc) for doc in docs] 
+ 
+def _foods_from_doc(doc) -> List[Dict[str, Optional[float]]]: 
     foods = [] 
     current_quantity = None 
     current_tokens = [] 
@@ -0,0 +1,111 @@
+from flask import Blueprint, request, jsonify 
+from usda import get_usda_nutrition_many, LookupTimeout, nutrition_cache 
+from main import process_tokens_to_foods, warm_up 
+from fastpath import parse_foods, stats as parser_stats 
+from batch import parse_batch
+import os 
+import threading 
+
+nutrition_blueprint = Blueprint('nutrition', __name__) 
+
+# Seconds a /nutrition request waits for its USDA lookups before answering with what it has
+NUTRITION_DEADLINE = float(os.getenv("NUTRITION_DEADLINE", 5))
+
+def start_warm_up():
+    """Load the spaCy model in the background so startup is not blocked on it"""
+    if os.getenv("SPACY_WARMUP", "true").lower() == "true":
+        threading.Thread(target=warm_up, name="spacy-warmup", daemon=True).start()
+ 
+MAX_BATCH_TEXTS = int(os.getenv("NUTRITION_MAX_BATCH", 500))
+ 
+def food_items(foods): 
+    """(food_name, grams) pairs for the parsed foods that have a name""" 
+    items = [] 
+    for food in foods: 
+        food_name = food.get('food_name') 
+        quantity = float(food.get("quantity", 100))  # Default to 100g if quantity not provided 
+ 
+        if not food_name: 
+            continue  # Skip if no food name found 
+ 
+        print(f"Processing {food_name} with quantity {quantity} grams") 
+        items.append((food_name, quantity)) 
+    return items 
+ 
+def nutrition_entry(food_name, quantity, nutrition_data): 
+    """One result row: the lookup scaled to the quantity, or the reason it failed""" 
+    if isinstance(nutrition_data, LookupTimeout): 
+        print(f"Nutrition lookup for {food_name} missed the deadline") 
+        return {"food_name": food_name, "error": "Nutritional information lookup timed out"} 
+    if isinstance(nutrition_data, Exception): 
+        print(f"Error fetching nutrition data for {food_name}:", nutrition_data) 
+        return {"food_name": food_name, "error": "Nutritional information fetch failed"} 
+ 
+    # If nutrition data is found, scale it to the specified quantity 
+    if nutrition_data: 
+        factor = quantity / 100.0  # Calculate scaling factor based on specified quantity 
+        return { 
+            "food_name": food_name, 
+            "quantity": quantity, 
+            "calories": round(nutrition_data.get("calories", 0) * factor, 2), 
+            "protein": round(nutrition_data.get("protein", 0) * factor, 2), 
+            "fat": round(nutrition_data.get("fat", 0) * factor, 2), 
+            "carbohydrates": round(nutrition_data.get("carbohydrates", 0) * factor, 2) 
+        } 
+    return {"food_name": food_name, "error": "Nutritional information not found"} 
+ 
+@nutrition_blueprint.route('/nutrition', methods=['POST']) 
+def nutrition_info(): 
+    data = request.json 
+    input_text = data.get("text", "")  # Receive plain text input 
+ 
+    if not input_text: 
+        return jsonify({"error": "Text input is required"}), 400 
+ 
+    # Step 1: Tokenize and process input text into structured food data 
+    try: 
+        tokenized_foods = parse_foods(input_text)  # spaCy only for entries the fast path cannot read 
+        foods = process_tokens_to_foods(tokenized_foods) 
+    except Exception as e: 
+        print("Error during tokenization:", e) 
+        return jsonify({"error": "Failed to process food input"}), 500 
+ 
+    # Step 2: Fetch nutrition data for all tokenized food items concurrently 
+    items = food_items(foods) 
+    lookups = get_usda_nutrition_many([name for name, _ in items], NUTRITION_DEADLINE) 
+    nutrition_results = [nutrition_entry(food_name, quantity, lookups[food_name]) for food_name, quantity in items] 
+ 
+    return jsonify(nutrition_results), 200 
+ 
+@nutrition_blueprint.route('/nutrition/batch', methods=['POST'])
+def nutrition_batch():
+    """Many meal texts in one request; results come back in input order"""
+    data = request.json or {}
+    texts = data.get("texts")
+    if not isinstance(texts, list) or not texts or not all(isinstance(text, str) for text in texts):
+        return jsonify({"error": "texts must be a non-empty list of strings"}), 400
+    if len(texts) > MAX_BATCH_TEXTS:
+        return jsonify({"error": f"At most {MAX_BATCH_TEXTS} texts per batch"}), 400
+
+    try:
+        parsed = [process_tokens_to_foods(foods) for foods in parse_batch(texts)]
+    except Exception as e:
+        print("Error during batch tokenization:", e)
+        return jsonify({"error": "Failed to process food input"}), 500
+
+    # One lookup per distinct food across the whole batch
+    items = [food_items(foods) for foods in parsed]
+    lookups = get_usda_nutrition_many([name for entry in items for name, _ in entry], NUTRITION_DEADLINE)
+    results = [
+        {"text": text, "foods": [nutrition_entry(food_name, quantity, lookups[food_name]) for food_name, quantity in entry]}
+        for text, entry in zip(texts, items)
+    ]
+    return jsonify(results), 200
+
+@nutrition_blueprint.route('/nutrition/cache-stats', methods=['GET'])
+def nutrition_cache_stats():
+    return jsonify(nutrition_cache.stats()), 200
+
+@nutrition_blueprint.route('/nutrition/parser-stats', methods=['GET'])
+def nutrition_parser_stats():
+    return jsonify(parser_stats()), 200
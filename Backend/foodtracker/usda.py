@@ -1,16 +1,88 @@
 import os 
 import requests 
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor, wait
+import threading
+import time
 from dotenv import load_dotenv 
 import csv  
+from cache import cache_from_env
+from fdc import DEFAULT_DB_PATH, LocalNutritionDB
  
  
 load_dotenv(os.path.join(os.path.dirname(__file__), 'config.env')) 
  
 print("API Key:", os.getenv("API_KEY")) 
+
+# Every lookup goes through the on-disk cache; USDA_API_URL can point at a local stub
+nutrition_cache = cache_from_env()
+
+# One keep-alive session shared by all lookups; the worker count caps calls in flight
+MAX_IN_FLIGHT = int(os.getenv("USDA_MAX_IN_FLIGHT", 8))
+session = requests.Session()
+session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=MAX_IN_FLIGHT))
+session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=MAX_IN_FLIGHT))
+lookup_pool = ThreadPoolExecutor(max_workers=MAX_IN_FLIGHT, thread_name_prefix="usda")
+# The pool's own queue is unbounded, so submissions take a slot: running plus waiting lookups
+MAX_QUEUED = int(os.getenv("USDA_MAX_QUEUED", MAX_IN_FLIGHT * 8))
+lookup_slots = threading.BoundedSemaphore(MAX_QUEUED)
+
+class LookupTimeout(Exception):
+    """The lookup did not finish before the request's deadline."""
+
+# Local FoodData Central copy (see fdc.py); the remote API is only a fallback
+local_db = LocalNutritionDB(os.getenv("FDC_DB_PATH", DEFAULT_DB_PATH))
+REMOTE_FALLBACK = os.getenv("USDA_REMOTE_FALLBACK", "true").lower() == "true"
+
 def get_usda_nutrition(food_name): 
+    """Nutrition data for a food item, from the local database, the cache or the USDA API.""" 
+    if local_db.available(): 
+        nutrition = local_db.lookup(food_name) 
+        if nutrition is not None or not REMOTE_FALLBACK: 
+            return nutrition 
+    elif not REMOTE_FALLBACK: 
+        return None 
+    return nutrition_cache.get_or_fetch(food_name, fetch_usda_nutrition)
+
+def get_usda_nutrition_many(food_names, deadline, lookup=get_usda_nutrition):
+    """Look up several foods concurrently, waiting at most `deadline` seconds in total.
+
+    Returns {food_name: nutrition dict, None or exception}. Lookups not
+    finished at the deadline map to LookupTimeout. Those already running
+    are left to finish in the background so the cache is warm next time;
+    those still queued are cancelled. A lookup that cannot get a queue slot
+    (see MAX_QUEUED) before the deadline also times out.
+    """
+    end = time.monotonic() + deadline
+    slots = lookup_slots
+    futures = {}
+    for name in dict.fromkeys(food_names):
+        if not slots.acquire(timeout=max(end - time.monotonic(), 0)):
+            break
+        try:
+            futures[name] = lookup_pool.submit(lookup, name)
+        except Exception:
+            slots.release()
+            raise
+        futures[name].add_done_callback(lambda _: slots.release())
+    wait(futures.values(), timeout=max(end - time.monotonic(), 0))
+    results = {}
+    for name in dict.fromkeys(food_names):
+        future = futures.get(name)
+        if future is None or not future.done():
+            if future is not None:
+                future.cancel()  # Frees the slot unless it has already started
+            results[name] = LookupTimeout(name)
+        elif future.exception() is not None:
+            results[name] = future.exception()
+        else:
+            results[name] = future.result()
+    return results
+
+def fetch_usda_nutrition(food_name): 
     """Fetches nutrition data for a given food item from the USDA API.""" 
     api_key = os.getenv("API_KEY")   
-    base_url = "https://api.nal.usda.gov/fdc/v1/foods/search" 
+    base_url = os.getenv("USDA_API_URL", "https://api.nal.usda.gov/fdc/v1/foods/search")
      
     # Parameters for the API request 
     params = { 
@@ -19,7 +91,7 @@ def get_usda_nutrition(food_name):
         "pageSize": 1 
     } 
      
-    response = requests.get(base_url, params=params) 
+    response = session.get(base_url, params=params, timeout=float(os.getenv("USDA_TIMEOUT", 10)))
     if response.status_code == 200: 
         data = response.json() 
          
@@ -39,7 +111,10 @@ def get_usda_nutrition(food_name):
                 "fat": nutrients.get("204", 0),       # Total lipid (fat) 
                 "carbohydrates": nutrients.get("205", 0)  # Carbohydrates 
             } 
-    return None 
+        return None  # Cached as "not found"
+    # Anything else (rate limits, outages) must not be cached as "not found"
+    response.raise_for_status()
+    raise requests.HTTPError(f"Unexpected USDA response status {response.status_code}", response=response)
  
  
 if __name__ == "__main__": 
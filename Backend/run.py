@@ -5,7 +5,7 @@ from App import create_app
 # Load environment variables from .env file
 load_dotenv()
 
-app = create_app()
-
 if __name__ == '__main__':
+    # Built here, not at import: worker processes started with spawn/forkserver import this script
+    app = create_app()
     app.run(debug=True)
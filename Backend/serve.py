@@ -0,0 +1,19 @@
+from dotenv import load_dotenv
+import os
+from waitress import serve
+
+# Load environment variables from .env file
+load_dotenv()
+
+from App import create_app
+
+if __name__ == '__main__':
+    # One process serves the API, nutrition/meals and posture routes. Built here, not at import:
+    # worker processes started with spawn/forkserver import this script
+    app = create_app()
+    serve(
+        app,
+        host=os.environ.get('HOST', '0.0.0.0'),
+        port=int(os.environ.get('PORT', 5000)),
+        threads=int(os.environ.get('WAITRESS_THREADS', 8))
+    )
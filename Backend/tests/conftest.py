@@ -0,0 +1,59 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, 'foodtracker'))  # Its modules import each other by bare name
+sys.path.insert(0, os.path.join(BACKEND_DIR, 'benchmarks'))
+
+# Read at import time by the posture and nutrition modules
+WORK_DIR = tempfile.mkdtemp()
+os.environ.setdefault('POSTURE_STORE_DIR', os.path.join(WORK_DIR, 'posture_sessions'))
+os.environ.setdefault('USDA_CACHE_PATH', os.path.join(WORK_DIR, 'nutrition_cache.db'))
+os.environ.setdefault('FDC_DB_PATH', os.path.join(WORK_DIR, 'missing-fdc.db'))
+os.environ.setdefault('SPACY_WARMUP', 'false')
+
+
+@pytest.fixture(scope='session')
+def app():
+    """One app for the whole run: create_app() builds a process-wide singleton"""
+    from App import create_app
+    return create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(WORK_DIR, 'app.db'),
+        'SQLALCHEMY_BINDS': {'meals': 'sqlite:///' + os.path.join(WORK_DIR, 'meals.db')},
+        'PASSWORD_HASH_WORKERS': 0,
+        'SCRYPT_N': 2 ** 10,
+        'AUTH_RATE_LIMIT_ENABLED': False,
+        'MAIL_OUTBOX_DISPATCHER': False,
+        'SLEEP_COHORT_REFRESHER': False,
+        'WORKOUT_REMINDER_DISPATCHER': False,
+        'POSTURE_JOB_QUEUE': False,
+        'POSTURE_SPOOL_DIR': os.path.join(WORK_DIR, 'posture_spool'),
+    })
+
+
+@pytest.fixture
+def app_context(app):
+    from App import db
+    with app.app_context():
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def auth_client(app):
+    """Test client sending a login token for the given user id"""
+    import jwt
+    from datetime import datetime, timedelta
+
+    def make(user_id=1):
+        client = app.test_client()
+        token = jwt.encode({'user_id': user_id, 'exp': datetime.utcnow() + timedelta(hours=1)},
+                           app.config['SECRET_KEY'])
+        client.environ_base['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+        return client
+    return make
@@ -0,0 +1,95 @@
+from datetime import date, time, timedelta
+
+import numpy as np
+import pytest
+
+from App import db
+from App.analytics import analyze_user, derive, regularity_score, sleep_cohorts, user_metrics
+from App.models import Sleep, User
+
+
+def test_only_member_of_cohort_ranks_at_100th_percentile(app_context):
+    # Born 1901: the only user in the 65+ band
+    user = User('Only', 'Member', 'only-member@example.com', 'password123', date(1901, 1, 1))
+    db.session.add(user)
+    db.session.commit()
+    # 7:20 a night is 7.333... hours, which the reported metrics round down to 7.33
+    today = date.today()
+    for days_ago in (3, 2, 1):
+        db.session.add(Sleep(user.id, today - timedelta(days=days_ago), time(23, 0), time(6, 20)))
+    db.session.commit()
+
+    sleep_cohorts.refresh()
+    metrics = analyze_user(user)
+
+    assert metrics['cohort']['size'] == 1
+    assert metrics['cohort']['percentiles'] == {'average_duration': 100.0, 'regularity': 100.0}
+
+
+@pytest.fixture
+def sleeper(app_context):
+    user = User('Fixed', 'Sleeper', 'fixed-sleeper@example.com', 'password123', date(1990, 1, 1))
+    db.session.add(user)
+    db.session.commit()
+    yield user
+    db.session.query(Sleep).filter_by(user_id=user.id).delete()
+    db.session.delete(user)
+    db.session.commit()
+
+
+def log_nights(user, *nights):
+    today = date.today()
+    for days_ago, bed, wake in nights:
+        db.session.add(Sleep(user.id, today - timedelta(days=days_ago), bed, wake))
+    db.session.commit()
+
+
+def test_derive_wraps_around_midnight():
+    bed = np.array([23 * 60, 0, 60, 22 * 60])
+    wake = np.array([7 * 60, 6 * 60, 6 * 60, 22 * 60 + 30])
+    bed_offset, hours, midpoint = derive(bed, wake)
+    assert bed_offset.tolist() == [-60, 0, 60, -120]
+    assert hours.tolist() == [8, 6, 5, 0.5]
+    assert midpoint.tolist() == [180, 180, 210, -105]
+
+
+def test_regularity_score_is_linear_and_clipped():
+    assert regularity_score(np.array([0.0, 45.0, 90.0, 180.0, 360.0])).tolist() == [100, 75, 50, 0, 0]
+
+
+def test_user_metrics_on_fixed_nights(sleeper):
+    # 8h, 6h then 5h: midpoints 03:00, 03:00, 03:30
+    log_nights(sleeper, (3, time(23, 0), time(7, 0)), (2, time(0, 0), time(6, 0)), (1, time(1, 0), time(6, 0)))
+    metrics = user_metrics(sleeper.id)
+
+    assert metrics['records'] == 3
+    assert metrics['average_duration'] == 6.33
+    assert metrics['mean_midpoint_shift_minutes'] == 15.0  # (0 + 30) / 2
+    assert metrics['regularity'] == 91.7  # 100 * (1 - 15 / 180)
+    assert metrics['bed_time_variance'] == 2400.0  # Offsets -60, 0, 60
+    assert metrics['bed_time_std_minutes'] == 49.0
+    assert metrics['trend_hours_per_week'] == -10.5  # -1.5 hours a day
+    assert [day['debt_hours'] for day in metrics['rolling_sleep_debt']] == [0, 2, 5]
+    assert metrics['sleep_debt_hours'] == 5.0
+
+
+def test_sleep_debt_window_is_in_days_not_records(sleeper):
+    # 4h nine days ago, 6h three days ago, 7h yesterday, nothing in between
+    log_nights(sleeper, (9, time(0, 0), time(4, 0)), (3, time(0, 0), time(6, 0)), (1, time(0, 0), time(7, 0)))
+    metrics = user_metrics(sleeper.id)
+
+    debt = [day['debt_hours'] for day in metrics['rolling_sleep_debt']]
+    assert len(debt) == 9  # Missing days get a slot but no deficit
+    assert debt == [4, 4, 4, 4, 4, 4, 6, 2, 3]  # The 4h night leaves the window on day 7
+    assert metrics['sleep_debt_hours'] == 3.0
+    # Least squares over days 0, 6, 8 with 4, 6, 7 hours: 19/52 hours a day
+    assert metrics['trend_hours_per_week'] == round(19 / 52 * 7, 3)
+
+
+def test_single_night_has_no_trend_or_shift(sleeper):
+    log_nights(sleeper, (1, time(23, 30), time(9, 30)))
+    metrics = user_metrics(sleeper.id)
+    assert metrics['trend_hours_per_week'] == 0.0
+    assert metrics['regularity'] == 100.0
+    assert metrics['sleep_debt_hours'] == 0.0  # Oversleeping does not go negative
+    assert metrics['rolling_sleep_debt'][-1]['debt_hours'] == 0.0
@@ -0,0 +1,46 @@
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import text
+
+from App import db
+from App.engine import DEFAULTS, bind_options, engine_options, init_app
+
+
+def pragma(engine, name):
+    with engine.connect() as conn:
+        return conn.execute(text(f'PRAGMA {name}')).scalar()
+
+
+def test_pragmas_are_set_on_every_bind(app_context):
+    for key in (None, 'meals'):
+        engine = db.engines[key]
+        assert pragma(engine, 'journal_mode') == 'wal'
+        assert pragma(engine, 'synchronous') == 1  # NORMAL
+        assert pragma(engine, 'busy_timeout') == app_context.config['SQLITE_BUSY_TIMEOUT_MS']
+        assert pragma(engine, 'cache_size') == -app_context.config['SQLITE_CACHE_SIZE_KB']
+        assert pragma(engine, 'temp_store') == 2  # MEMORY
+
+
+def test_file_binds_get_a_sized_pool(app_context):
+    for key in (None, 'meals'):
+        assert db.engines[key].pool.size() == app_context.config['DB_POOL_SIZE']
+
+
+def test_bind_options_follow_each_url():
+    assert engine_options('sqlite://', DEFAULTS) == {}
+    assert bind_options('sqlite://', DEFAULTS) == {'url': 'sqlite://'}
+    assert bind_options('sqlite:///meals.db', DEFAULTS)['pool_size'] == DEFAULTS['DB_POOL_SIZE']
+    assert bind_options({'url': 'sqlite:///meals.db', 'pool_size': 3}, DEFAULTS)['pool_size'] == 3
+
+
+def test_in_memory_bind_beside_a_file_database(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + str(tmp_path / 'main.db')
+    app.config['SQLALCHEMY_BINDS'] = {'scratch': 'sqlite://'}
+    own_db = SQLAlchemy()
+    init_app(app, own_db)  # Pool sizing for the file must not reach the in-memory bind
+    with app.app_context():
+        assert own_db.engines[None].pool.size() == DEFAULTS['DB_POOL_SIZE']
+        with own_db.engines['scratch'].connect() as conn:
+            assert conn.execute(text('SELECT 1')).scalar() == 1
+        assert pragma(own_db.engines['scratch'], 'busy_timeout') == DEFAULTS['SQLITE_BUSY_TIMEOUT_MS']
@@ -0,0 +1,32 @@
+import json
+import os
+
+import pytest
+
+import fastpath
+
+GOLDEN = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks',
+                      'fastpath_golden.json')
+
+with open(GOLDEN) as f:
+    CORPUS = json.load(f)
+
+
+@pytest.mark.parametrize('entry', CORPUS, ids=[entry['text'] for entry in CORPUS])
+def test_fast_path_matches_golden(entry):
+    assert fastpath.fast_parse(entry['text']) == entry['expected']
+
+
+@pytest.mark.parametrize('entry', [entry for entry in CORPUS if entry['expected'] is not None],
+                         ids=[entry['text'] for entry in CORPUS if entry['expected'] is not None])
+def test_spacy_path_matches_golden(entry):
+    # CI sets SPACY_MODEL_REQUIRED so a missing model fails the job instead of skipping
+    required = os.environ.get('SPACY_MODEL_REQUIRED', 'false').lower() == 'true'
+    try:
+        from main import get_nlp, tokenize_by_quantity
+        get_nlp()
+    except (ImportError, OSError) as e:
+        if required:
+            pytest.fail(f'spaCy and en_core_web_sm are required: {e}')
+        pytest.skip('spaCy or its model is not installed')
+    assert tokenize_by_quantity(entry['text']) == entry['expected']
@@ -0,0 +1,119 @@
+import csv
+import os
+
+import pytest
+
+import usda
+from cache import NutritionCache
+from fdc import LocalNutritionDB, import_fdc
+from usda_stub import StubServer
+
+FOODS = [
+    # fdc_id, data_type, description, {nutrient_id: amount}
+    (1, 'sr_legacy_food', 'Banana, raw', {'1008': 89, '1003': 1.1, '1004': 0.3, '1005': 22.8}),
+    (2, 'foundation_food', 'Banana, raw', {'2047': 97, '1003': 0.7, '1004': 0.2, '1005': 23.0}),
+    (3, 'foundation_food', 'Apples, fuji, with skin, raw', {'1008': 63, '1005': 15.2}),
+    (4, 'sr_legacy_food', 'Chicken, broilers or fryers, fried', {'1008': 246, '1003': 30.6}),
+    (5, 'branded_food', 'BANANA CHIPS', {'1008': 519}),
+]
+
+
+def write_csv(path, header, rows):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+def write_download(csv_dir, foods=FOODS, with_nutrients=True):
+    os.makedirs(csv_dir, exist_ok=True)
+    write_csv(os.path.join(csv_dir, 'food.csv'), ['fdc_id', 'data_type', 'description'],
+              [(fdc_id, data_type, description) for fdc_id, data_type, description, _ in foods])
+    if with_nutrients:
+        write_csv(os.path.join(csv_dir, 'nutrient.csv'), ['id', 'name', 'unit_name', 'nutrient_nbr'], [
+            ('1008', 'Energy', 'KCAL', '208'), ('2047', 'Energy (Atwater General Factors)', 'KCAL', '957'),
+            ('1003', 'Protein', 'G', '203'), ('1004', 'Total lipid (fat)', 'G', '204'),
+            ('1005', 'Carbohydrate, by difference', 'G', '205'), ('1079', 'Fiber', 'G', '291.0'),
+        ])
+    write_csv(os.path.join(csv_dir, 'food_nutrient.csv'), ['id', 'fdc_id', 'nutrient_id', 'amount'],
+              [(fdc_id * 100 + i, fdc_id, nutrient_id, amount)
+               for fdc_id, _, _, nutrients in foods for i, (nutrient_id, amount) in enumerate(nutrients.items())])
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    write_download(str(tmp_path / 'csv'))
+    path = str(tmp_path / 'fdc.db')
+    assert import_fdc(str(tmp_path / 'csv'), path) == 4  # Branded foods are left out by default
+    return path
+
+
+def test_import_keeps_the_chosen_data_types(db_path):
+    db = LocalNutritionDB(db_path)
+    assert db.lookup('chips') is None
+    assert db.lookup('fried chicken') == {'description': 'Chicken, broilers or fryers, fried', 'calories': 246,
+                                          'protein': 30.6, 'fat': 0, 'carbohydrates': 0}
+
+
+def test_import_without_nutrient_csv_uses_the_known_ids(tmp_path):
+    write_download(str(tmp_path / 'csv'), with_nutrients=False)
+    path = str(tmp_path / 'fdc.db')
+    import_fdc(str(tmp_path / 'csv'), path, ('foundation_food',))
+    assert LocalNutritionDB(path).lookup('apple')['calories'] == 63
+
+
+def test_equal_matches_prefer_generic_foods(db_path):
+    banana = LocalNutritionDB(db_path).lookup('Bananas')
+    assert banana['description'] == 'Banana, raw'
+    assert banana['calories'] == 97  # The Foundation row, energy from its Atwater value
+
+
+def test_any_word_matches_when_not_every_word_does(db_path):
+    db = LocalNutritionDB(db_path)
+    assert db.lookup('raw fuji apples')['description'] == 'Apples, fuji, with skin, raw'
+    assert db.lookup('fuji apple pie')['description'] == 'Apples, fuji, with skin, raw'
+    assert db.lookup('pizza') is None
+    assert db.lookup('!!') is None
+
+
+def test_reimport_is_picked_up_by_a_running_reader(tmp_path, db_path):
+    db = LocalNutritionDB(db_path, check_interval=0)
+    assert db.lookup('fried chicken')['calories'] == 246
+
+    foods = [(4, 'sr_legacy_food', 'Chicken, broilers or fryers, fried', {'1008': 250})]
+    write_download(str(tmp_path / 'csv2'), foods)
+    import_fdc(str(tmp_path / 'csv2'), db_path)
+
+    assert db.lookup('fried chicken')['calories'] == 250
+    assert db.lookup('banana') is None
+
+
+@pytest.fixture
+def stub(monkeypatch, tmp_path):
+    server = StubServer().start()
+    monkeypatch.setenv('USDA_API_URL', server.url)
+    monkeypatch.setattr(usda, 'nutrition_cache', NutritionCache(str(tmp_path / 'cache.db')))
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_lookup_falls_back_to_the_remote_api(monkeypatch, stub, db_path):
+    monkeypatch.setattr(usda, 'local_db', LocalNutritionDB(db_path))
+    monkeypatch.setattr(usda, 'REMOTE_FALLBACK', True)
+
+    assert usda.get_usda_nutrition('banana')['calories'] == 97
+    assert stub.calls == 0
+    assert usda.get_usda_nutrition('pizza')['description'] == 'PIZZA'
+    assert stub.calls == 1
+
+    monkeypatch.setattr(usda, 'REMOTE_FALLBACK', False)
+    assert usda.get_usda_nutrition('sushi') is None
+    assert stub.calls == 1
+
+
+def test_missing_local_database_goes_remote(monkeypatch, stub, tmp_path):
+    monkeypatch.setattr(usda, 'local_db', LocalNutritionDB(str(tmp_path / 'missing.db')))
+    monkeypatch.setattr(usda, 'REMOTE_FALLBACK', True)
+    assert usda.get_usda_nutrition('pizza')['description'] == 'PIZZA'
+    assert stub.calls == 1
@@ -0,0 +1,137 @@
+import threading
+import time
+from datetime import date
+
+import pytest
+from flask import Flask
+from werkzeug.security import generate_password_hash
+
+from App import db
+from App.hashing import HashingBusy, PasswordHasher, password_hasher
+from App.models import User
+
+
+def make_hasher(**config):
+    app = Flask(__name__)
+    app.config.update(SCRYPT_N=2 ** 10, **config)
+    hasher = PasswordHasher()
+    hasher.init_app(app)
+    return hasher
+
+
+@pytest.fixture
+def pooled():
+    hasher = make_hasher(PASSWORD_HASH_WORKERS=2, PASSWORD_HASH_QUEUE_SIZE=2, PASSWORD_HASH_TIMEOUT=30.0)
+    yield hasher
+    hasher.shutdown()
+
+
+def run_together(count, fn):
+    """Start count calls of fn at once; results in order, exceptions included"""
+    barrier = threading.Barrier(count)
+    results = [None] * count
+
+    def call(i):
+        barrier.wait()
+        try:
+            results[i] = fn()
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_inline_hashing_never_starts_a_pool():
+    hasher = make_hasher(PASSWORD_HASH_WORKERS=0)
+    password_hash = hasher.hash('secret')
+    assert hasher.verify(password_hash, 'secret')
+    assert not hasher.verify(password_hash, 'wrong')
+    assert hasher._executor is None
+
+
+def test_pool_hashes_match_inline_ones(pooled):
+    inline = make_hasher(PASSWORD_HASH_WORKERS=0)
+    password_hash = pooled.hash('secret')
+    assert password_hash.startswith(pooled.method + '$')
+    assert inline.verify(password_hash, 'secret')
+    assert pooled.verify(inline.hash('secret'), 'secret')
+
+
+def test_queue_size_counts_waiting_hashes_only(pooled):
+    pooled._run(time.sleep, 0)  # Start the workers before timing anything
+
+    results = run_together(4, lambda: pooled._run(time.sleep, 0.5))  # 2 running + 2 waiting
+    assert results == [None] * 4
+
+    results = run_together(5, lambda: pooled._run(time.sleep, 0.5))
+    assert sum(isinstance(result, HashingBusy) for result in results) == 1
+
+
+def test_timeout_raises_busy():
+    hasher = make_hasher(PASSWORD_HASH_WORKERS=1, PASSWORD_HASH_TIMEOUT=0.1)
+    try:
+        with pytest.raises(HashingBusy):
+            hasher._run(time.sleep, 2)
+    finally:
+        hasher.shutdown()
+
+
+def test_needs_rehash_compares_cost_parameters():
+    hasher = make_hasher()
+    assert not hasher.needs_rehash(hasher.hash('secret'))
+    assert hasher.needs_rehash(generate_password_hash('secret', 'scrypt:2048:8:1'))
+    assert hasher.needs_rehash(generate_password_hash('secret', 'pbkdf2'))
+
+
+@pytest.fixture
+def user(app_context):
+    user = User('Hash', 'Er', 'hashing@example.com', 'password123', date(1990, 1, 1))
+    db.session.add(user)
+    db.session.commit()
+    yield user
+    db.session.delete(user)
+    db.session.commit()
+
+
+def login(app):
+    return app.test_client().post('/api/auth/login', json={'email': 'hashing@example.com',
+                                                            'password': 'password123'})
+
+
+def test_login_upgrades_an_old_hash(app, user):
+    user.password_hash = generate_password_hash('password123', 'pbkdf2')
+    db.session.commit()
+
+    assert login(app).status_code == 200
+    db.session.refresh(user)
+    assert user.password_hash.startswith(password_hasher.method + '$')
+    assert login(app).status_code == 200
+
+
+def test_login_is_503_when_hashing_is_busy(app, user, monkeypatch):
+    monkeypatch.setattr(password_hasher, 'workers', 1)
+    monkeypatch.setattr(password_hasher, '_slots', threading.BoundedSemaphore(1))
+    password_hasher._slots.acquire()
+
+    response = login(app)
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+
+
+def test_workers_plus_queue_size_concurrent_logins_succeed(app, user, monkeypatch):
+    for name in ('method', 'workers', 'timeout', '_slots'):
+        monkeypatch.setattr(password_hasher, name, getattr(password_hasher, name))  # Restored afterwards
+    config_app = Flask(__name__)
+    config_app.config.update(SCRYPT_N=app.config['SCRYPT_N'], PASSWORD_HASH_WORKERS=2, PASSWORD_HASH_QUEUE_SIZE=2,
+                             PASSWORD_HASH_TIMEOUT=30.0)
+    password_hasher.init_app(config_app)
+    try:
+        responses = run_together(4, lambda: login(app))
+    finally:
+        password_hasher.shutdown()
+    assert [response.status_code for response in responses] == [200] * 4
@@ -0,0 +1,134 @@
+import random
+from datetime import date
+
+import pytest
+
+from App import db, leaderboard as leaderboard_module
+from App.leaderboard import RankIndex, WeeklyLeaderboard
+from App.models import User, WorkoutList
+
+MONDAY = date(2030, 6, 3)  # A week no other test writes to
+
+
+def test_rank_index_insert_remove_rank():
+    index = RankIndex()
+    for key in (5, 1, 3):
+        index.insert(key)
+    assert len(index) == 3
+    assert index.first(10) == [1, 3, 5]
+    assert [index.rank(key) for key in (1, 3, 5)] == [0, 1, 2]
+
+    index.remove(3)
+    assert index.first(10) == [1, 5]
+    assert index.rank(5) == 1
+    with pytest.raises(KeyError):
+        index.rank(3)
+    with pytest.raises(KeyError):
+        index.remove(3)
+
+
+def test_rank_index_matches_a_sorted_list():
+    rng = random.Random(11)
+    index = RankIndex()
+    expected = []
+    for _ in range(3000):
+        if expected and rng.random() < 0.4:
+            key = expected.pop(rng.randrange(len(expected)))
+            index.remove(key)
+        else:
+            key = (rng.randint(-500, 0), rng.randint(0, 10 ** 6))
+            if key in expected:
+                continue
+            index.insert(key)
+            expected.append(key)
+            expected.sort()
+        assert len(index) == len(expected)
+        if expected:
+            probe = rng.choice(expected)
+            assert index.rank(probe) == expected.index(probe)
+    assert index.first(len(expected) + 1) == expected
+
+
+class FrozenDate(date):
+    today_value = MONDAY
+
+    @classmethod
+    def today(cls):
+        return cls.today_value
+
+
+@pytest.fixture
+def board(monkeypatch):
+    monkeypatch.setattr(leaderboard_module, 'date', FrozenDate)
+    FrozenDate.today_value = MONDAY
+    board = WeeklyLeaderboard()
+    board.week_start = MONDAY
+    return board
+
+
+def test_ties_rank_by_user_id(board):
+    board.record(7, 'Gee H.', 300, MONDAY)
+    board.record(3, 'Ay B.', 300, MONDAY)
+    board.record(5, 'Cee D.', 500, MONDAY)
+
+    assert [(entry['rank'], entry['user_id']) for entry in board.top()] == [(1, 5), (2, 3), (3, 7)]
+    assert board.rank_of(7) == {'rank': 3, 'user_id': 7, 'name': 'Gee H.', 'calories': 300}
+    assert board.rank_of(99) is None
+
+
+def test_record_moves_a_user_up(board):
+    board.record(1, 'One', 100, MONDAY)
+    board.record(2, 'Two', 200, MONDAY)
+    board.record(1, 'One', 150, date(2030, 6, 9))  # Sunday, same week
+    assert board.rank_of(1)['rank'] == 1
+    assert board.rank_of(1)['calories'] == 250
+    assert board.size() == 2
+
+
+def test_workouts_outside_the_week_are_ignored(board):
+    board.record(1, 'One', 100, date(2030, 6, 2))
+    board.record(1, 'One', 100, date(2030, 6, 10))
+    board.record(1, 'One', 100, None)
+    assert board.size() == 0
+
+
+@pytest.fixture
+def users(app_context):
+    users = [User('Lee', 'Derboard', f'leaderboard{i}@example.com', 'password123', date(1990, 1, 1))
+             for i in range(2)]
+    db.session.add_all(users)
+    db.session.commit()
+    yield users
+    for user in users:
+        db.session.query(WorkoutList).filter_by(user_id=user.id).delete()
+        db.session.delete(user)
+    db.session.commit()
+
+
+def add_workout(user, difficulty, duration, day):
+    db.session.add(WorkoutList('Run', difficulty, duration, user.id, day))
+    db.session.commit()
+
+
+def test_rebuild_sums_the_week_from_sql(board, users):
+    first, second = users
+    add_workout(first, 'easy', 10, MONDAY)
+    add_workout(first, 'hard', 10, date(2030, 6, 9))
+    add_workout(second, 'medium', 30, date(2030, 6, 5))
+    add_workout(second, 'hard', 60, date(2030, 6, 10))  # Next week
+
+    board.rebuild(MONDAY)
+
+    assert [(entry['user_id'], entry['calories'], entry['name']) for entry in board.top()] == [
+        (second.id, 210, 'Lee D.'), (first.id, 150, 'Lee D.')]
+
+
+def test_new_week_rebuilds_on_the_next_read(board, users):
+    first, second = users
+    add_workout(second, 'hard', 60, date(2030, 6, 10))
+    board.record(first.id, 'Lee D.', 999, MONDAY)
+
+    FrozenDate.today_value = date(2030, 6, 11)
+    assert [entry['user_id'] for entry in board.top()] == [second.id]
+    assert board.week_start == date(2030, 6, 10)
+    assert board.rank_of(first.id) is None
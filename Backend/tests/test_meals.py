@@ -0,0 +1,103 @@
+from datetime import date, datetime, timedelta
+
+import jwt
+import pytest
+
+from App import db
+from App.models import User
+from database import Meal
+
+
+@pytest.fixture
+def users(app_context):
+    users = [User('Meal', 'Logger', f'meals{i}@example.com', 'password123', date(1990, 1, 1)) for i in range(2)]
+    db.session.add_all(users)
+    db.session.commit()
+    yield users
+    db.session.query(Meal).delete()
+    for user in users:
+        db.session.delete(user)
+    db.session.commit()
+
+
+def headers(app, user):
+    token = jwt.encode({'user_id': user.id, 'exp': datetime.utcnow() + timedelta(hours=1)}, app.config['SECRET_KEY'])
+    return {'Authorization': f'Bearer {token}'}
+
+
+def add_meal(client, auth, day, calories, name='Rice', **nutrients):
+    response = client.post('/api/meals', headers=auth, json=dict(
+        type='lunch', food_name=name, quantity=100, date=day, calories=calories, **nutrients))
+    assert response.status_code == 201
+
+
+def test_meals_need_a_valid_token(app, users):
+    client = app.test_client()
+    assert client.get('/api/meals').status_code == 401
+    assert client.get('/api/meals', headers={'Authorization': 'Bearer nope'}).status_code == 401
+    expired = jwt.encode({'user_id': users[0].id, 'exp': datetime.utcnow() - timedelta(seconds=1)},
+                         app.config['SECRET_KEY'])
+    response = client.get('/api/meals', headers={'Authorization': f'Bearer {expired}'})
+    assert response.get_json() == {'error': 'Token has expired'}
+
+
+def test_users_only_see_and_change_their_own_meals(app, users):
+    client = app.test_client()
+    mine, theirs = headers(app, users[0]), headers(app, users[1])
+    add_meal(client, mine, '2024-03-04', 200)
+    add_meal(client, theirs, '2024-03-04', 300, name='Soup')
+
+    meals = client.get('/api/meals?date=2024-03-04', headers=mine).get_json()
+    assert [meal['name'] for meal in meals] == ['Rice']
+    meal_id = meals[0]['id']
+
+    assert client.put(f'/api/meals/{meal_id}', headers=theirs, json={'calories': 1}).status_code == 404
+    assert client.delete(f'/api/meals/{meal_id}', headers=theirs).status_code == 404
+    assert client.put(f'/api/meals/{meal_id}', headers=mine, json={'calories': 250}).status_code == 200
+    assert client.get('/api/meals', headers=mine).get_json()[0]['calories'] == 250
+    assert client.delete(f'/api/meals/{meal_id}', headers=mine).status_code == 200
+    assert client.get('/api/meals', headers=mine).get_json() == []
+
+
+def test_summary_sums_per_day_in_range(app, users):
+    client = app.test_client()
+    mine = headers(app, users[0])
+    add_meal(client, mine, '2024-03-04', 200.5, protein=10, fat=1)
+    add_meal(client, mine, '2024-03-04', 300, protein=5.25, carbohydrates=40)
+    add_meal(client, mine, '2024-03-06', 100)
+    add_meal(client, mine, '2024-03-08', 999)  # Outside the range
+    add_meal(client, headers(app, users[1]), '2024-03-04', 700)  # Someone else's
+
+    summary = client.get('/api/meals/summary?start_date=2024-03-04&end_date=2024-03-07', headers=mine).get_json()
+
+    assert summary['days'] == [
+        {'date': '2024-03-04', 'meals': 2, 'calories': 500.5, 'protein': 15.25, 'carbohydrates': 40, 'fat': 1},
+        {'date': '2024-03-06', 'meals': 1, 'calories': 100, 'protein': 0, 'carbohydrates': 0, 'fat': 0},
+    ]
+    assert summary['totals'] == {'meals': 3, 'calories': 600.5, 'protein': 15.25, 'carbohydrates': 40, 'fat': 1}
+
+
+def test_summary_validates_the_range(app, users):
+    client = app.test_client()
+    mine = headers(app, users[0])
+    assert client.get('/api/meals/summary?start_date=2024-3-x', headers=mine).status_code == 400
+    assert client.get('/api/meals/summary?start_date=2024-03-04&end_date=2024-03-01',
+                      headers=mine).status_code == 400
+    summary = client.get('/api/meals/summary?start_date=2024-01-01&end_date=2026-01-01', headers=mine).get_json()
+    assert summary['end_date'] == '2024-12-31'  # Capped at MAX_SUMMARY_DAYS
+
+
+def test_orphaned_meals_can_be_assigned_to_a_user(app, users):
+    db.session.add_all([Meal(type='dinner', name='Old', quantity=1, date=date(2023, 1, 1)) for _ in range(2)])
+    db.session.commit()
+    runner = app.test_cli_runner()
+
+    result = runner.invoke(args=['assign-orphaned-meals', '--user-id', '999999'])
+    assert result.exit_code != 0
+    assert 'No user with id 999999' in result.output
+
+    result = runner.invoke(args=['assign-orphaned-meals', '--user-id', str(users[0].id)])
+    assert result.exit_code == 0
+    assert f'Assigned 2 meals to user {users[0].id}' in result.output
+    meals = app.test_client().get('/api/meals', headers=headers(app, users[0])).get_json()
+    assert [meal['name'] for meal in meals] == ['Old', 'Old']
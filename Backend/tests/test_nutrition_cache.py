@@ -0,0 +1,128 @@
+import threading
+import time
+
+import pytest
+
+from cache import NutritionCache
+from usda_stub import StubServer
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    server = StubServer().start()
+    monkeypatch.setenv('USDA_API_URL', server.url)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def fetch(stub):
+    from usda import fetch_usda_nutrition
+    return fetch_usda_nutrition
+
+
+def make_cache(tmp_path, **kwargs):
+    return NutritionCache(str(tmp_path / 'cache.db'), **kwargs)
+
+
+def accessed_at(cache, key):
+    return cache._conn.execute("SELECT accessed_at FROM nutrition_cache WHERE key = ?", (key,)).fetchone()[0]
+
+
+def keys(cache):
+    return {row[0] for row in cache._conn.execute("SELECT key FROM nutrition_cache")}
+
+
+def test_hit_after_miss_with_normalized_key(tmp_path, stub, fetch):
+    cache = make_cache(tmp_path)
+    first = cache.get_or_fetch('Green  Apple!', fetch)
+    assert first['description'] == 'GREEN  APPLE!'
+    assert cache.get_or_fetch('green apple', fetch) == first
+    assert stub.calls == 1
+    assert cache.stats()['hits'] == 1
+
+
+def test_entries_expire_after_ttl(tmp_path, stub, fetch):
+    cache = make_cache(tmp_path, ttl=0.2)
+    cache.get_or_fetch('apple', fetch)
+    cache.get_or_fetch('apple', fetch)
+    assert stub.calls == 1
+    time.sleep(0.3)
+    cache.get_or_fetch('apple', fetch)
+    assert stub.calls == 2
+
+
+def test_not_found_is_cached_for_the_negative_ttl(tmp_path, stub, fetch):
+    cache = make_cache(tmp_path, ttl=60, negative_ttl=0.2)
+    assert cache.get_or_fetch('unknown dish', fetch) is None
+    assert cache.get_or_fetch('apple', fetch) is not None
+    assert cache.get_or_fetch('unknown dish', fetch) is None
+    assert stub.calls == 2
+    assert cache.stats()['negative_hits'] == 1
+
+    time.sleep(0.3)
+    cache.get_or_fetch('unknown dish', fetch)
+    cache.get_or_fetch('apple', fetch)
+    assert stub.calls == 3  # Only the "not found" answer expired
+
+
+def test_errors_are_not_cached(tmp_path):
+    cache = make_cache(tmp_path)
+    calls = []
+
+    def failing(name):
+        calls.append(name)
+        raise RuntimeError('USDA is down')
+
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            cache.get_or_fetch('apple', failing)
+    assert len(calls) == 2
+    assert cache.stats()['errors'] == 2
+
+
+def test_concurrent_misses_share_one_upstream_call(tmp_path, stub, fetch):
+    stub.delay = 0.3
+    cache = make_cache(tmp_path)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_fetch('salmon', fetch)))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert stub.calls == 1
+    assert len(results) == 8 and all(result == results[0] for result in results)
+    stats = cache.stats()
+    assert stats['misses'] == 1
+    assert stats['coalesced'] == 7
+
+
+def test_hits_write_access_times_in_batches(tmp_path):
+    cache = make_cache(tmp_path, touch_batch=3)
+    cache.get_or_fetch('apple', lambda name: {'name': name})
+    stored = accessed_at(cache, 'apple')
+
+    cache.get_or_fetch('apple', lambda name: None)
+    cache.get_or_fetch('apple', lambda name: None)
+    assert accessed_at(cache, 'apple') == stored  # Still only in memory
+    cache.get_or_fetch('apple', lambda name: None)
+    assert accessed_at(cache, 'apple') > stored
+
+
+def test_eviction_runs_periodically_and_keeps_recently_used(tmp_path):
+    cache = make_cache(tmp_path, max_entries=2, evict_every=3)
+    value = lambda name: {'name': name}
+    cache.get_or_fetch('a', value)
+    cache.get_or_fetch('b', value)
+    cache.get_or_fetch('a', value)  # a is now more recent than b
+    cache.get_or_fetch('c', value)  # Third insert: evict down to two
+    assert keys(cache) == {'a', 'c'}
+
+    cache.get_or_fetch('d', value)
+    assert keys(cache) == {'a', 'c', 'd'}  # Over the limit until the next eviction
+    cache.get_or_fetch('e', value)
+    cache.get_or_fetch('f', value)
+    assert keys(cache) == {'e', 'f'}
@@ -0,0 +1,201 @@
+import socket
+import socketserver
+import threading
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from App import db
+from App.hashing import password_hasher
+from App.models import EmailOutbox, User
+from App.outbox import mail_outbox
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib; refuses recipients with "reject" in the address"""
+
+    def reply(self, line):
+        self.wfile.write(line.encode() + b'\r\n')
+
+    def handle(self):
+        self.server.connections += 1
+        self.reply('220 localhost test SMTP')
+        recipients = []
+        while True:
+            line = self.rfile.readline().decode().strip()
+            command = line[:4].upper()
+            if not line or command == 'QUIT':
+                self.reply('221 Bye')
+                return
+            if command in ('EHLO', 'HELO'):
+                self.reply('250 localhost')
+            elif command == 'RCPT':
+                if 'reject' in line:
+                    self.reply('550 No such user')
+                else:
+                    recipients.append(line.split(':', 1)[1].strip(' <>'))
+                    self.reply('250 OK')
+            elif command == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                while self.rfile.readline() not in (b'.\r\n', b''):
+                    pass
+                self.server.delivered.extend(recipients)
+                self.reply('250 OK')
+            else:  # MAIL, RSET, NOOP
+                recipients = [] if command in ('MAIL', 'RSET') else recipients
+                self.reply('250 OK')
+
+
+@pytest.fixture
+def smtp_server(app, monkeypatch):
+    server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), SMTPHandler)
+    server.daemon_threads = True
+    server.connections = 0
+    server.delivered = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    state = app.extensions['mail']
+    monkeypatch.setattr(state, 'server', '127.0.0.1')
+    monkeypatch.setattr(state, 'port', server.server_address[1])
+    monkeypatch.setattr(state, 'use_tls', False)
+    monkeypatch.setattr(state, 'use_ssl', False)
+    monkeypatch.setattr(state, 'username', None)
+    monkeypatch.setattr(state, 'suppress', False)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def outbox(app_context, smtp_server):
+    db.session.query(EmailOutbox).delete()
+    db.session.commit()
+    yield mail_outbox
+    db.session.query(EmailOutbox).delete()
+    db.session.commit()
+
+
+def enqueue(*recipients):
+    messages = [mail_outbox.enqueue(recipient, 'Hello', 'Body') for recipient in recipients]
+    db.session.commit()
+    return [message.id for message in messages]
+
+
+def load(message_id):
+    return db.session.get(EmailOutbox, message_id)
+
+
+def make_due(message_id):
+    db.session.get(EmailOutbox, message_id).next_attempt_at = datetime.utcnow() - timedelta(seconds=1)
+    db.session.commit()
+
+
+def test_batch_is_sent_over_one_connection(outbox, smtp_server):
+    ids = enqueue('a@example.com', 'b@example.com', 'c@example.com')
+
+    assert outbox.dispatch_batch() == 3
+
+    assert smtp_server.connections == 1
+    assert sorted(smtp_server.delivered) == ['a@example.com', 'b@example.com', 'c@example.com']
+    for message_id in ids:
+        message = load(message_id)
+        assert message.status == 'sent'
+        assert message.body is None  # May have held a temporary password
+        assert message.sent_at is not None
+    assert outbox.dispatch_batch() == 0
+
+
+def test_refused_message_is_retried_with_backoff(outbox, smtp_server, app):
+    good, refused = enqueue('ok@example.com', 'reject@example.com')
+    backoff = app.config['MAIL_OUTBOX_BACKOFF']
+
+    before = datetime.utcnow()
+    assert outbox.dispatch_batch() == 2
+    assert load(good).status == 'sent'
+    message = load(refused)
+    assert message.status == 'pending'
+    assert message.attempts == 1
+    assert message.body == 'Body'
+    assert before + timedelta(seconds=backoff) <= message.next_attempt_at
+    assert outbox.dispatch_batch() == 0  # Not due yet
+
+    make_due(refused)
+    before = datetime.utcnow()
+    assert outbox.dispatch_batch() == 1
+    message = load(refused)
+    assert message.attempts == 2
+    assert before + timedelta(seconds=2 * backoff) <= message.next_attempt_at  # Doubled
+    assert smtp_server.delivered == ['ok@example.com']
+
+
+def test_message_fails_after_max_attempts(outbox, app, monkeypatch):
+    monkeypatch.setitem(app.config, 'MAIL_OUTBOX_MAX_ATTEMPTS', 2)
+    (refused,) = enqueue('reject@example.com')
+
+    outbox.dispatch_batch()
+    make_due(refused)
+    outbox.dispatch_batch()
+
+    message = load(refused)
+    assert message.status == 'failed'
+    assert message.attempts == 2
+    assert message.body is None
+    assert '550' in message.last_error
+    make_due(refused)
+    assert outbox.dispatch_batch() == 0
+
+
+def test_unreachable_server_leaves_the_batch_pending(outbox, app, monkeypatch):
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        closed_port = s.getsockname()[1]
+    monkeypatch.setattr(app.extensions['mail'], 'port', closed_port)
+    ids = enqueue('a@example.com', 'b@example.com')
+
+    assert outbox.dispatch_batch() == 2
+
+    for message_id in ids:
+        message = load(message_id)
+        assert message.status == 'pending'
+        assert message.attempts == 1
+        assert message.last_error
+
+
+@pytest.fixture
+def user(app_context):
+    user = User('Reset', 'Me', 'reset@example.com', 'password123', date(1990, 1, 1))
+    db.session.add(user)
+    db.session.commit()
+    user_id = user.id
+    yield user
+    db.session.query(User).filter_by(id=user_id).delete()
+    db.session.commit()
+
+
+def reset_password(app):
+    return app.test_client().post('/api/auth/reset-password', json={'email': 'reset@example.com'})
+
+
+def test_reset_password_says_the_email_is_queued(app, outbox, user):
+    response = reset_password(app)
+
+    assert response.status_code == 200
+    assert 'queued' in response.get_json()['message']
+    message = db.session.query(EmailOutbox).filter_by(recipient='reset@example.com').one()
+    assert message.status == 'pending'
+    assert message.subject == 'Your Temporary Password'
+
+
+def test_reset_password_is_503_when_hashing_is_busy(app, outbox, user, monkeypatch):
+    old_hash = user.password_hash
+    monkeypatch.setattr(password_hasher, 'workers', 1)
+    monkeypatch.setattr(password_hasher, '_slots', threading.BoundedSemaphore(1))
+    password_hasher._slots.acquire()
+
+    response = reset_password(app)
+
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+    db.session.expire_all()
+    assert db.session.get(User, user.id).password_hash == old_hash
+    assert db.session.query(EmailOutbox).filter_by(recipient='reset@example.com').count() == 0
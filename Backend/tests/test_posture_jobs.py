@@ -0,0 +1,143 @@
+import io
+import os
+import time
+import uuid
+
+import pytest
+
+from App import db
+from PostureCorrector.estimators import stub_estimator
+from PostureCorrector.jobs import PostureJob, posture_jobs
+from PostureCorrector.storage import session_store
+
+
+def crash_once_estimator(path):
+    """Kills its worker process the first time it sees a recording"""
+    marker = path + '.crashed'
+    if not os.path.exists(marker):
+        open(marker, 'w').close()
+        os._exit(1)
+    return stub_estimator(path)
+
+
+def crash_estimator(path):
+    os._exit(1)
+
+
+@pytest.fixture
+def job_queue(app, auth_client):
+    """The dispatcher running with one worker; pass an estimator name to use that instead of the stub"""
+    saved = dict(app.config)
+
+    def start(estimator='PostureCorrector.estimators:stub_estimator', **config):
+        app.config.update(POSTURE_ESTIMATOR=estimator, POSTURE_JOB_IDLE_INTERVAL=0.2, **config)
+        posture_jobs.workers = 1
+        posture_jobs.start()
+        return auth_client()
+
+    yield start
+    posture_jobs.stop()
+    app.config.clear()
+    app.config.update(saved)
+
+
+def upload(client, size=100 * 1024):
+    return client.post('/api/posture/jobs', data={'file': (io.BytesIO(b'\0' * size), 'clip.mp4')},
+                       content_type='multipart/form-data')
+
+
+def wait_until_finished(client, job_id, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f'/api/posture/jobs/{job_id}').get_json()
+        if job['status'] in ('done', 'failed'):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f'job {job_id} still {job["status"]} after {timeout}s')
+
+
+def test_upload_is_queued_then_analysed(job_queue):
+    client = job_queue()
+    response = upload(client, size=200 * 1024)  # Two seconds of stub video
+    assert response.status_code == 202
+    job = response.get_json()
+    assert job['status'] in ('queued', 'running')  # The dispatcher may already have it
+    assert response.headers['Location'].endswith(job['job_id'])
+
+    job = wait_until_finished(client, job['job_id'])
+    assert job['status'] == 'done', job['error']
+    assert job['attempts'] == 1
+    assert job['result']['frames'] == 60
+    assert job['result']['reps']['curl'] == 1
+    assert job['result']['posture']['frames'] == 60
+    assert len(session_store.reader(job['job_id'])) == 60
+
+
+def test_events_stream_ends_with_the_finished_job(job_queue):
+    client = job_queue()
+    job_id = upload(client).get_json()['job_id']
+    wait_until_finished(client, job_id)
+
+    body = client.get(f'/api/posture/jobs/{job_id}/events').get_data(as_text=True)
+    assert body.startswith('event: status')
+    assert '"status": "done"' in body
+
+
+def test_upload_refused_when_queue_is_full(app, auth_client):
+    app.config['POSTURE_JOB_MAX_QUEUED'] = 0
+    try:
+        response = upload(auth_client())
+    finally:
+        app.config['POSTURE_JOB_MAX_QUEUED'] = 100
+    assert response.status_code == 503
+    assert 'error' in response.get_json()
+
+
+def test_requeue_interrupted_gives_up_after_max_attempts(app_context):
+    retry, exhausted = uuid.uuid4().hex, uuid.uuid4().hex
+    max_attempts = app_context.config['POSTURE_JOB_MAX_ATTEMPTS']
+    db.session.add(PostureJob(id=retry, status='running', attempts=1))
+    db.session.add(PostureJob(id=exhausted, status='running', attempts=max_attempts))
+    db.session.commit()
+
+    assert posture_jobs.requeue_interrupted() >= 2
+
+    assert db.session.get(PostureJob, retry).status == 'queued'
+    job = db.session.get(PostureJob, exhausted)
+    assert job.status == 'failed'
+    assert job.error == 'Interrupted too many times'
+    db.session.query(PostureJob).filter(PostureJob.id.in_((retry, exhausted))).delete()
+    db.session.commit()
+
+
+def test_job_retried_on_a_new_pool_when_its_worker_dies(job_queue):
+    client = job_queue('test_posture_jobs:crash_once_estimator')
+    job = wait_until_finished(client, upload(client).get_json()['job_id'])
+    assert job['status'] == 'done', job['error']
+    assert job['attempts'] == 2
+
+    # The replacement pool keeps taking work
+    job = wait_until_finished(client, upload(client).get_json()['job_id'])
+    assert job['status'] == 'done'
+
+
+def test_job_failed_after_max_attempts_of_dying_workers(job_queue):
+    client = job_queue('test_posture_jobs:crash_estimator', POSTURE_JOB_MAX_ATTEMPTS=2)
+    job = wait_until_finished(client, upload(client).get_json()['job_id'])
+    assert job['status'] == 'failed'
+    assert job['error'] == 'Worker process died'
+    assert job['attempts'] == 2
+
+
+def test_job_routes_need_a_token_and_the_uploader(app, auth_client, job_queue):
+    anonymous = app.test_client()
+    assert upload(anonymous).status_code == 401
+    assert anonymous.get('/api/posture/jobs/stats').status_code == 401
+
+    client = job_queue()
+    job_id = upload(client).get_json()['job_id']
+    assert anonymous.get(f'/api/posture/jobs/{job_id}').status_code == 401
+    someone_else = auth_client(user_id=2)
+    assert someone_else.get(f'/api/posture/jobs/{job_id}').status_code == 404
+    assert someone_else.get(f'/api/posture/jobs/{job_id}/events').status_code == 404
+    wait_until_finished(client, job_id)
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from PostureCorrector.posture import MAX_FRAMES
+from PostureCorrector.scoring import as_frames
+
+
+def upright_frame():
+    frame = [[320.0, 240.0, 0.9]] * 17
+    frame[5], frame[6] = [280.0, 230.0, 0.9], [360.0, 230.0, 0.9]  # Shoulders
+    frame[11], frame[12] = [290.0, 420.0, 0.9], [350.0, 420.0, 0.9]  # Hips
+    frame[3], frame[4] = [300.0, 135.0, 0.9], [340.0, 135.0, 0.9]  # Ears
+    return frame
+
+
+@pytest.mark.parametrize('frames', [
+    np.zeros((2, 17, 3)),
+    np.zeros((2, 51)),
+])
+def test_as_frames_accepts_nested_or_flat_rows(frames):
+    assert as_frames(frames.tolist()).shape == (2, 17, 3)
+
+
+@pytest.mark.parametrize('frames', [
+    [],
+    5,
+    [0.0] * 51,  # One flat frame, not a list of frames
+    [[0.0] * 51 * 2],  # Two frames squeezed into one row
+    [[[0.0, 0.0, 0.0]] * 16],
+    [[[0.0, 0.0]] * 17],
+    [[[0.0, 0.0, 0.0]] * 17, [[0.0, 0.0, 0.0]] * 16],
+    [[['a', 0.0, 0.0]] * 17],
+    [[[None, 0.0, 0.0]] * 17],
+])
+def test_as_frames_rejects_other_shapes(frames):
+    with pytest.raises(ValueError):
+        as_frames(frames)
+
+
+def test_analyze_posture(app):
+    response = app.test_client().post('/api/analyze_posture', json={'frames': [upright_frame()] * 3})
+    assert response.status_code == 200
+    assert response.get_json()['summary']['frames'] == 3
+
+
+@pytest.mark.parametrize('body', [
+    {},
+    {'frames': 5},
+    {'frames': 'abc'},
+    {'frames': {'a': 1}},
+    {'frames': [[0.0] * 51 * (MAX_FRAMES + 1)]},  # Over the limit in a single row
+    {'frames': [[[0.0, 0.0]] * 17]},
+])
+def test_analyze_posture_rejects_bad_frames(app, body):
+    response = app.test_client().post('/api/analyze_posture', json=body)
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
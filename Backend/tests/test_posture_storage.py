@@ -0,0 +1,126 @@
+import numpy as np
+import pytest
+
+from PostureCorrector.storage import MAX_COORDINATE, PostureSessionStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return PostureSessionStore(str(tmp_path))
+
+
+def make_frames(count, seed=0):
+    rng = np.random.default_rng(seed)
+    frames = np.empty((count, 17, 3), dtype=np.float32)
+    frames[:, :, :2] = rng.uniform(0, 640, (count, 17, 2))
+    frames[:, :, 2] = rng.uniform(0, 1, (count, 17))
+    return frames
+
+
+def tolerance(encoding):
+    # delta16 keeps 1/16 px and 1/10000 of a score
+    return (0, 0) if encoding == 'raw' else (1 / 32 + 1e-4, 1 / 20000 + 1e-6)
+
+
+def assert_frames_close(actual, expected, encoding):
+    coordinate_tol, score_tol = tolerance(encoding)
+    assert actual.shape == expected.shape
+    np.testing.assert_allclose(actual[..., :2], expected[..., :2], rtol=0, atol=coordinate_tol)
+    np.testing.assert_allclose(actual[..., 2], expected[..., 2], rtol=0, atol=score_tol)
+
+
+@pytest.mark.parametrize('encoding', ['raw', 'delta16'])
+def test_round_trip(store, encoding):
+    frames = make_frames(150)  # Two full 64-frame blocks and a partial one
+    timestamps = 1000.0 + np.arange(150) / 30
+    with store.create('s1', encoding=encoding) as writer:
+        assert writer.append(timestamps, frames) == 150
+
+    reader = store.reader('s1')
+    assert len(reader) == 150
+    read_times, read_frames = reader.read()
+    np.testing.assert_allclose(read_times, timestamps, atol=1e-4)
+    assert_frames_close(read_frames, frames, encoding)
+
+    # A range that starts and ends mid-block
+    read_times, read_frames = reader.read(1000.0 + 70 / 30, 1000.0 + 130 / 30)
+    assert len(read_frames) == 60
+    assert_frames_close(read_frames, frames[70:130], encoding)
+
+
+def test_delta16_clips_coordinates_to_a_span_int16_deltas_can_hold(store):
+    frames = make_frames(2)
+    frames[0, 0, 0], frames[1, 0, 0] = -1000.0, 1500.0  # Off the left edge, then far right
+    frames[0, 1, 1], frames[1, 1, 1] = 5000.0, 0.0
+    with store.create('s1') as writer:
+        writer.append([0.0, 0.1], frames)
+
+    read_frames = store.reader('s1').frames()
+    assert read_frames[0, 0, 0] == 0.0
+    assert read_frames[1, 0, 0] == 1500.0
+    assert read_frames[0, 1, 1] == MAX_COORDINATE
+    assert read_frames[1, 1, 1] == 0.0
+
+
+@pytest.mark.parametrize('encoding', ['raw', 'delta16'])
+def test_stride_keeps_every_nth_frame_across_appends(store, encoding):
+    frames = make_frames(10)
+    timestamps = np.arange(10) / 30
+    with store.create('s1', encoding=encoding, stride=3) as writer:
+        assert writer.append(timestamps[:4], frames[:4]) == 2  # frames 0 and 3
+        assert writer.append(timestamps[4:], frames[4:]) == 2  # frames 6 and 9
+
+    read_times, read_frames = store.reader('s1').read()
+    np.testing.assert_allclose(read_times, timestamps[::3], atol=1e-6)
+    assert_frames_close(read_frames, frames[::3], encoding)
+
+
+@pytest.mark.parametrize('encoding', ['raw', 'delta16'])
+def test_reopen_and_append(store, encoding):
+    frames = make_frames(100)
+    timestamps = np.arange(100) / 30
+    with store.create('s1', encoding=encoding, block_frames=8) as writer:
+        writer.append(timestamps[:13], frames[:13])  # Leaves a partly filled block
+    with store.writer('s1') as writer:
+        assert len(writer) == 13
+        writer.append(timestamps[13:], frames[13:])
+
+    reader = store.reader('s1')
+    assert len(reader) == 100
+    assert_frames_close(reader.frames(), frames, encoding)
+
+    with store.writer('s1') as writer:
+        with pytest.raises(ValueError):
+            writer.append([0.0], frames[:1])  # Before the last stored frame
+
+
+def test_reader_only_sees_flushed_frames(store):
+    frames = make_frames(20)
+    writer = store.create('s1')
+    writer.append(np.arange(10) / 30, frames[:10])
+    writer.flush()
+    reader = store.reader('s1')
+    writer.append(10 / 30 + np.arange(10) / 30, frames[10:])
+    writer.close()
+
+    assert len(reader) == 10
+    assert len(store.reader('s1')) == 20
+
+
+@pytest.mark.parametrize('encoding', ['raw', 'delta16'])
+def test_empty_session(store, encoding):
+    store.create('s1', encoding=encoding).close()
+
+    reader = store.reader('s1')
+    assert len(reader) == 0
+    timestamps, frames = reader.read()
+    assert len(timestamps) == 0
+    assert frames.shape == (0, 17, 3)
+    assert store.sessions() == ['s1']
+
+
+def test_missing_session_and_bad_ids(store):
+    with pytest.raises(KeyError):
+        store.reader('nope')
+    with pytest.raises(ValueError):
+        store.create('../escape')
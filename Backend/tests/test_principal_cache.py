@@ -0,0 +1,79 @@
+import time
+from datetime import date, datetime, timedelta
+
+import jwt
+import pytest
+
+from App import db
+from App.cache import PrincipalCache, principal_cache
+from App.models import EmailOutbox, User
+
+
+def test_token_ttl_is_capped_at_its_exp():
+    cache = PrincipalCache()
+    cache.add_token('short', 1, exp=time.time() + 0.2)
+    cache.add_token('long', 2, exp=time.time() + 3600)
+    cache.add_token('expired', 3, exp=time.time() - 1)
+    assert cache.get_user_id('short') == 1
+    assert cache.get_user_id('expired') is None
+
+    time.sleep(0.3)
+    assert cache.get_user_id('short') is None
+    assert cache.get_user_id('long') == 2
+
+
+def test_invalidate_user_drops_the_user_and_their_tokens():
+    cache = PrincipalCache()
+    cache.add_token('a', 1)
+    cache.add_token('b', 1)
+    cache.add_token('c', 2)
+    cache.invalidate_user(1)
+    assert (cache.get_user_id('a'), cache.get_user_id('b'), cache.get_user_id('c')) == (None, None, 2)
+
+
+@pytest.fixture
+def user(app_context):
+    principal_cache.clear()
+    user = User('Cached', 'Principal', 'principal@example.com', 'password123', date(1990, 1, 1))
+    db.session.add(user)
+    db.session.commit()
+    user_id = user.id
+    yield user
+    db.session.query(EmailOutbox).filter_by(recipient='principal@example.com').delete()
+    db.session.query(User).filter_by(id=user_id).delete()
+    db.session.commit()
+    principal_cache.clear()
+
+
+def verify(app, user):
+    token = jwt.encode({'user_id': user.id, 'exp': datetime.utcnow() + timedelta(hours=1)}, app.config['SECRET_KEY'])
+    response = app.test_client().get('/api/auth/verify-token', headers={'Authorization': f'Bearer {token}'})
+    assert response.status_code == 200
+    return token, response.get_json()['user']
+
+
+def test_profile_update_invalidates_the_cached_user(app, user):
+    token, _ = verify(app, user)
+    assert principal_cache.get_user(user.id) is not None
+    assert principal_cache.get_user_id(token) == user.id
+
+    # The request ran in this test's session and detached `user` when caching it
+    db.session.get(User, user.id).updateProfile(first_name='Renamed')
+
+    assert principal_cache.get_user(user.id) is None
+    assert principal_cache.get_user_id(token) is None
+    assert verify(app, user)[1]['first_name'] == 'Renamed'
+
+
+def test_password_reset_invalidates_the_cached_user(app, user):
+    token, _ = verify(app, user)
+    response = app.test_client().post('/api/auth/reset-password', json={'email': 'principal@example.com'})
+    assert response.status_code == 200
+    assert principal_cache.get_user(user.id) is None
+    assert principal_cache.get_user_id(token) is None
+
+
+def test_cache_stats_route_is_gone(app, user):
+    token, _ = verify(app, user)
+    response = app.test_client().get('/api/auth/cache-stats', headers={'Authorization': f'Bearer {token}'})
+    assert response.status_code == 404
@@ -0,0 +1,154 @@
+import json
+import math
+
+import pytest
+
+from PostureCorrector.reps import EXERCISES, RepCounter, RepSession, RepSessionRegistry
+
+CURL = EXERCISES['curl']
+EXTENDED, FLEXED = CURL[2], CURL[3]
+
+
+def curl_frame(left=None, right=None, left_score=0.9, right_score=0.9):
+    """A frame with each elbow at the given angle (None: arm out of view)"""
+    frame = [[0.0, 0.0, 0.1] for _ in range(17)]
+    for (shoulder, elbow, wrist), angle, score in ((CURL[0], left, left_score), (CURL[1], right, right_score)):
+        if angle is None:
+            continue
+        frame[shoulder] = [100.0, 100.0, score]
+        frame[elbow] = [100.0, 200.0, score]  # Upper arm straight down from the shoulder
+        forearm = math.radians(angle - 90)  # Angle at the elbow between "up" and the forearm
+        frame[wrist] = [100.0 + 80 * math.cos(forearm), 200.0 + 80 * math.sin(forearm), score]
+    return frame
+
+
+def counter():
+    return RepCounter(*CURL)
+
+
+def feed(counter, angles, **kwargs):
+    for angle in angles:
+        counter.update(curl_frame(left=angle, **kwargs))
+    return counter
+
+
+def test_frame_helper_makes_the_requested_angle():
+    c = feed(counter(), [100.0])
+    assert c.angle == pytest.approx(100.0)
+
+
+def test_counts_one_rep_per_bend_and_straighten():
+    c = feed(counter(), [170, 120, 40, 120, 170] * 3)
+    assert c.reps == 3
+    assert c.stage == 'extended'
+
+
+def test_no_rep_until_first_seen_extended():
+    c = feed(counter(), [40, 100, 170])
+    assert c.reps == 0
+    assert c.stage == 'extended'
+
+
+def test_jitter_around_the_flexed_threshold_counts_once():
+    c = feed(counter(), [170] + [FLEXED - 1, FLEXED + 1] * 10 + [170])
+    assert c.reps == 1
+
+
+def test_jitter_around_the_extended_threshold_counts_once():
+    c = feed(counter(), [170, 40] + [EXTENDED + 1, EXTENDED - 1] * 10)
+    assert c.reps == 1
+    assert c.stage == 'extended'
+
+
+def test_partial_bend_is_not_a_rep():
+    c = feed(counter(), [170, FLEXED + 5, 170])
+    assert c.reps == 0
+
+
+def test_follows_the_better_seen_side():
+    c = counter()
+    # Left arm curls but is barely visible; the clearer right arm stays straight
+    for angle in (170, 40, 170):
+        c.update(curl_frame(left=angle, right=170, left_score=0.4, right_score=0.8))
+    assert c.reps == 0
+    for angle in (170, 40, 170):
+        c.update(curl_frame(left=170, right=angle, left_score=0.4, right_score=0.8))
+    assert c.reps == 1
+
+
+def test_low_score_joint_keeps_the_current_stage():
+    c = feed(counter(), [170, 40])
+    c.update(curl_frame(left=170, right=170, left_score=0.1, right_score=0.1))
+    assert c.stage == 'flexed'
+    assert c.reps == 0
+    c.update(curl_frame(left=170))
+    assert c.reps == 1
+
+
+def test_bad_frame_rejects_the_whole_batch():
+    session = RepSession('s1')
+    good = curl_frame(left=170, right=170)
+    with pytest.raises(ValueError):
+        session.feed([good, good, good[:16]])
+    with pytest.raises(ValueError):
+        session.feed([good, [[0.0, 'x', 0.9]] * 17])
+    assert session.state()['frames'] == 0
+    assert session.feed([good])['frames'] == 1
+
+
+@pytest.mark.parametrize('value', [math.nan, math.inf, -math.inf, True, None, '1', 10 ** 400])
+def test_non_finite_or_non_numeric_keypoints_are_rejected(value):
+    frame = curl_frame(left=170, right=170)
+    frame[5] = [value, 100.0, 0.9]
+    session = RepSession('s1')
+    with pytest.raises(ValueError):
+        session.feed([frame])
+    assert session.state()['frames'] == 0
+
+
+def test_registry_limits_sessions():
+    registry = RepSessionRegistry(max_sessions=1)
+    session = registry.create()
+    with pytest.raises(RuntimeError):
+        registry.create()
+    assert registry.remove(session.session_id) is session
+    registry.create()
+
+
+def test_feed_endpoint_rejects_a_bad_batch_without_applying_any_of_it(auth_client):
+    client = auth_client()
+    session_id = client.post('/api/reps/sessions').get_json()['session_id']
+    good = curl_frame(left=170, right=170)
+
+    response = client.post(f'/api/reps/sessions/{session_id}/frames', json={'frames': [good, good, [1, 2]]})
+    assert response.status_code == 400
+    assert client.get(f'/api/reps/sessions/{session_id}').get_json()['frames'] == 0
+
+    response = client.post(f'/api/reps/sessions/{session_id}/frames', json={'frames': [good, good]})
+    assert response.get_json()['frames'] == 2
+
+
+def test_sessions_need_a_token_and_belong_to_their_user(app, auth_client):
+    assert app.test_client().post('/api/reps/sessions').status_code == 401
+    owner, other = auth_client(user_id=1), auth_client(user_id=2)
+    session_id = owner.post('/api/reps/sessions').get_json()['session_id']
+    frames = {'frames': [curl_frame(left=170, right=170)]}
+
+    assert app.test_client().get(f'/api/reps/sessions/{session_id}').status_code == 401
+    assert other.get(f'/api/reps/sessions/{session_id}').status_code == 404
+    assert other.post(f'/api/reps/sessions/{session_id}/frames', json=frames).status_code == 404
+    assert other.delete(f'/api/reps/sessions/{session_id}').status_code == 404
+    assert owner.post(f'/api/reps/sessions/{session_id}/frames', json=frames).get_json()['frames'] == 1
+    assert owner.delete(f'/api/reps/sessions/{session_id}').status_code == 200
+
+
+def test_feed_endpoint_rejects_nan_with_a_400(auth_client):
+    client = auth_client()
+    session_id = client.post('/api/reps/sessions').get_json()['session_id']
+    frame = json.dumps(curl_frame(left=170, right=170)).replace('100.0', 'NaN', 1)
+
+    response = client.post(f'/api/reps/sessions/{session_id}/frames', data=f'{{"frames": [{frame}]}}',
+                           content_type='application/json')
+    assert response.status_code == 400
+    json.loads(response.get_data(as_text=True), parse_constant=pytest.fail)  # Strict JSON, no NaN
+    assert client.get(f'/api/reps/sessions/{session_id}').get_json()['frames'] == 0
@@ -0,0 +1,67 @@
+from datetime import date, time
+
+import pytest
+
+from App import db, rollups
+from App.models import Sleep, SleepRollup, User
+
+
+@pytest.fixture
+def user(app_context):
+    user = User('Roll', 'Up', 'rollups@example.com', 'password123', date(1990, 1, 1))
+    db.session.add(user)
+    db.session.commit()
+    yield user
+    db.session.query(SleepRollup).filter_by(user_id=user.id).delete()
+    db.session.query(Sleep).filter_by(user_id=user.id).delete()
+    db.session.delete(user)
+    db.session.commit()
+
+
+def add(user, day, bed, wake):
+    record = Sleep(user.id, day, bed, wake)
+    db.session.add(record)
+    rollups.record_added(record)
+    db.session.commit()
+    return record
+
+
+def stored(user):
+    rows = db.session.query(SleepRollup).filter_by(user_id=user.id).all()
+    return {(row.period, row.bucket_start): (row.record_count, row.total_duration, row.bed_minutes_sum,
+                                             row.wake_minutes_sum) for row in rows}
+
+
+def test_incremental_rollups_match_a_rebuild(user):
+    monday, tuesday = date(2024, 3, 4), date(2024, 3, 5)
+    add(user, monday, time(23, 0), time(7, 0))
+    second = add(user, tuesday, time(0, 30), time(7, 30))
+    third = add(user, date(2024, 4, 1), time(22, 0), time(6, 0))
+
+    week = stored(user)[('week', monday)]
+    assert week[0] == 2
+    assert week[2] == -60 + 30  # 23:00 and 00:30 as minutes from midnight
+
+    previous = rollups.snapshot(second)
+    second.bed_time = time(1, 0)
+    second.sleep_duration = second.get_sleep_duration()
+    rollups.record_replaced(previous, second)
+    rollups.record_removed(third)
+    db.session.delete(third)
+    db.session.commit()
+
+    incremental = stored(user)
+    assert ('month', date(2024, 4, 1)) not in incremental  # Emptied buckets are removed
+    rollups.rebuild(user.id)
+    db.session.expire_all()
+    assert stored(user) == incremental
+
+
+def test_summary_reads_the_rollups(user):
+    add(user, date(2024, 3, 4), time(23, 0), time(7, 0))
+    add(user, date(2024, 3, 5), time(1, 0), time(7, 0))
+
+    summary = rollups.summarize(user.id, 'week')
+    assert summary['totals']['count'] == 2
+    assert summary['buckets'][0]['average_bed_time'] == '00:00'
+    assert summary['buckets'][0]['average_wake_time'] == '07:00'
@@ -0,0 +1,133 @@
+from datetime import date, datetime, time
+from itertools import islice
+
+import pytest
+
+from App import db, scheduling
+from App.models import EmailOutbox
+from App.scheduling import (ReminderDispatcher, ScheduleSpec, iter_occurrences, merge_occurrences, next_reminder,
+                            weekdays_mask, weekdays_names)
+
+MONDAY = date(2024, 3, 4)
+
+
+def spec(schedule_id=1, weekdays=('mon', 'wed', 'fri'), at=time(7, 30), start_date=MONDAY, end_date=None,
+         interval_weeks=1, remind=None, email='runner@example.com'):
+    return ScheduleSpec(schedule_id, 1, email, 'Run', 'easy', 30, weekdays_mask(weekdays), at, start_date,
+                        end_date, interval_weeks, remind)
+
+
+def days(occurrences):
+    return [when.strftime('%a %m-%d') for when in occurrences]
+
+
+def test_weekday_mask_round_trip():
+    assert weekdays_mask(['Mon', 'wednesday', 'sun']) == 0b1000101
+    assert weekdays_names(0b1000101) == ['mon', 'wed', 'sun']
+    with pytest.raises(ValueError):
+        weekdays_mask(['someday'])
+
+
+def test_occurrences_follow_the_weekdays():
+    occurrences = list(islice(iter_occurrences(spec(), date(2024, 3, 6)), 4))
+    assert days(occurrences) == ['Wed 03-06', 'Fri 03-08', 'Mon 03-11', 'Wed 03-13']
+    assert occurrences[0] == datetime(2024, 3, 6, 7, 30)
+
+
+def test_every_other_week_counts_from_the_start_week():
+    schedule = spec(weekdays=('mon', 'thu'), interval_weeks=2)
+    assert days(islice(iter_occurrences(schedule, MONDAY), 4)) == ['Mon 03-04', 'Thu 03-07', 'Mon 03-18', 'Thu 03-21']
+    # A window starting in an "off" week skips to the next "on" one
+    assert days(islice(iter_occurrences(schedule, date(2024, 3, 12)), 2)) == ['Mon 03-18', 'Thu 03-21']
+
+
+def test_end_date_and_window_end_are_inclusive():
+    schedule = spec(end_date=date(2024, 3, 11))
+    assert days(iter_occurrences(schedule, date(2024, 3, 1))) == ['Mon 03-04', 'Wed 03-06', 'Fri 03-08', 'Mon 03-11']
+    assert days(iter_occurrences(spec(), MONDAY, date(2024, 3, 6))) == ['Mon 03-04', 'Wed 03-06']
+    assert list(iter_occurrences(schedule, date(2024, 3, 12))) == []
+    assert list(iter_occurrences(spec(weekdays=()), MONDAY)) == []
+
+
+def test_merge_orders_occurrences_across_schedules():
+    morning = spec(1, weekdays=('mon', 'wed'), at=time(7, 0))
+    evening = spec(2, weekdays=('mon', 'tue'), at=time(18, 0), interval_weeks=2)
+    merged = [(when.strftime('%a %m-%d %H:%M'), schedule.id)
+              for when, schedule in merge_occurrences([evening, morning], MONDAY, date(2024, 3, 12))]
+    assert merged == [('Mon 03-04 07:00', 1), ('Mon 03-04 18:00', 2), ('Tue 03-05 18:00', 2),
+                      ('Wed 03-06 07:00', 1), ('Mon 03-11 07:00', 1)]
+
+
+def test_next_reminder_is_strictly_after():
+    schedule = spec(remind=30)
+    assert next_reminder(schedule, datetime(2024, 3, 4, 6, 0)) == (datetime(2024, 3, 4, 7, 0),
+                                                                    datetime(2024, 3, 4, 7, 30))
+    assert next_reminder(schedule, datetime(2024, 3, 4, 7, 0))[1] == datetime(2024, 3, 6, 7, 30)
+    assert next_reminder(spec(remind=30, end_date=MONDAY), datetime(2024, 3, 4, 7, 0)) is None
+
+
+class FrozenDatetime(datetime):
+    now_value = datetime(2024, 3, 4, 7, 0)
+
+    @classmethod
+    def now(cls, tz=None):
+        return cls.now_value
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    monkeypatch.setattr(scheduling, 'datetime', FrozenDatetime)
+
+    def set_now(*args):
+        FrozenDatetime.now_value = datetime(*args)
+    set_now(2024, 3, 4, 7, 0)
+    return set_now
+
+
+def test_dispatcher_skips_replaced_and_removed_schedules(clock):
+    dispatcher = ReminderDispatcher()
+    daily = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+    dispatcher.add(spec(1, daily, time(8, 0), remind=10))  # 07:50, replaced below
+    dispatcher.add(spec(1, daily, time(8, 50), remind=10))  # 08:40
+    dispatcher.add(spec(2, daily, time(8, 0), remind=30))  # 07:30
+    dispatcher.add(spec(3, daily, time(7, 45), remind=5))  # 07:40, deleted below
+    dispatcher.add(spec(4, daily, time(7, 45)))  # No reminder
+    dispatcher.remove(3)
+    assert dispatcher.pending() == 2
+
+    clock(2024, 3, 4, 7, 55)
+    due = dispatcher._pop_due()
+    assert [(s.id, occurrence) for s, occurrence in due] == [(2, datetime(2024, 3, 4, 8, 0))]
+    assert sorted((entry[0], entry[1]) for entry in dispatcher._heap) == [
+        (datetime(2024, 3, 4, 8, 40), 1), (datetime(2024, 3, 5, 7, 30), 2)]  # Stale entries are gone
+
+    clock(2024, 3, 4, 8, 45)
+    due = dispatcher._pop_due()
+    assert [(s.id, s.time_of_day, occurrence) for s, occurrence in due] == [
+        (1, time(8, 50), datetime(2024, 3, 4, 8, 50))]
+
+
+def test_dispatcher_forgets_ended_schedules(clock):
+    dispatcher = ReminderDispatcher()
+    dispatcher.add(spec(1, ('mon',), time(8, 0), end_date=MONDAY, remind=15))
+    clock(2024, 3, 4, 7, 50)
+    assert len(dispatcher._pop_due()) == 1
+    assert dispatcher.pending() == 0
+    assert dispatcher._heap == []
+
+
+def test_send_queues_reminder_emails(app_context, monkeypatch):
+    from App.outbox import mail_outbox
+    monkeypatch.setattr(mail_outbox, 'notify', lambda: None)
+    dispatcher = ReminderDispatcher()
+    dispatcher.send([(spec(email='reminder-test@example.com'), datetime(2024, 3, 4, 7, 30))])
+
+    messages = db.session.query(EmailOutbox).filter_by(recipient='reminder-test@example.com').all()
+    try:
+        assert [message.subject for message in messages] == ['Reminder: Run at 07:30']
+        assert 'starts at 07:30 on Monday, 04 March' in messages[0].body
+        assert dispatcher.sent == 1
+    finally:
+        for message in messages:
+            db.session.delete(message)
+        db.session.commit()
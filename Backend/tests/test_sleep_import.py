@@ -0,0 +1,95 @@
+import json
+from datetime import date
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from App import db, sleep_import
+from App.models import Sleep, SleepRollup, User
+
+
+@pytest.fixture
+def user(app_context):
+    user = User('Sleep', 'Importer', 'sleep-import@example.com', 'password123', date(1990, 1, 1))
+    db.session.add(user)
+    db.session.commit()
+    yield user
+    db.session.query(SleepRollup).filter_by(user_id=user.id).delete()
+    db.session.query(Sleep).filter_by(user_id=user.id).delete()
+    db.session.delete(user)
+    db.session.commit()
+
+
+@pytest.fixture
+def client(app, user, auth_client, monkeypatch):
+    monkeypatch.setitem(app.config, 'SLEEP_IMPORT_CHUNK_SIZE', 10)
+    return auth_client(user.id)
+
+
+def stored(user):
+    db.session.expire_all()
+    return db.session.query(Sleep).filter_by(user_id=user.id).count()
+
+
+def ndjson(count, first_day=1):
+    return ''.join(json.dumps({'date': f'2023-{1 + (i // 28) % 12:02d}-{1 + i % 28:02d}', 'sleepTime': '23:00',
+                               'wakeTime': '07:00'}) + '\n' for i in range(first_day - 1, first_day - 1 + count))
+
+
+def test_csv_import_reports_rejected_rows(client, user):
+    body = 'date,sleepTime,wakeTime\n2024-03-04,23:00,07:00\n2024-03-05,,07:00\n2024-03-06,00:30,08:00\n'
+    response = client.post('/api/sleep/import', data=body, content_type='text/csv')
+
+    assert response.status_code == 201
+    result = response.get_json()
+    assert result['imported'] == 2
+    assert result['rejected'] == 1
+    assert result['errors'] == [{'line': 3, 'error': 'sleepTime is required'}]
+    assert stored(user) == 2
+    assert db.session.query(SleepRollup).filter_by(user_id=user.id, period='month').one().record_count == 2
+
+
+def test_ndjson_import_in_chunks(client, user):
+    body = ndjson(25) + 'not json\n'
+    response = client.post('/api/sleep/import', data=body, content_type='application/x-ndjson')
+    assert response.get_json()['imported'] == 25
+    assert response.get_json()['errors'] == [{'line': 26, 'error': 'Row is not a valid record'}]
+    assert stored(user) == 25
+
+
+def test_unsupported_type_and_empty_upload(client):
+    assert client.post('/api/sleep/import', data='x', content_type='text/plain').status_code == 415
+    response = client.post('/api/sleep/import', data='', content_type='application/x-ndjson')
+    assert response.status_code == 400
+    assert response.get_json()['imported'] == 0
+
+
+def test_decode_error_reports_the_chunks_already_committed(client, user):
+    body = ndjson(300).encode() + b'\xff\xfe broken\n'  # Well past the first buffered read
+    response = client.post('/api/sleep/import', data=body, content_type='application/x-ndjson')
+
+    assert response.status_code == 400
+    result = response.get_json()
+    assert result['error'].startswith('Could not read upload')
+    assert 0 < result['imported'] < 300
+    assert result['imported'] % 10 == 0  # Whole chunks only
+    assert stored(user) == result['imported']
+
+
+def test_database_error_is_reported_with_the_committed_count(client, user, monkeypatch):
+    real_insert = sleep_import.insert_chunk
+    calls = []
+
+    def failing_second_chunk(user_id, parsed):
+        calls.append(len(parsed))
+        if len(calls) == 2:
+            raise OperationalError('INSERT', {}, Exception('database is locked'))
+        real_insert(user_id, parsed)
+
+    monkeypatch.setattr(sleep_import, 'insert_chunk', failing_second_chunk)
+    response = client.post('/api/sleep/import', data=ndjson(25), content_type='application/x-ndjson')
+
+    assert response.status_code == 500
+    assert response.get_json()['error'] == 'Could not save sleep records'
+    assert response.get_json()['imported'] == 10
+    assert stored(user) == 10
@@ -0,0 +1,88 @@
+import threading
+import time
+
+import pytest
+
+import usda
+from usda import LookupTimeout, get_usda_nutrition_many
+
+
+class BlockingLookup:
+    """Lookups that wait until released, recording which names ever started"""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.started = []
+
+    def __call__(self, name):
+        self.started.append(name)
+        self.release.wait(10)
+        return {'description': name}
+
+
+def wait_for_idle_pool(timeout=5):
+    """Every queue slot free again"""
+    deadline = time.monotonic() + timeout
+    while usda.lookup_slots._value != usda.MAX_QUEUED:
+        assert time.monotonic() < deadline, 'lookup slots were not released'
+        time.sleep(0.01)
+
+
+def test_results_and_errors_by_name():
+    def lookup(name):
+        if name == 'bad':
+            raise ValueError(name)
+        return None if name == 'unknown' else {'description': name}
+
+    results = get_usda_nutrition_many(['egg', 'bad', 'unknown', 'egg'], 5, lookup=lookup)
+
+    assert results['egg'] == {'description': 'egg'}
+    assert isinstance(results['bad'], ValueError)
+    assert results['unknown'] is None
+    wait_for_idle_pool()
+
+
+def test_deadline_cancels_lookups_that_have_not_started():
+    lookup = BlockingLookup()
+    names = [f'food {i}' for i in range(usda.MAX_IN_FLIGHT + 4)]
+
+    results = get_usda_nutrition_many(names, 0.2, lookup=lookup)
+    lookup.release.set()
+
+    assert all(isinstance(results[name], LookupTimeout) for name in names)
+    wait_for_idle_pool()
+    assert len(lookup.started) == usda.MAX_IN_FLIGHT  # The queued ones never ran
+
+
+def test_submissions_wait_for_a_queue_slot(monkeypatch):
+    monkeypatch.setattr(usda, 'MAX_QUEUED', 2)
+    monkeypatch.setattr(usda, 'lookup_slots', threading.BoundedSemaphore(2))
+    lookup = BlockingLookup()
+    threading.Timer(0.2, lookup.release.set).start()
+
+    start = time.monotonic()
+    results = get_usda_nutrition_many(['a', 'b', 'c'], 5, lookup=lookup)
+
+    assert time.monotonic() - start >= 0.2  # 'c' waited until 'a' or 'b' finished
+    assert results == {name: {'description': name} for name in 'abc'}
+    wait_for_idle_pool()
+
+
+def test_no_queue_slot_before_the_deadline_times_out(monkeypatch):
+    monkeypatch.setattr(usda, 'MAX_QUEUED', 1)
+    monkeypatch.setattr(usda, 'lookup_slots', threading.BoundedSemaphore(1))
+    lookup = BlockingLookup()
+
+    results = get_usda_nutrition_many(['a', 'b'], 0.2, lookup=lookup)
+    lookup.release.set()
+
+    assert isinstance(results['a'], LookupTimeout)
+    assert isinstance(results['b'], LookupTimeout)
+    assert lookup.started == ['a']
+    wait_for_idle_pool()
+
+
+@pytest.fixture(autouse=True)
+def idle_pool():
+    yield
+    wait_for_idle_pool()
@@ -0,0 +1,59 @@
+from datetime import date
+
+import pytest
+
+from App import db, workouts
+from App.models import User, WorkoutList, WorkoutStats
+
+
+@pytest.fixture
+def user(app_context):
+    user = User('Work', 'Out', 'workouts@example.com', 'password123', date(1990, 1, 1))
+    db.session.add(user)
+    db.session.commit()
+    yield user
+    db.session.query(WorkoutStats).filter_by(user_id=user.id).delete()
+    db.session.query(WorkoutList).filter_by(user_id=user.id).delete()
+    db.session.delete(user)
+    db.session.commit()
+
+
+def add(user, workout_type, difficulty, duration, day):
+    db.session.add(WorkoutList(workout_type, difficulty, duration, user.id, day))
+    db.session.commit()
+    workouts.invalidate_month(user.id, day)
+
+
+def test_month_view_buckets_by_day(user):
+    add(user, 'Run, easy', 'easy', 30, date(2024, 3, 4))
+    add(user, 'Run, easy', 'Hard', 10, date(2024, 3, 4))
+    add(user, 'Swim', 'medium', 20, date(2024, 3, 4))
+    add(user, 'Swim', 'medium', 15, date(2024, 3, 9))
+    add(user, 'Swim', 'medium', 15, date(2024, 4, 1))
+
+    view = workouts.month_view(user.id, '2024-03')
+
+    assert view['days'] == [
+        {'date': '2024-03-04', 'count': 3, 'minutes': 60, 'calories': 30 * 5 + 10 * 10 + 20 * 7,
+         'types': ['Run, easy', 'Swim']},  # A comma in a name stays one type
+        {'date': '2024-03-09', 'count': 1, 'minutes': 15, 'calories': 15 * 7, 'types': ['Swim']},
+    ]
+    assert view['totals'] == {'count': 4, 'minutes': 75, 'calories': 390 + 105}
+
+
+def test_month_view_is_dropped_when_the_month_changes(user):
+    add(user, 'Swim', 'easy', 10, date(2024, 5, 2))
+    assert workouts.month_view(user.id, '2024-05')['totals']['count'] == 1
+
+    add(user, 'Row', 'easy', 10, date(2024, 5, 3))
+    assert workouts.month_view(user.id, '2024-05')['totals']['count'] == 2
+
+
+def test_unpadded_month_shares_the_cache_entry(user):
+    add(user, 'Swim', 'easy', 10, date(2024, 6, 2))
+    view = workouts.month_view(user.id, '2024-6')
+    assert view['month'] == '2024-06'
+    assert view['totals']['count'] == 1
+
+    add(user, 'Row', 'easy', 10, date(2024, 6, 3))
+    assert workouts.month_view(user.id, '2024-6')['totals']['count'] == 2
@@ -1,6 +1,13 @@
 from App import get_app
 
-app = get_app()
+
+def __getattr__(name):
+    # Built on first access to wsgi.app, not at import: worker processes started with
+    # spawn/forkserver import this module too
+    if name == 'app':
+        return get_app()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 if __name__ == '__main__':
-    app.run()
+    get_app().run()
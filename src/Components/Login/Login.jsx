@@ -77,7 +77,7 @@ const Login = () => {
                 }
 
                 if (isResetMode) {
-                    showSuccess('Your password has been sent to your email');
+                    showSuccess(data.message);
                     setResetSent(true);
                 } else {
                     localStorage.setItem('token', data.token);
@@ -1,7 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import './MealTracker.css';
 
-const API_URL = 'http://localhost:5001';
+const API_URL = 'http://127.0.0.1:5000/api';
 
 const MealTracker = () => {
     const [meals, setMeals] = useState([]);
@@ -13,22 +13,56 @@ const PostureTracker = () => {
   const videoRef = useRef(null);
   const detectorRef = useRef(null);
   const requestRef = useRef(null);
-  const intervalRef = useRef(null);
-
-  // Generate random posture data for demonstration
-  const generateRandomPosture = () => {
-    const shoulderLevel = Math.random() > 0.5 ? 'Good' : 'Needs Adjustment';
-    const verticalAlignment = Math.random() > 0.5 ? 'Good' : 'Needs Adjustment';
-    const overall = (shoulderLevel === 'Good' && verticalAlignment === 'Good') 
-      ? 'Good Posture' 
-      : 'Poor Posture';
-
-    return {
-      shoulderLevel,
-      verticalAlignment,
-      overall,
-      confidence: Math.random() > 0.7 ? 'high' : Math.random() > 0.3 ? 'medium' : 'low'
-    };
+  const trackingRef = useRef(false);
+
+  // Posture scoring runs on the backend over windows of MoveNet keypoints
+  const API_URL = 'http://127.0.0.1:5000/api';
+  const WINDOW_FRAMES = 30; // About one second at 30 fps
+  const framesRef = useRef([]);
+
+  const analyzeWindow = async (frames) => {
+    try {
+      const response = await fetch(`${API_URL}/analyze_posture`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ frames })
+      });
+      if (!response.ok) {
+        return;
+      }
+      const { summary } = await response.json();
+      if (!trackingRef.current || !summary.status.overall) {
+        return;
+      }
+      setPostureData({
+        shoulderLevel: summary.status.shoulder_tilt || 'Not Visible',
+        verticalAlignment: summary.status.spine_angle || summary.status.neck_angle || 'Not Visible',
+        overall: summary.status.overall,
+        confidence: summary.confidence
+      });
+    } catch (err) {
+      console.error('Posture analysis error:', err);
+    }
+  };
+
+  const detectPose = async () => {
+    if (!trackingRef.current) {
+      return;
+    }
+    const video = videoRef.current;
+    if (detectorRef.current && video && video.readyState >= 2) {
+      const poses = await detectorRef.current.estimatePoses(video);
+      if (poses.length > 0) {
+        framesRef.current.push(poses[0].keypoints.map(k => [k.x, k.y, k.score]));
+      }
+      if (framesRef.current.length >= WINDOW_FRAMES) {
+        analyzeWindow(framesRef.current);
+        framesRef.current = [];
+      }
+    }
+    if (trackingRef.current) {
+      requestRef.current = requestAnimationFrame(detectPose);
+    }
   };
 
   useEffect(() => {
@@ -36,8 +70,6 @@ const PostureTracker = () => {
 
     const initialize = async () => {
       try {
-        // Comment out actual TensorFlow initialization for now
-        
         await tf.ready();
         const model = poseDetection.SupportedModels.MoveNet;
         const detectorConfig = {
@@ -46,9 +78,7 @@ const PostureTracker = () => {
           minPoseScore: 0.1
         };
         detectorRef.current = await poseDetection.createDetector(model, detectorConfig);
-        
 
-        // Instead, just set as loaded immediately
         if (mounted) {
           setModelLoaded(true);
           setIsLoading(false);
@@ -69,9 +99,7 @@ const PostureTracker = () => {
       if (requestRef.current) {
         cancelAnimationFrame(requestRef.current);
       }
-      if (intervalRef.current) {
-        clearInterval(intervalRef.current);
-      }
+      trackingRef.current = false;
     };
   }, []);
 
@@ -91,10 +119,9 @@ const PostureTracker = () => {
       setIsTracking(true);
       setIsLoading(false);
 
-      // Instead of pose detection, use random values
-      intervalRef.current = setInterval(() => {
-        setPostureData(generateRandomPosture());
-      }, 2000);
+      framesRef.current = [];
+      trackingRef.current = true;
+      requestRef.current = requestAnimationFrame(detectPose);
 
     } catch (err) {
       console.error('Camera error:', err);
@@ -106,12 +133,11 @@ const PostureTracker = () => {
 
   const stopTracking = () => {
     setIsTracking(false);
+    trackingRef.current = false;
     if (requestRef.current) {
       cancelAnimationFrame(requestRef.current);
     }
-    if (intervalRef.current) {
-      clearInterval(intervalRef.current);
-    }
+    framesRef.current = [];
     if (videoRef.current?.srcObject) {
       videoRef.current.srcObject.getTracks().forEach(track => track.stop());
     }
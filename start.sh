@@ -2,19 +2,13 @@
 
 # Install Python dependencies if needed
 pip3 install -r requirements.txt
+python3 -c "import en_core_web_sm" 2>/dev/null || python3 -m spacy download en_core_web_sm
 
-# Start Flask backend
+# Start the backend (API, nutrition, meals and posture) in one waitress process
 cd Backend
-# Run the Flask app in the background
-python3 run.py&
+# Run it in the background
+python3 serve.py&
 
-cd foodtracker
-python3 app.py&
-
-cd posturetracker
-python3 ___init___.py&
-
-cd ..
 cd ..
 npm start 
 